@@ -0,0 +1,3 @@
+"""
+benchmarks of sync and check on synthetic projects, run with `python -m benchmarks --help`
+"""
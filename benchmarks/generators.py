@@ -0,0 +1,258 @@
+"""
+synthetic Pipfile, Pipfile.lock and setup.py of any size
+
+The files are generated from a seed so that two benchmark runs measure the same input. A project's setup.py lists
+every default package of its Pipfile with the same specifier, the check goes through all of them.
+"""
+import json
+import random
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# the specifier shapes of Pipfile packages, each one a Pipfile value and the matching setup.py requirement
+Shape = Callable[[str, random.Random], Tuple[str, str]]
+
+_MARKERS = (
+    "python_version >= '3.6'",
+    "sys_platform == 'linux'",
+    "python_version < '3.8' and os_name == 'posix'",
+)
+_EXTRAS = ("socks", "security", "async", "cli")
+
+
+def _version(rng):  # type: (random.Random) -> str
+    return "%d.%d.%d" % (rng.randint(0, 9), rng.randint(0, 30), rng.randint(0, 9))
+
+
+def _any_version(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    return '"*"', name
+
+
+def _pinned(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    version = _version(rng)
+    return '"==%s"' % version, "%s==%s" % (name, version)
+
+
+def _at_least(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    version = _version(rng)
+    return '">=%s"' % version, "%s>=%s" % (name, version)
+
+
+def _compatible(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    major, minor = rng.randint(0, 9), rng.randint(0, 30)
+    # check does not read "~=" in install_requires, the same versions are written as a range
+    return (
+        '"~=%d.%d"' % (major, minor),
+        "%s>=%d.%d,<%d.0" % (name, major, minor, major + 1),
+    )
+
+
+def _range(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    major = rng.randint(0, 8)
+    specifier = ">=%d.%d,<%d.0,!=%d.%d.1" % (major, 1, major + 1, major, 2)
+    return '"%s"' % specifier, "%s%s" % (name, specifier)
+
+
+def _extras(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    version = _version(rng)
+    extras = sorted(rng.sample(_EXTRAS, rng.randint(1, 2)))
+    return (
+        '{ version = "==%s", extras = [%s] }'
+        % (version, ", ".join('"%s"' % extra for extra in extras)),
+        "%s[%s]==%s" % (name, ",".join(extras), version),
+    )
+
+
+def _markers(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    version = _version(rng)
+    marker = rng.choice(_MARKERS)
+    return (
+        '{ version = ">=%s", markers = "%s" }' % (version, marker),
+        "%s>=%s; %s" % (name, version, marker),
+    )
+
+
+def _vcs(name, rng):  # type: (str, random.Random) -> Tuple[str, str]
+    url = "https://github.com/benchmark/%s.git" % name
+    ref = "v" + _version(rng)
+    # check expects git packages in dependency_links
+    return (
+        '{ git = "%s", ref = "%s" }' % (url, ref),
+        "git+%s@%s#egg=%s" % (url, ref, name),
+    )
+
+
+SHAPES = (
+    _any_version,
+    _pinned,
+    _at_least,
+    _compatible,
+    _range,
+    _extras,
+    _markers,
+    _vcs,
+)  # type: Tuple[Shape, ...]
+
+
+def package_names(count, prefix="package"):  # type: (int, str) -> List[str]
+    width = len(str(count))
+    return ["%s-%0*d" % (prefix, width, i) for i in range(count)]
+
+
+def generate_project(
+    package_count, shape_count=len(SHAPES), seed=0
+):  # type: (int, int, int) -> Tuple[str, List[str], List[str]]
+    """
+    a Pipfile with `package_count` default packages, a tenth as many dev packages, cycling through the first
+    `shape_count` specifier shapes (any version, pinned, lower bound, compatible release, range, extras, markers and
+    git)
+
+    :return: the Pipfile, then the install_requires and dependency_links of the matching setup.py
+    """
+    rng = random.Random(seed)
+    shapes = SHAPES[: max(1, min(shape_count, len(SHAPES)))]
+    default_lines = []  # type: List[str]
+    install_requires, dependency_links = [], []  # type: List[str], List[str]
+    for i, name in enumerate(package_names(package_count)):
+        shape = shapes[i % len(shapes)]
+        value, requirement = shape(name, rng)
+        default_lines.append('"%s" = %s' % (name, value))
+        if shape is _vcs:
+            dependency_links.append(requirement)
+        else:
+            install_requires.append(requirement)
+    dev_lines = [
+        '"%s" = %s' % (name, _pinned(name, rng)[0])
+        for name in package_names(max(1, package_count // 10), "dev-package")
+    ]
+    pipfile = "\n".join(
+        [
+            "[[source]]",
+            'url = "https://pypi.org/simple"',
+            "verify_ssl = true",
+            'name = "pypi"',
+            "",
+            "[packages]",
+        ]
+        + default_lines
+        + ["", "[dev-packages]"]
+        + dev_lines
+        + ["", "[requires]", 'python_version = "3.8"', ""]
+    )
+    return pipfile, install_requires, dependency_links
+
+
+def _hashes(rng, count):  # type: (random.Random, int) -> List[str]
+    return sorted("sha256:%064x" % rng.getrandbits(256) for _ in range(count))
+
+
+def _lock_entry(name, rng, shape):  # type: (str, random.Random, int) -> Dict[str, Any]
+    if shape % 8 == 7:
+        return {
+            "editable": True,
+            "git": "https://github.com/benchmark/%s.git" % name,
+            "ref": "%040x" % rng.getrandbits(160),
+        }
+    entry = {
+        "hashes": _hashes(rng, rng.randint(2, 24)),
+        "version": "==" + _version(rng),
+    }  # type: Dict[str, Any]
+    if shape % 8 == 5:
+        entry["extras"] = sorted(rng.sample(_EXTRAS, rng.randint(1, 2)))
+    if shape % 8 in (3, 6):
+        entry["markers"] = rng.choice(_MARKERS)
+    if shape % 8 == 4:
+        entry["index"] = "pypi"
+    return entry
+
+
+def generate_lockfile(package_count, seed=0):  # type: (int, int) -> str
+    """
+    a Pipfile.lock with `package_count` default packages and a tenth as many dev packages. Every package has 2 to
+    24 hashes, some have extras, markers or an index, one in eight is a git checkout
+    """
+    rng = random.Random(seed)
+    lockfile = {
+        "_meta": {
+            "hash": {"sha256": "%064x" % rng.getrandbits(256)},
+            "pipfile-spec": 6,
+            "requires": {"python_version": "3.8"},
+            "sources": [
+                {"name": "pypi", "url": "https://pypi.org/simple", "verify_ssl": True}
+            ],
+        },
+        "default": {
+            name: _lock_entry(name, rng, i)
+            for i, name in enumerate(package_names(package_count))
+        },
+        "develop": {
+            name: _lock_entry(name, rng, i)
+            for i, name in enumerate(
+                package_names(max(1, package_count // 10), "dev-package")
+            )
+        },
+    }
+    return json.dumps(lockfile, indent=4, sort_keys=True) + "\n"
+
+
+def generate_setup(
+    install_requires, dependency_links=(), padding_lines=0, seed=0
+):  # type: (List[str], Sequence[str], int, int) -> str
+    """
+    a setup.py calling setup() with `install_requires` and `dependency_links`, formatted the way black leaves it
+
+    :param padding_lines: about how many lines of unrelated code (constants, functions, comments) surround the call
+    """
+    rng = random.Random(seed)
+    blocks = []  # type: List[str]
+    line_count = 0
+    while line_count < padding_lines:
+        i = len(blocks)
+        if i % 2 == 0:
+            block = [
+                "# configuration block %d" % i,
+                "SETTING_%d = {" % i,
+                '    "name": "%s",' % _version(rng),
+                '    "values": [%s],'
+                % ", ".join(str(rng.randint(0, 99)) for _ in range(4)),
+                "}",
+            ]
+        else:
+            block = [
+                "def helper_%d(value):" % i,
+                "    return value * %d" % rng.randint(2, 9),
+            ]
+        blocks.append("\n".join(block))
+        line_count += len(block) + 2
+
+    def string_list(strings):  # type: (Sequence[str]) -> List[str]
+        return ["        %s," % json.dumps(string) for string in strings]
+
+    call = "\n".join(
+        [
+            "setup(",
+            '    name="benchmark",',
+            '    version="1.0.0",',
+            '    packages=find_packages(exclude=["tests"]),',
+            "    install_requires=[",
+        ]
+        + string_list(install_requires)
+        + ["    ],", "    dependency_links=["]
+        + string_list(dependency_links)
+        + [
+            "    ],",
+            "    extras_require={",
+            '        "dev": [],',
+            "    },",
+            ")",
+        ]
+    )
+    half = len(blocks) // 2
+    return (
+        "\n\n\n".join(
+            ["from setuptools import find_packages, setup"]
+            + blocks[:half]
+            + [call]
+            + blocks[half:]
+        )
+        + "\n"
+    )
@@ -0,0 +1,311 @@
+"""
+time each phase of sync and check on generated projects of growing size, and compare two runs
+
+    python -m benchmarks --packages 10 100 1000 --output before.json
+    python -m benchmarks --packages 10 100 1000 --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pathlib import Path
+
+from benchmarks.generators import (
+    SHAPES,
+    generate_lockfile,
+    generate_project,
+    generate_setup,
+)
+
+PHASES = (
+    "lockfile parse",
+    "pipfile parse",
+    "setup.py parse",
+    "check",
+    "update_setup",
+    "black",
+)
+
+
+def _time(
+    function, repeat, prepare=None
+):  # type: (Callable[[], Any], int, Optional[Callable[[], Any]]) -> Dict[str, Any]
+    """
+    :param prepare: run before each timed call, untimed
+    :return: "min", "median" and every run, in seconds
+    """
+    from pipenv_setup import parse_cache
+
+    runs = []  # type: List[float]
+    for _ in range(repeat):
+        if prepare is not None:
+            prepare()
+        # every run parses from scratch, as a fresh pipenv-setup process would
+        parse_cache.cache_clear()
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def _dependency_arguments(lockfile_session):  # type: (Any) -> Dict[str, List[str]]
+    """
+    what `pipenv_setup.main.sync --dev` writes to setup.py
+    """
+    from pipenv_setup import lockfile_parser
+
+    dependency_arguments = {
+        "install_requires": [],
+        "dependency_links": [],
+        "extras_require": [],
+    }  # type: Dict[str, List[str]]
+    for packages, dev in (
+        (lockfile_session.get_default_packages()[1], False),
+        (lockfile_session.get_dev_packages()[1], True),
+    ):
+        for name, config in packages.items():
+            keyword, value = lockfile_parser.format_remote_package(
+                name, config, dev=dev
+            )
+            dependency_arguments[keyword].append(value)
+    return dependency_arguments
+
+
+def benchmark_project(
+    directory, repeat
+):  # type: (Path, int) -> Dict[str, Optional[Dict[str, Any]]]
+    """
+    time each phase on the Pipfile, Pipfile.lock and setup.py of `directory`
+
+    :return: the timings of each phase, None for black when it is not installed
+    """
+    from pipenv_setup import lockfile_parser, pipfile_parser, setup_parser
+    from pipenv_setup import setup_updater
+    from pipenv_setup.inconsistency_checker import InconsistencyChecker
+
+    lockfile_path = directory / "Pipfile.lock"
+    pipfile_path = directory / "Pipfile"
+    setup_path = directory / "setup.py"
+    setup_code = setup_path.read_text(encoding="utf-8")
+
+    def parse_lockfile():  # type: () -> Any
+        session = lockfile_parser.LockfileSession(lockfile_path)
+        session.get_default_packages()
+        session.get_dev_packages()
+        return session
+
+    def parse_pipfile():  # type: () -> Any
+        session = pipfile_parser.PipfileSession(pipfile_path)
+        session.get_default_packages()
+        session.get_dev_packages()
+        return session
+
+    (
+        install_requires,
+        dependency_links,
+    ) = setup_parser.get_install_requires_dependency_links(setup_code)
+    pipfile_packages = parse_pipfile().get_default_packages()[1]
+
+    def check():  # type: () -> List[str]
+        checker = InconsistencyChecker(
+            install_requires, dependency_links, pipfile_packages, False
+        )
+        return (
+            checker.check_install_requires_conflict()
+            + checker.check_dependency_links_conflict()
+            + checker.check_lacking_install_requires()
+            + checker.check_lacking_dependency_links()
+        )
+
+    dependency_arguments = _dependency_arguments(parse_lockfile())
+
+    def restore_setup():  # type: () -> None
+        setup_path.write_text(setup_code, encoding="utf-8")
+
+    def update_setup():  # type: () -> None
+        # black reports every reformatted file
+        with contextlib.redirect_stderr(io.StringIO()):
+            setup_updater.update_setup(dependency_arguments, setup_path, dev=True)
+
+    timings = {
+        "lockfile parse": _time(parse_lockfile, repeat),
+        "pipfile parse": _time(parse_pipfile, repeat),
+        "setup.py parse": _time(
+            lambda: setup_parser.get_install_requires_dependency_links(setup_code),
+            repeat,
+        ),
+        "check": _time(check, repeat),
+        "update_setup": _time(update_setup, repeat, restore_setup),
+        "black": None,
+    }  # type: Dict[str, Optional[Dict[str, Any]]]
+
+    formatter = setup_updater.get_black_formatter()
+    if formatter is not None:
+        # the whole file, as sync does when the edited arguments can not be formatted alone
+        rewritten_code = setup_updater.rewrite_setup_code(
+            setup_code, dependency_arguments, dev=True
+        )
+        timings["black"] = _time(lambda: formatter.format_code(rewritten_code), repeat)
+    return timings
+
+
+def write_project(
+    directory, package_count, shape_count, padding_lines, seed
+):  # type: (Path, int, int, int, int) -> int
+    """
+    :return: the number of lines of the generated setup.py
+    """
+    pipfile, install_requires, dependency_links = generate_project(
+        package_count, shape_count, seed
+    )
+    setup_code = generate_setup(install_requires, dependency_links, padding_lines, seed)
+    (directory / "Pipfile").write_text(pipfile, encoding="utf-8")
+    (directory / "Pipfile.lock").write_text(
+        generate_lockfile(package_count, seed), encoding="utf-8"
+    )
+    (directory / "setup.py").write_text(setup_code, encoding="utf-8")
+    return setup_code.count("\n")
+
+
+def run(args):  # type: (argparse.Namespace) -> Dict[str, Any]
+    """
+    :return: the parameters, the environment and, for each size, the timings of each phase
+    """
+    try:
+        import black
+
+        black_version = black.__version__  # type: Optional[str]
+    except ImportError:
+        black_version = None
+    results = []  # type: List[Dict[str, Any]]
+    for package_count in args.packages:
+        directory = Path(tempfile.mkdtemp(prefix="pipenv-setup-benchmark-"))
+        try:
+            setup_lines = write_project(
+                directory, package_count, args.shapes, args.padding, args.seed
+            )
+            phases = benchmark_project(directory, args.repeat)
+        finally:
+            shutil.rmtree(str(directory))
+        results.append(
+            {"packages": package_count, "setup_lines": setup_lines, "phases": phases}
+        )
+        _print_result(results[-1])
+    return {
+        "parameters": {
+            "packages": args.packages,
+            "shapes": args.shapes,
+            "padding": args.padding,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "black": black_version,
+        },
+        "results": results,
+    }
+
+
+def _print_result(result):  # type: (Dict[str, Any]) -> None
+    print(
+        "%d packages, setup.py of %d lines"
+        % (result["packages"], result["setup_lines"])
+    )
+    for phase in PHASES:
+        timing = result["phases"][phase]
+        if timing is None:
+            print("  %-16s %12s" % (phase, "skipped"))
+        else:
+            print(
+                "  %-16s %10.2fms (min %.2fms)"
+                % (phase, timing["median"] * 1000, timing["min"] * 1000)
+            )
+
+
+def compare(before, after):  # type: (Dict[str, Any], Dict[str, Any]) -> List[str]
+    """
+    :return: a line for each phase of each size measured by both runs, with the ratio of the medians
+    """
+    lines = [
+        "%-10s %-16s %12s %12s %8s" % ("packages", "phase", "before", "after", "ratio")
+    ]
+    before_results = {result["packages"]: result for result in before["results"]}
+    for result in after["results"]:
+        previous = before_results.get(result["packages"])
+        if previous is None:
+            continue
+        for phase in PHASES:
+            timing = result["phases"].get(phase)
+            previous_timing = previous["phases"].get(phase)
+            if timing is None or previous_timing is None:
+                continue
+            lines.append(
+                "%-10d %-16s %10.2fms %10.2fms %7.2fx"
+                % (
+                    result["packages"],
+                    phase,
+                    previous_timing["median"] * 1000,
+                    timing["median"] * 1000,
+                    timing["median"] / previous_timing["median"],
+                )
+            )
+    return lines
+
+
+def main(argv=None):  # type: (Optional[List[str]]) -> None
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="time the phases of sync and check on generated projects",
+    )
+    parser.add_argument(
+        "--packages",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="numbers of default packages of the generated projects. Defaults to 10 100 1000",
+    )
+    parser.add_argument(
+        "--shapes",
+        type=int,
+        default=len(SHAPES),
+        help="number of distinct specifier shapes in the Pipfile, 1 to %d"
+        % len(SHAPES),
+    )
+    parser.add_argument(
+        "--padding",
+        type=int,
+        default=200,
+        help="lines of unrelated code around the setup() call. Defaults to 200",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timed runs of each phase. Defaults to 5"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output",
+        default="benchmark-results.json",
+        help="where to write the results. Defaults to benchmark-results.json",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="RESULTS",
+        help="results of a previous run to compare with, the ratio is after/before",
+    )
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = run(args)
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as previous:
+            print("\n".join(compare(json.load(previous), results)))
@@ -0,0 +1,214 @@
+"""
+on-disk cache of parse and check results, keyed by a hash of the input files' content
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    TYPE_CHECKING,
+)
+
+from pipenv_setup.package import Package
+from pipenv_setup.timing import span
+
+if TYPE_CHECKING:
+    from pipenv_setup.lockfile_parser import LockfileSession
+    from pipenv_setup.pipfile_parser import PipfileSession
+
+CACHE_DIR_NAME = ".pipenv-setup-cache"
+# bump when the shape of cached values changes
+CACHE_FORMAT_VERSION = "4"
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024
+
+_code_fingerprint = None  # type: Optional[bytes]
+
+
+def get_code_fingerprint():  # type: () -> bytes
+    """
+    hash of pipenv-setup's own source, results cached by another version of the code are never used
+    """
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.sha256()
+        for source_path in sorted(Path(__file__).parent.glob("*.py")):
+            digest.update(source_path.read_bytes())
+        _code_fingerprint = digest.digest()
+    return _code_fingerprint
+
+
+def file_digest(path):  # type: (Path) -> bytes
+    """
+    sha256 of the content of a file, read a chunk at a time so that large lockfiles are never held in memory
+    """
+    digest = hashlib.sha256()
+    with open(str(path), "rb") as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class ResultCache:
+    """
+    A directory of json files, one per cached value, evicted least recently used first once their total size
+    exceeds `max_size` bytes.
+
+    Values are stored as json rather than pickled, the cache directory lives in the project and must not be
+    able to execute code. I/O errors are never fatal, they only make the cache miss.
+    """
+
+    def __init__(
+        self, directory=Path(CACHE_DIR_NAME), max_size=DEFAULT_MAX_SIZE, enabled=True
+    ):  # type: (Path, int, bool) -> None
+        self._directory = directory
+        self._max_size = max_size
+        self.enabled = enabled
+
+    @staticmethod
+    def key(kind, *parts):  # type: (str, Union[bytes, str, bool, None]) -> str
+        """
+        :param kind: what is being cached, e.g. "setup.py"
+        :param parts: everything the cached value depends on, file content included
+        """
+        digest = hashlib.sha256()
+        for part in (CACHE_FORMAT_VERSION, get_code_fingerprint(), kind) + parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode("utf-8")
+            # length prefix so that ("ab", "c") and ("a", "bc") differ
+            digest.update(b"%d:" % len(part))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):  # type: (str) -> Path
+        return self._directory / (key + ".json")
+
+    def get(self, key):  # type: (str) -> Optional[Any]
+        """
+        :return: the cached value, None on a miss
+        """
+        if not self.enabled:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            with open(str(entry_path), encoding="utf-8") as entry:
+                value = json.load(entry)
+            # the modification time serves as the recency of use
+            os.utime(str(entry_path))
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def set(self, key, value):  # type: (str, Any) -> None
+        if not self.enabled:
+            return
+        try:
+            if not self._directory.exists():
+                self._directory.mkdir(parents=True)
+                (self._directory / ".gitignore").write_text("*\n")
+            # write then rename, concurrent readers never see half an entry
+            fd, temp_path = tempfile.mkstemp(dir=str(self._directory), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as entry:
+                json.dump(value, entry)
+            os.replace(temp_path, str(self._entry_path(key)))
+            self._evict()
+        except OSError:
+            return
+
+    def get_or_compute(self, key, compute):  # type: (str, Callable[[], Any]) -> Any
+        """
+        :param compute: produces a json serializable value on a miss. Exceptions are propagated and nothing is cached
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _evict(self):  # type: () -> None
+        entries = []
+        total_size = 0
+        for entry_path in self._directory.glob("*.json"):
+            stat = entry_path.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total_size += stat.st_size
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total_size <= self._max_size:
+                break
+            entry_path.unlink()
+            total_size -= size
+
+
+class CachedPackages:
+    """
+    classified packages restored from the cache, with the interface of `LockfileSession` and `PipfileSession`
+    """
+
+    def __init__(self, default_packages, dev_packages):  # type: (Any, Any) -> None
+        self._default_packages = _load_packages(default_packages)
+        self._dev_packages = _load_packages(dev_packages)
+
+    def get_default_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        return self._default_packages
+
+    def get_dev_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        return self._dev_packages
+
+
+def _dump_packages(
+    packages,
+):  # type: (Tuple[Dict[str, Package], Dict[str, Package]]) -> List[Dict[str, Any]]
+    return [
+        {name: package.to_json() for name, package in group.items()}
+        for group in packages
+    ]
+
+
+def _load_packages(
+    groups,
+):  # type: (List[Dict[str, Any]]) -> Tuple[Dict[str, Package], Dict[str, Package]]
+    local_packages, remote_packages = (
+        {name: Package.from_json(fields) for name, fields in group.items()}
+        for group in groups
+    )
+    return local_packages, remote_packages
+
+
+def load_session(
+    session_class, path, cache
+):  # type: (Union[Type[LockfileSession], Type[PipfileSession]], Path, ResultCache) -> Any
+    """
+    parse a Pipfile or Pipfile.lock with `session_class` unless the result for the same content is cached
+
+    :return: an object with get_default_packages() and get_dev_packages() methods
+    """
+    with span("load " + path.name):
+        if not cache.enabled or not path.exists():
+            with span("parse " + path.name):
+                return session_class(path)
+
+        def parse():  # type: () -> Any
+            with span("parse " + path.name):
+                session = session_class(path)
+            return [
+                _dump_packages(session.get_default_packages()),
+                _dump_packages(session.get_dev_packages()),
+            ]
+
+        default_packages, dev_packages = cache.get_or_compute(
+            cache.key(session_class.__name__, file_digest(path)), parse
+        )
+        return CachedPackages(default_packages, dev_packages)
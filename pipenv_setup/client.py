@@ -0,0 +1,171 @@
+"""
+thin command line forwarding check and sync to a running `pipenv-setup serve`
+
+Importing this module must stay cheap: it does not import the parsers, colorama or black, that is the point of
+talking to a server that has them loaded. When no server answers, the command runs in this process instead.
+"""
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from pathlib import Path
+
+# the subcommands a server runs, the others (watch, serve, help) always run in the calling process
+FORWARDED_COMMANDS = frozenset(["check", "sync"])
+SOCKET_ENVIRONMENT_VARIABLE = "PIPENV_SETUP_SOCKET"
+# seconds a forwarded command may take before it runs in the calling process instead, e.g. when the server is stuck
+DEFAULT_TIMEOUT = 60.0
+
+
+def default_socket_path():  # type: () -> Path
+    """
+    :return: $PIPENV_SETUP_SOCKET, or a socket in $XDG_RUNTIME_DIR, or in a directory private to the user in the
+        temporary directory. The server creates that directory, other users can write to the temporary directory
+        itself
+    """
+    if os.environ.get(SOCKET_ENVIRONMENT_VARIABLE):
+        return Path(os.environ[SOCKET_ENVIRONMENT_VARIABLE])
+    user_id = os.getuid() if hasattr(os, "getuid") else 0
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]) / ("pipenv-setup-%d.sock" % user_id)
+    return Path(tempfile.gettempdir()) / ("pipenv-setup-%d" % user_id) / "server.sock"
+
+
+def is_private_directory(directory):  # type: (Path) -> bool
+    """
+    whether only the current user (or root) can add, remove or replace the files of `directory`
+    """
+    try:
+        directory_stat = os.stat(str(directory))
+    except OSError:
+        return False
+    return (
+        stat.S_ISDIR(directory_stat.st_mode)
+        and directory_stat.st_uid in (os.getuid(), 0)
+        and not directory_stat.st_mode & 0o022
+    )
+
+
+def is_private_socket(socket_path):  # type: (Path) -> bool
+    """
+    whether `socket_path` is a socket of the current user that no other user can connect to, in a directory where
+    no other user can replace it. A server listening there was started by the current user
+    """
+    if not hasattr(os, "getuid"):
+        return False
+    try:
+        socket_stat = os.lstat(str(socket_path))
+    except OSError:
+        return False
+    return (
+        stat.S_ISSOCK(socket_stat.st_mode)
+        and socket_stat.st_uid == os.getuid()
+        and not socket_stat.st_mode & 0o077
+        and is_private_directory(socket_path.parent)
+    )
+
+
+def receive_line(connection):  # type: (socket.socket) -> bytes
+    """
+    :return: the bytes received until a newline or the end of the stream, newline excluded
+    """
+    chunks = []  # type: List[bytes]
+    while True:
+        chunk = connection.recv(64 * 1024)
+        if not chunk:
+            break
+        newline = chunk.find(b"\n")
+        if newline != -1:
+            chunks.append(chunk[:newline])
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def forward(
+    args, socket_path, color=False, timeout=DEFAULT_TIMEOUT
+):  # type: (List[str], Path, bool, float) -> Optional[Dict[str, Any]]
+    """
+    run a command on the server listening on `socket_path`, in the current directory
+
+    :param args: the command line, program name excluded
+    :param color: keep the colors in the output
+    :param timeout: seconds to wait for the server to connect, then to answer
+    :return: the "stdout", "stderr" and "exit_code" of the command. None when no server accepts the connection,
+        or when `socket_path` is not a private socket of the current user (see `is_private_socket`): another user
+        could have put it there to read the command and fake its result. Once the command is sent, the server may
+        run it whatever happens next, so a server that does not answer within `timeout`, hangs up or answers
+        garbage gives a failed response rather than None: the command must not run a second time
+    """
+    if not hasattr(socket, "AF_UNIX") or not is_private_socket(socket_path):
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        try:
+            connection.connect(str(socket_path))
+        except OSError:
+            return None
+        try:
+            request = {"argv": args, "cwd": os.getcwd(), "color": color}
+            connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            response_line = receive_line(connection)
+            if not response_line:
+                raise ValueError("it hung up")
+            response = json.loads(response_line.decode("utf-8"))
+            if not _is_response(response):
+                raise ValueError("malformed response")
+        except (OSError, ValueError) as e:
+            # socket.timeout is an OSError, a truncated or garbled answer a ValueError
+            from pipenv_setup import msg_formatter
+
+            return {
+                "stdout": "",
+                "stderr": msg_formatter.server_failed(socket_path, e) + "\n",
+                "exit_code": 1,
+            }
+    return response
+
+
+def _is_response(response):  # type: (Any) -> bool
+    """
+    >>> _is_response({"stdout": "", "stderr": "", "exit_code": 1})
+    True
+    >>> _is_response({"stdout": "", "exit_code": 0})
+    False
+    """
+    return (
+        isinstance(response, dict)
+        and isinstance(response.get("stdout"), str)
+        and isinstance(response.get("stderr"), str)
+        and type(response.get("exit_code")) is int
+    )
+
+
+def main(argv=None):  # type: (Optional[List[str]]) -> None
+    """
+    the pipenv-setup-client command, same arguments as pipenv-setup
+
+    :raise SystemExit: with the exit code of the command when it fails
+    """
+    if argv is None:
+        argv = sys.argv
+    if len(argv) > 1 and argv[1] in FORWARDED_COMMANDS:
+        response = forward(argv[1:], default_socket_path(), sys.stdout.isatty())
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            if response["exit_code"] != 0:
+                sys.exit(response["exit_code"])
+            return
+
+    from pipenv_setup.main import cmd
+
+    cmd(argv)
+
+
+if __name__ == "__main__":
+    main()
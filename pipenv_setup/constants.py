@@ -16,3 +16,40 @@ class VersionConflict(Enum):
 
     # >=3.0 is compatible with >=2.0
     COMPATIBLE = "COMPATIBLE"
+
+
+class FindingKind(Enum):
+    # a version string in install_requires conflicts with the one in pipfile
+    VERSION_CONFLICT = "version-conflict"
+
+    # a vcs link in dependency_links is a plain version string in pipfile
+    NOT_VCS_IN_PIPFILE = "not-vcs-in-pipfile"
+
+    # a vcs link in dependency_links uses a vcs the pipfile package has no key for
+    VCS_KEY_MISSING = "vcs-key-missing"
+
+    URL_MISMATCH = "url-mismatch"
+    REF_MISSING_IN_DEPENDENCY_LINKS = "ref-missing-in-dependency-links"
+    REF_MISSING_IN_PIPFILE = "ref-missing-in-pipfile"
+    REF_MISMATCH = "ref-mismatch"
+
+    # a pipfile default package nowhere in setup.py
+    MISSING_IN_INSTALL_REQUIRES = "missing-in-install-requires"
+    MISSING_IN_DEPENDENCY_LINKS = "missing-in-dependency-links"
+
+    # the check could not be run, e.g. setup.py can not be parsed
+    ERROR = "error"
+
+
+class PackageKind(Enum):
+    # a version of a package from an index, possibly with extras and markers
+    PYPI = "pypi"
+
+    # a git/bzr/svn/hg repository
+    VCS = "vcs"
+
+    # a remote archive, e.g. a .zip url
+    FILE = "file"
+
+    # a path on this machine, never synced to setup.py
+    LOCAL = "local"
@@ -1,40 +1,21 @@
 """
 check inconsistency between Pipfile and setup.py
 """
+import re
 from string import digits
-from typing import List, Dict, Tuple, Iterable, Optional, Set, Any, Union
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional, Set, Any, Union
 
 import packaging.version
 from packaging.version import Version, LegacyVersion
 
-from pipenv_setup import pipfile_parser
+from pipenv_setup.constants import FindingKind
+from pipenv_setup.constants import PackageKind
 from pipenv_setup.constants import PipfileConfig
 from pipenv_setup.constants import VersionConflict
 from pipenv_setup.constants import vcs_list
-
-
-def lt(a):
-    return lambda x: a < x
-
-
-def le(a):
-    return lambda x: a <= x
-
-
-def eq(a):
-    return lambda x: a == x
-
-
-def gt(a):
-    return lambda x: a > x
-
-
-def ge(a):
-    return lambda x: a >= x
-
-
-def ne(a):
-    return lambda x: a != x
+from pipenv_setup.package import Package, normalize_name
+from pipenv_setup.parse_cache import memoized, parse_version
+from pipenv_setup.version_intervals import VersionIntervals
 
 
 class _VersionReqs:
@@ -43,9 +24,6 @@ class _VersionReqs:
         :param string: setup.py install_requires style e.g. '==1.3.2' '>=1.3, <2'
         """
         self._string = string
-        self._op_versions = self._parse_reqs(
-            string
-        )  # type: List[Tuple[str, Union[Version, LegacyVersion]]]
 
     @staticmethod
     def _parse_reqs(
@@ -90,11 +68,11 @@ class _VersionReqs:
                     if len(parts) >= 2:
                         parts[-2] = str(int(parts[-2]) + 1)
                     parts[-1] = "0"
-                    reqs.append((">=", packaging.version.parse(ver_string)))
+                    reqs.append((">=", parse_version(ver_string)))
                     if len(parts) > 1:
-                        reqs.append(("<", packaging.version.parse(".".join(parts))))
+                        reqs.append(("<", parse_version(".".join(parts))))
                 else:
-                    reqs.append((op_string, packaging.version.parse(ver_string)))
+                    reqs.append((op_string, parse_version(ver_string)))
         return reqs
 
     def analyze_compatibility(
@@ -102,103 +80,173 @@ class _VersionReqs:
     ):  # type: (str) -> Optional[VersionConflict]
         """
         :param pipfile_reqs: pipfile style version string
+        :raise ValueError: if a version string has an unrecognizable operator
         :return: conflicts or None when there's no conflicts
         """
-        pipfile_op_versions = self._parse_reqs(pipfile_reqs)
-        mapping = self._get_version_metric_mapping(
-            list(map(lambda x: x[1], self._op_versions + pipfile_op_versions))
+        setup_mask, pipfile_mask = _get_version_intervals(self._string).cell_masks(
+            _get_version_intervals(pipfile_reqs)
         )
-        setup_filtered = list(range(2 * len(mapping) + 1))
-        for op, version in self._op_versions:
-            setup_filtered = list(
-                self._filter_metric_by_op(op, mapping[version], setup_filtered)
-            )
-
-        pipfile_filtered = list(range(2 * len(mapping) + 1))
-        for op, version in pipfile_op_versions:
-            pipfile_filtered = list(
-                self._filter_metric_by_op(op, mapping[version], pipfile_filtered)
-            )
-        setup_filtered_set = set(setup_filtered)
-        pipfile_filtered_set = set(pipfile_filtered)
-        if setup_filtered_set == pipfile_filtered_set:
+        if setup_mask == pipfile_mask:
             return None
-        elif setup_filtered_set < pipfile_filtered_set:
+        elif setup_mask & ~pipfile_mask == 0:
             return VersionConflict.COMPATIBLE
+        elif setup_mask & pipfile_mask:
+            return VersionConflict.POTENTIAL
         else:
-            intersection = setup_filtered_set & pipfile_filtered_set
-            if intersection:
-                return VersionConflict.POTENTIAL
-            else:
-                return VersionConflict.DISJOINT
+            return VersionConflict.DISJOINT
 
     @staticmethod
-    def _filter_metric_by_op(
-        op, metric, space
-    ):  # type: (str, int, Iterable[int]) -> Iterable[int]
+    def _get_intervals(
+        op_versions,
+    ):  # type: (Iterable[Tuple[str, Union[Version, LegacyVersion]]]) -> VersionIntervals
         """
-        filter int in space that 'op's metric
-        :raise ValueError: for unrecognizable op
+        the versions satisfying every requirement
 
-        >>> list(_VersionReqs._filter_metric_by_op('==', 1, range(3)))
-        [1]
-        >>> list(_VersionReqs._filter_metric_by_op('<=', 1, range(3)))
-        [0, 1]
-        >>> list(_VersionReqs._filter_metric_by_op('<', 1, range(3)))
-        [0]
-        >>> list(_VersionReqs._filter_metric_by_op('>', 1, range(3)))
-        [2]
-        >>> list(_VersionReqs._filter_metric_by_op('>', 1, [0,1,2,3,4]))
-        [2, 3, 4]
-        >>> list(_VersionReqs._filter_metric_by_op('>=', 1, range(3)))
-        [1, 2]
-        >>> list(_VersionReqs._filter_metric_by_op('!=', 1, range(3)))
-        [0, 2]
-        """
-        if op == "==":
-            return filter(eq(metric), list(space))
-        elif op == ">=":
-            return filter(le(metric), list(space))
-        elif op == ">":
-            return filter(lt(metric), list(space))
-        elif op == "<":
-            return filter(gt(metric), list(space))
-        elif op == "<=":
-            return filter(ge(metric), list(space))
-        elif op == "!=":
-            return filter(ne(metric), list(space))
-        else:
-            raise ValueError("not recognizable version string operator: " + op)
+        :raise ValueError: for unrecognizable op
 
-    @staticmethod
-    def _get_version_metric_mapping(
-        versions,
-    ):  # type: (List[Union[Version, LegacyVersion]]) -> Dict[Union[Version, LegacyVersion], int]
-        """
         >>> parse = packaging.version.parse
-        >>> v0 = parse('1.0')
-        >>> v1 = parse('1.0')
-        >>> v2 = parse('1.1')
-        >>> v3 = parse('1.1.2')
-        >>> v4 = parse('1.2')
-        >>> v_list = [v1, v3, v0, v2, v4]
-        >>> assert _VersionReqs._get_version_metric_mapping(v_list) == {v0: 1, v2:3, v3:5, v4: 7}
-        """
-
-        mapping = dict()  # type: Dict[Union[Version, LegacyVersion], int]
-        # [packaging.version.parse('0.0')] is a hack to just add one meaningless element to the beginning
-        for i, v in enumerate(
-            [packaging.version.parse("0.0")] + sorted(list(set(versions)))
-        ):
-            if i == 0:
-                continue
-            mapping[v] = 2 * i - 1
-        return mapping
+        >>> _VersionReqs._get_intervals([('>=', parse('1.2')), ('!=', parse('1.3')), ('<', parse('2'))])
+        VersionIntervals('[1.2, 1.3) | (1.3, 2)')
+        >>> _VersionReqs._get_intervals([])
+        VersionIntervals('(*, *)')
+        """
+        intervals = VersionIntervals.everything()
+        for op, version in op_versions:
+            intervals &= VersionIntervals.from_operator(op, version)
+        return intervals
 
     def __str__(self):
         return self._string
 
 
+@memoized("version requirements")
+def _parse_version_reqs(
+    req_string,
+):  # type: (str) -> Tuple[Tuple[str, Union[Version, LegacyVersion]], ...]
+    """
+    `_VersionReqs._parse_reqs`, memoized
+    """
+    return tuple(_VersionReqs._parse_reqs(req_string))
+
+
+@memoized("version intervals")
+def _get_version_intervals(req_string):  # type: (str) -> VersionIntervals
+    """
+    the versions satisfying a version string, memoized
+
+    :raise ValueError: for unrecognizable op
+    """
+    return _VersionReqs._get_intervals(_parse_version_reqs(req_string))
+
+
+_vcs_prefixes = tuple(vcs_list)
+# name, then the version string up to the markers. "~" starts a version string like the comparison operators do
+_requirement_pattern = re.compile(r"([^=<>!~;]*)([^;]*)")
+# <vcs>+<url>[@<ref>]#egg=<name>, the ref is what follows the last "@" unless a "/" comes after it. The url is
+# matched greedily up to its last "/", only its last segment is searched for the "@". A url with neither has
+# "+<url>" for ref, as the character loop this replaces found
+_vcs_link_pattern = re.compile(
+    r"(?P<vcs>[^+]*)\+(?P<url>(?:.*/)?[^/]*?)(?:@(?P<ref>[^/@]*))?#egg=(?P<name>[^#]*)",
+    re.S,
+)
+
+
+@memoized("requirement lines")
+def _separate_name_version(package_string):  # type: (str) -> Tuple[str, str]
+    """
+    `InconsistencyChecker._separate_name_version`, memoized
+    """
+    name, version_reqs_string = _requirement_pattern.match(package_string).groups()  # type: ignore
+    return name.replace(" ", ""), version_reqs_string.replace(" ", "")
+
+
+@memoized("vcs links")
+def _parse_vcs_link(link):  # type: (str) -> Tuple[str, str, Optional[str], str]
+    """
+    `InconsistencyChecker._parse_vcs_link`, memoized
+
+    :raise ValueError: if can not understand link
+    """
+    match = _vcs_link_pattern.fullmatch(link)
+    if match is None:
+        if not link.rpartition("#")[2].startswith("egg="):
+            raise ValueError("Can not find egg= in link  %s" % link)
+        if "+" not in link:
+            raise ValueError("link %s does not have <vcs_name>+" % link)
+        raise ValueError("Can not understand link %s" % link)
+    vcs, url, ref, name = match.group("vcs", "url", "ref", "name")
+    if vcs == "" or url == "" or name == "":
+        raise ValueError("Can not understand link %s" % link)
+    if ref is None and "/" not in url:
+        ref = "+" + url
+    return vcs, url, ref, name
+
+
+class Finding:
+    """
+    an inconsistency between setup.py and Pipfile, the record written by `check --format ndjson/json`
+
+    `setup_spec` and `pipfile_spec` are what each file says about the package (a version string, a url, a
+    ref...), None when the file says nothing. `message` is the report printed by `check --format text`
+    """
+
+    __slots__ = ("kind", "package", "setup_spec", "pipfile_spec", "conflict", "message")
+
+    def __init__(
+        self, kind, package, setup_spec, pipfile_spec, message, conflict=None
+    ):  # type: (FindingKind, Optional[str], Optional[str], Optional[str], str, Optional[VersionConflict]) -> None
+        self.kind = kind
+        self.package = package
+        self.setup_spec = setup_spec
+        self.pipfile_spec = pipfile_spec
+        self.conflict = conflict
+        self.message = message
+
+    @classmethod
+    def error(cls, message):  # type: (str) -> Finding
+        """
+        the check could not be run
+        """
+        return cls(FindingKind.ERROR, None, None, None, message)
+
+    def to_dict(self):  # type: () -> Dict[str, Optional[str]]
+        """
+        >>> Finding(FindingKind.URL_MISMATCH, "django", "https://a.git", "https://b.git", "...").to_dict()["kind"]
+        'url-mismatch'
+        """
+        return {
+            "package": self.package,
+            "kind": self.kind.value,
+            "setup_spec": self.setup_spec,
+            "pipfile_spec": self.pipfile_spec,
+            "conflict": None if self.conflict is None else self.conflict.value,
+            "message": self.message,
+        }
+
+    @classmethod
+    def from_dict(cls, record):  # type: (Dict[str, Optional[str]]) -> Finding
+        """
+        the inverse of `to_dict`
+
+        :raise ValueError: for an unknown kind or conflict
+        """
+        conflict = record["conflict"]
+        return cls(
+            FindingKind(record["kind"]),
+            record["package"],
+            record["setup_spec"],
+            record["pipfile_spec"],
+            record["message"] or "",
+            None if conflict is None else VersionConflict(conflict),
+        )
+
+    def __eq__(self, other):  # type: (Any) -> bool
+        return isinstance(other, Finding) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):  # type: () -> str
+        return "Finding(%r)" % self.to_dict()
+
+
 class InconsistencyChecker:
     def __init__(
         self,
@@ -206,11 +254,11 @@ class InconsistencyChecker:
         dependency_links,
         pipfile_packages,
         strict,
-    ):  # type: (List[str], List[str], Dict[str, PipfileConfig], bool) -> None
+    ):  # type: (List[str], List[str], Dict[str, Union[Package, PipfileConfig]], bool) -> None
         """
         :param strict: whether to report compatible but not identical version requirements.
         If strict is True. Then "==1.3" and "~=1.2" will be a failing instance
-        :param pipfile_packages: default packages
+        :param pipfile_packages: default packages, as read by the parsers. Raw Pipfile configs are classified here
         """
 
         self._strict = strict
@@ -218,11 +266,21 @@ class InconsistencyChecker:
         self._install_requires_version_reqs = self._parse_install_requires(
             install_requires
         )
-        self._install_requires_package_names = (
-            self._install_requires_version_reqs.keys()
+        # PEP 503 names, extras left out: "Foo_Bar[baz]" in install_requires is the "foo.bar" pipfile package
+        self._install_requires_package_names = frozenset(
+            normalize_name(name) for name in self._install_requires_version_reqs
         )
         self._dependency_links = dependency_links
-        self._pipfile_packages = pipfile_packages
+        self._pipfile_packages = {
+            name: config
+            if isinstance(config, Package)
+            else Package.from_config(name, config)
+            for name, config in pipfile_packages.items()
+        }  # type: Dict[str, Package]
+        self._pipfile_index = {
+            package.normalized_name: package
+            for package in self._pipfile_packages.values()
+        }  # type: Dict[str, Package]
 
     @staticmethod
     def _separate_name_version(package_string):  # type: (str) -> Tuple[str, str]
@@ -236,23 +294,10 @@ class InconsistencyChecker:
         ('numpy', '==1.2.3,>1.2,<2')
         >>> InconsistencyChecker._separate_name_version("numpy")
         ('numpy', '')
+        >>> InconsistencyChecker._separate_name_version("numpy[tests] ~= 1.2")
+        ('numpy[tests]', '~=1.2')
         """
-        name = ""
-        version_reqs_string = ""
-
-        met_comp_ops = False
-
-        for c in package_string:
-            if c in ("=", "<", ">", "!"):
-                met_comp_ops = True
-            elif c == ";":  # met other markers, which we ignore
-                break
-            if c != " ":
-                if met_comp_ops:
-                    version_reqs_string += c
-                else:
-                    name += c
-        return name.replace(" ", ""), version_reqs_string.replace(" ", "")
+        return _separate_name_version(package_string)
 
     def _parse_install_requires(
         self, install_requires
@@ -286,27 +331,38 @@ class InconsistencyChecker:
         :raise ValueError: if some package in install_requires is not a pypi package in pipfile
         :return: string reports. Can be empty if there is no conflict
         """
-        report = []
-        for (
+        return [finding.message for finding in self.iter_install_requires_conflicts()]
+
+    def iter_install_requires_conflicts(self):  # type: () -> Iterator[Finding]
+        """
+        `check_install_requires_conflict`, one finding at a time
+
+        :raise ValueError: if some package in install_requires is not a pypi package in pipfile
+        """
+        for conflict in self._iter_install_requires_conflict():
+            finding = self._version_conflict_finding(conflict)
+            if finding is not None:
+                yield finding
+
+    def _version_conflict_finding(
+        self, conflict
+    ):  # type: (Tuple[str, str, str, VersionConflict]) -> Optional[Finding]
+        """
+        :return: None for a compatible version string, unless the check is strict
+        """
+        name, setup_config, pipfile_config, version_conflict = conflict
+        if not self._strict and version_conflict is VersionConflict.COMPATIBLE:
+            return None
+        return Finding(
+            FindingKind.VERSION_CONFLICT,
             name,
             setup_config,
             pipfile_config,
-            conflict,
-        ) in self._check_install_requires_conflict():
-            if self._strict:
-
-                report.append(
-                    self.format_version_report(
-                        name, setup_config, pipfile_config, conflict
-                    )
-                )
-            elif conflict is not VersionConflict.COMPATIBLE:
-                report.append(
-                    self.format_version_report(
-                        name, setup_config, pipfile_config, conflict
-                    )
-                )
-        return report
+            self.format_version_report(
+                name, setup_config, pipfile_config, version_conflict
+            ),
+            version_conflict,
+        )
 
     def _check_install_requires_conflict(
         self,
@@ -314,28 +370,36 @@ class InconsistencyChecker:
         """
         :return: A list of conflicts in the form of (package_name, setup_config, pipfile_config), empty for no conflict
         """
+        return list(self._iter_install_requires_conflict())
 
-        conflicts = []  # type: List[Tuple[str, str, str, VersionConflict]]
-        for name, vr in self._install_requires_version_reqs.items():
-            if name in self._pipfile_packages:
-                pipfile_config = self._pipfile_packages[name]
-                if not pipfile_parser.is_pypi_package(pipfile_config):
-                    raise ValueError(
-                        "package '%s' in install_requires is not a pypi package in pipfile"
-                        % name
-                    )
-                version_string = ""
-                if isinstance(pipfile_config, str):
-                    version_string = pipfile_config
-                else:  # dict
-                    if "version" in pipfile_config:
-                        version_string = pipfile_config["version"]
-                version_string = version_string.replace(" ", "")
-                conflict = vr.analyze_compatibility(version_string)
-                if conflict:
-                    conflicts.append((name, str(vr), version_string, conflict))
-
-        return conflicts
+    def _iter_install_requires_conflict(
+        self,
+    ):  # type: ()->Iterator[Tuple[str, str, str, VersionConflict]]
+        for name, version_reqs in self._install_requires_version_reqs.items():
+            conflict = self._install_requires_conflict(name, version_reqs)
+            if conflict is not None:
+                yield conflict
+
+    def _install_requires_conflict(
+        self, name, version_reqs
+    ):  # type: (str, _VersionReqs) -> Optional[Tuple[str, str, str, VersionConflict]]
+        """
+        :raise ValueError: if the package is not a pypi package in pipfile
+        :return: None when the package is not in pipfile or the version strings are identical
+        """
+        package = self._pipfile_index.get(normalize_name(name))
+        if package is None:
+            return None
+        if package.kind is not PackageKind.PYPI:
+            raise ValueError(
+                "package '%s' in install_requires is not a pypi package in pipfile"
+                % name
+            )
+        version_string = (package.specifier or "").replace(" ", "")
+        conflict = version_reqs.analyze_compatibility(version_string)
+        if conflict is None:
+            return None
+        return name, str(version_reqs), version_string, conflict
 
     @staticmethod
     def _is_vcs_link(link):  # type: (str) -> bool
@@ -349,7 +413,7 @@ class InconsistencyChecker:
         >>> InconsistencyChecker._is_vcs_link("svn+https://svn.com/have/no/idea/how/svn/link/looks/like")
         True
         """
-        return any([link.startswith(vcs) for vcs in vcs_list])
+        return link.startswith(_vcs_prefixes)
 
     @staticmethod
     def _parse_vcs_link(link):  # type: (str) -> Tuple[str, str, Optional[str], str]
@@ -362,134 +426,129 @@ class InconsistencyChecker:
         ('git', 'https://github.com/requests/requests.git', 'v2.20.1', 'requests')
         >>> InconsistencyChecker._parse_vcs_link('git+https://github.com/requests/requests.git#egg=requests')
         ('git', 'https://github.com/requests/requests.git', None, 'requests')
+        >>> InconsistencyChecker._parse_vcs_link('git+ssh://git@github.com/requests/requests.git#egg=requests')
+        ('git', 'ssh://git@github.com/requests/requests.git', None, 'requests')
         """
-        # todo: be less cringy (use some url parsing library?)
-        # https://pipenv-fork.readthedocs.io/en/latest/basics.html#a-note-about-vcs-dependencies
-        vcs = ""
-        url = ""
-        ref = ""  # type: Optional[str]
-        name = ""
-
-        plus_ind = -1
-        for i, c in enumerate(link):
-            if c == "+":
-                plus_ind = i
-                break
-            else:
-                vcs += c
-
-        hash_ind = -1
-        for i in range(len(link) - 1, -1, -1):
-            c = link[i]
-            if c == "#":
-                hash_ind = i
-                break
-            else:
-                name = c + name
-        if not name.startswith("egg="):
-            raise ValueError("Can not find egg= in link  %s" % link)
-        else:
-            name = name[4:]
-        if plus_ind == -1:
-            raise ValueError("link %s does not have <vcs_name>+" % link)
-
-        at_ind = -1
-        for i in range(hash_ind - 1, plus_ind - 1, -1):
-            c = link[i]
-            if c == "/":
-                ref = None
-                break
-            elif c == "@":
-                at_ind = i
-                break
-            else:
-                ref = c + ref  # type: ignore
-
-        if at_ind != -1:
-            url = link[plus_ind + 1 : at_ind]
-        else:
-            url = link[plus_ind + 1 : hash_ind]
-
-        if vcs == "" or url == "" or name == "":
-            raise ValueError("Can not understand link %s" % link)
-
-        return vcs, url, ref, name
+        return _parse_vcs_link(link)
 
     def check_dependency_links_conflict(self):  # type: () -> List[str]
         """
         :return A list of conflicts formatted as strings, can be empty when there's no conflict
         :raise ValueError: if check fails (e.g. can not parse dependency_links in setup.py)
         """
-        msgs = []
+        return [finding.message for finding in self.iter_dependency_links_conflicts()]
+
+    def iter_dependency_links_conflicts(self):  # type: () -> Iterator[Finding]
+        """
+        `check_dependency_links_conflict`, one finding at a time
+
+        :raise ValueError: if check fails (e.g. can not parse dependency_links in setup.py)
+        """
         for link in self._dependency_links:
             if self._is_vcs_link(link):
                 # raises value error
                 vcs, url, ref, name = self._parse_vcs_link(link)
-                if name in self._pipfile_packages:
-                    config_in_pipfile = self._pipfile_packages[name]
-                    if isinstance(config_in_pipfile, str):
-                        msgs.append(
-                            "%s package '%s' specified in dependency_links is not a vcs package in pipfile"
-                            % (vcs, name)
-                        )
-                        continue
-                    if vcs not in config_in_pipfile:
-                        msgs.append(
-                            "package '%s' lacks '%s' key in pipfile" % (name, vcs)
-                        )
-                    elif url != config_in_pipfile[vcs]:
-                        msgs.append(
-                            "package '%s' has url %s in pipfile, which is different than %s in dependency links"
-                            % (name, config_in_pipfile[vcs], url)
-                        )
-                    if ref is None and "ref" in config_in_pipfile:
-                        msgs.append(
-                            "package '%s' has branch/version %s in pipfile but it's not specified in dependency_links"
-                            % (name, config_in_pipfile["ref"])
-                        )
-                    if ref is not None and "ref" not in config_in_pipfile:
-                        msgs.append(
-                            "package '%s' has branch/version %s in dependency_links but not in pipfile"
-                            % (name, ref)
-                        )
-                    if (
-                        ref is not None
-                        and "ref" in config_in_pipfile
-                        and config_in_pipfile["ref"] != ref
-                    ):
-                        msgs.append(
-                            "package '%s' has branch/version %s in dependency_links, which is different "
-                            "than %s listed in pipfile"
-                            % (name, ref, config_in_pipfile["ref"])
-                        )
-
-        return msgs
+                yield from self._iter_vcs_link_conflicts(link, vcs, url, ref, name)
+
+    def _iter_vcs_link_conflicts(
+        self, link, vcs, url, ref, name
+    ):  # type: (str, str, str, Optional[str], str) -> Iterator[Finding]
+        """
+        compare a parsed vcs link with the pipfile package it names, if any
+
+        a bare version string in pipfile is not a vcs package, a table without the vcs key of the link lacks it and
+        is still compared by ref
+        """
+        package = self._pipfile_index.get(normalize_name(name))
+        if package is None:
+            return
+        if not package.table:
+            yield Finding(
+                FindingKind.NOT_VCS_IN_PIPFILE,
+                name,
+                link,
+                package.specifier,
+                "%s package '%s' specified in dependency_links is not a vcs package in pipfile"
+                % (vcs, name),
+            )
+            return
+        if package.vcs != vcs:
+            yield Finding(
+                FindingKind.VCS_KEY_MISSING,
+                name,
+                link,
+                None,
+                "package '%s' lacks '%s' key in pipfile" % (name, vcs),
+            )
+        elif url != package.url:
+            yield Finding(
+                FindingKind.URL_MISMATCH,
+                name,
+                url,
+                package.url,
+                "package '%s' has url %s in pipfile, which is different than %s in dependency links"
+                % (name, package.url, url),
+            )
+        if ref is None and package.ref is not None:
+            yield Finding(
+                FindingKind.REF_MISSING_IN_DEPENDENCY_LINKS,
+                name,
+                None,
+                package.ref,
+                "package '%s' has branch/version %s in pipfile but it's not specified in dependency_links"
+                % (name, package.ref),
+            )
+        if ref is not None and package.ref is None:
+            yield Finding(
+                FindingKind.REF_MISSING_IN_PIPFILE,
+                name,
+                ref,
+                None,
+                "package '%s' has branch/version %s in dependency_links but not in pipfile"
+                % (name, ref),
+            )
+        if ref is not None and package.ref is not None and package.ref != ref:
+            yield Finding(
+                FindingKind.REF_MISMATCH,
+                name,
+                ref,
+                package.ref,
+                "package '%s' has branch/version %s in dependency_links, which is different "
+                "than %s listed in pipfile" % (name, ref, package.ref),
+            )
 
     def check_lacking_install_requires(self):  # type: () -> List[str]
         """
         report pypi packages that are in pipfile default package but not in install_requires
         """
-        reports = []
-        for name, config in self._pipfile_packages.items():
-            # fixes https://github.com/Madoshakalaka/pipenv-setup/issues/72
-            # if the Pipfile has a dependency with an underscore then
-            # it will be synced to the setup.py file with a dash
-            # before this commit `pipenv-setup check` would check for a
-            # dependency exactly as defined in the Pipfile
-            # this would fail as `package_name` does not equal
-            # `package-name`
-            name = name.replace("_", "-")
-            if pipfile_parser.is_pypi_package(config):
-                if (
-                    name not in self._install_requires_package_names
-                    and not pipfile_parser.is_name_with_extras_in_install_requires_package_names(
-                        name, config, self._install_requires_package_names
-                    )
-                ):
-                    reports.append(
-                        "package '%s' in pipfile but not in install_requires" % name
-                    )
-        return reports
+        return [finding.message for finding in self.iter_lacking_install_requires()]
+
+    def iter_lacking_install_requires(self):  # type: () -> Iterator[Finding]
+        """
+        `check_lacking_install_requires`, one finding at a time
+        """
+        for name, package in self._pipfile_packages.items():
+            finding = self._lacking_install_requires(name, package)
+            if finding is not None:
+                yield finding
+
+    def _lacking_install_requires(
+        self, name, package
+    ):  # type: (str, Package) -> Optional[Finding]
+        if package.kind is not PackageKind.PYPI:
+            return None
+        if package.normalized_name in self._install_requires_package_names:
+            return None
+        # names are compared normalized, see https://github.com/Madoshakalaka/pipenv-setup/issues/72:
+        # `package_name` in the Pipfile is synced as `package-name`. It is reported the way it is synced
+        name = name.replace("_", "-")
+        return Finding(
+            FindingKind.MISSING_IN_INSTALL_REQUIRES,
+            name,
+            None,
+            package.specifier,
+            "package '%s' in pipfile but not in install_requires" % name,
+        )
 
     def check_lacking_dependency_links(self):  # type: ()->List[str]
         """
@@ -497,8 +556,15 @@ class InconsistencyChecker:
 
         :raise ValueError: if dependency_links can not be recognized
         """
-        # parse dependency_links
-        # name: vcs, url, ref
+        return [finding.message for finding in self.iter_lacking_dependency_links()]
+
+    def iter_lacking_dependency_links(self):  # type: () -> Iterator[Finding]
+        """
+        `check_lacking_dependency_links`, one finding at a time
+
+        :raise ValueError: if dependency_links can not be recognized
+        """
+        # normalized names of the vcs links, and the other links
         vcs_dependency_names = set()  # type: Set[str]
         file_dependency_links = set()  # type: Set[str]
 
@@ -506,25 +572,78 @@ class InconsistencyChecker:
         for link in self._dependency_links:
             if self._is_vcs_link(link):
                 _, _, _, name = self._parse_vcs_link(link)
-                vcs_dependency_names.add(name)
+                vcs_dependency_names.add(normalize_name(name))
+            else:
+                file_dependency_links.add(link)
+        for name, package in self._pipfile_packages.items():
+            finding = self._lacking_dependency_link(
+                name, package, vcs_dependency_names, file_dependency_links
+            )
+            if finding is not None:
+                yield finding
+
+    @staticmethod
+    def _lacking_dependency_link(
+        name, package, vcs_dependency_names, file_dependency_links
+    ):  # type: (str, Package, Set[str], Set[str]) -> Optional[Finding]
+        if package.kind is PackageKind.VCS:
+            if package.normalized_name not in vcs_dependency_names:
+                return Finding(
+                    FindingKind.MISSING_IN_DEPENDENCY_LINKS,
+                    name,
+                    None,
+                    package.url,
+                    "vcs package '%s' in pipfile but not in dependency_links" % name,
+                )
+        elif package.kind is PackageKind.FILE:
+            if package.url not in file_dependency_links:
+                return Finding(
+                    FindingKind.MISSING_IN_DEPENDENCY_LINKS,
+                    name,
+                    None,
+                    package.url,
+                    "package '%s' has a url in pipfile but not in dependency_links"
+                    % name,
+                )
+        return None
+
+    def iter_findings(self):  # type: () -> Iterator[Finding]
+        """
+        every finding of the four checks, in the order `check` reports them, yielded as soon as it is found
+
+        The checks are fused: install_requires, dependency_links and the pipfile packages are each walked once,
+        every lookup goes through the name indexes. A consumer that stops at the first finding skips the rest of
+        the work
+
+        :raise ValueError: when a check can not be run, the findings of the checks before it have been yielded
+        """
+        for name, version_reqs in self._install_requires_version_reqs.items():
+            conflict = self._install_requires_conflict(name, version_reqs)
+            if conflict is not None:
+                finding = self._version_conflict_finding(conflict)
+                if finding is not None:
+                    yield finding
+
+        vcs_dependency_names = set()  # type: Set[str]
+        file_dependency_links = set()  # type: Set[str]
+        for link in self._dependency_links:
+            if self._is_vcs_link(link):
+                vcs, url, ref, name = self._parse_vcs_link(link)
+                vcs_dependency_names.add(normalize_name(name))
+                yield from self._iter_vcs_link_conflicts(link, vcs, url, ref, name)
             else:
                 file_dependency_links.add(link)
-        reports = []
-        for name, config in self._pipfile_packages.items():
-            if pipfile_parser.is_remote_package(
-                config
-            ) and not pipfile_parser.is_pypi_package(config):
-                if pipfile_parser.is_vcs_package(config):
-                    if name not in vcs_dependency_names:
-                        reports.append(
-                            "vcs package '%s' in pipfile but not in dependency_links"
-                            % name
-                        )
-                elif "file" in config:
-                    assert isinstance(config, dict)
-                    if config["file"] not in file_dependency_links:
-                        reports.append(
-                            "package '%s' has a url in pipfile but not in dependency_links"
-                            % name
-                        )
-        return reports
+
+        # reported after every package missing in install_requires, as the separate checks do
+        lacking_dependency_links = []  # type: List[Finding]
+        for name, package in self._pipfile_packages.items():
+            finding = self._lacking_install_requires(name, package)
+            if finding is not None:
+                yield finding
+                continue
+            finding = self._lacking_dependency_link(
+                name, package, vcs_dependency_names, file_dependency_links
+            )
+            if finding is not None:
+                lacking_dependency_links.append(finding)
+        yield from lacking_dependency_links
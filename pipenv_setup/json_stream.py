@@ -0,0 +1,189 @@
+"""
+incremental reading of a json document, a chunk of the file at a time
+
+Only the values asked for are built, the others are only scanned for brackets, so that reading a few keys of a huge
+document needs memory for a chunk and the largest value read rather than for the whole document.
+"""
+import json
+import re
+from typing import IO, Any, Iterator, Match, Optional, Pattern
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_string = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# a string, a structural character, or a number / true / false / null
+_token_pattern = re.compile(r'\s*(%s|[{}\[\]:,]|[^\s{}\[\]:,"]+)' % _string, re.S)
+_whitespace = " \t\n\r"
+_whitespace_pattern = re.compile(r"[ \t\n\r]*")
+# strings and anything else but brackets
+_skipped_pattern = re.compile(r'(?:%s|[^"{}\[\]]+)*' % _string, re.S)
+# an object key with its colon, then what follows a value in an object
+_key_pattern = re.compile(r"[ \t\n\r]*(%s)[ \t\n\r]*:[ \t\n\r]*" % _string, re.S)
+_scalar_pattern = re.compile(r"[^,}\][ \t\n\r]*")
+_separator_pattern = re.compile(r"[ \t\n\r]*([,}])")
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    """
+    A cursor over a json document read from a text file.
+
+    >>> import io
+    >>> stream = JsonStream(io.StringIO('{"a": {"x": [1, 2]}, "b": {"y": 3, "z": "4"}}'), chunk_size=4)
+    >>> for key in stream.iter_object():
+    ...     if key == "a":
+    ...         stream.skip_value()
+    ...     else:
+    ...         print({name: stream.read_value() for name in stream.iter_object()})
+    {'y': 3, 'z': '4'}
+    """
+
+    def __init__(
+        self, file, chunk_size=DEFAULT_CHUNK_SIZE
+    ):  # type: (IO[str], int) -> None
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self):  # type: () -> bool
+        """
+        drop what has been consumed and append the next chunk
+
+        :return: False at the end of the file
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        if not chunk:
+            self._eof = True
+        return bool(chunk)
+
+    def peek(self):  # type: () -> str
+        """
+        :return: the next character that is not whitespace, without consuming it. "" at the end of the document
+        """
+        if self._position < len(self._buffer):
+            character = self._buffer[self._position]
+            if character not in _whitespace:
+                return character
+        while True:
+            self._position = _whitespace_pattern.match(
+                self._buffer, self._position
+            ).end()  # type: ignore
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def _expect(self, character):  # type: (str) -> None
+        """
+        :raise ValueError: if the next character is not `character`
+        """
+        found = self.peek()
+        if found != character:
+            raise ValueError(
+                "expected %r, found %r in json document" % (character, found or "EOF")
+            )
+        self._position += 1
+
+    def read_value(self):  # type: () -> Any
+        """
+        consume and build the next value
+
+        :raise ValueError: if the document is not valid json
+        """
+        if self.peek() not in ('"', "{", "["):
+            # a number is only known to be whole once what follows it is read
+            while (
+                _scalar_pattern.match(self._buffer, self._position).end()  # type: ignore
+                == len(self._buffer)
+                and self._fill()
+            ):
+                pass
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except ValueError:
+                # the value is cut by the end of the buffer
+                if self._fill():
+                    continue
+                raise
+            self._position = end
+            return value
+
+    def _next_token(self):  # type: () -> str
+        while True:
+            match = _token_pattern.match(self._buffer, self._position)
+            # a token at the end of the buffer may go on in the next chunk
+            if match is None or match.end() == len(self._buffer):
+                if self._fill():
+                    continue
+                if match is None:
+                    raise ValueError("invalid or truncated json document")
+            self._position = match.end()
+            return match.group(1)
+
+    def skip_value(self):  # type: () -> None
+        """
+        consume the next value without building it. Strings are only matched, their escapes are not decoded
+
+        :raise ValueError: if the document is not valid json
+        """
+        token = self._next_token()
+        if token in ("}", "]", ":", ","):
+            raise ValueError("unexpected %r in json document" % token)
+        depth = 1 if token in ("{", "[") else 0
+        while depth:
+            # everything up to the next bracket that is not in a string, at once
+            self._position = _skipped_pattern.match(
+                self._buffer, self._position
+            ).end()  # type: ignore
+            if (
+                self._position == len(self._buffer)
+                or self._buffer[self._position] == '"'
+            ):
+                # a string is cut by the end of the buffer
+                if not self._fill():
+                    raise ValueError("truncated json document")
+                continue
+            depth += 1 if self._buffer[self._position] in "{[" else -1
+            self._position += 1
+
+    def _match(self, pattern):  # type: (Pattern[str]) -> Optional[Match[str]]
+        """
+        consume a match of `pattern` at the cursor, reading more of the file while the match could go on in it
+        """
+        while True:
+            match = pattern.match(self._buffer, self._position)
+            if (match is None or match.end() == len(self._buffer)) and self._fill():
+                continue
+            if match is not None:
+                self._position = match.end()
+            return match
+
+    def iter_object(self):  # type: () -> Iterator[str]
+        """
+        consume an object, yielding its keys. The value of each key must be consumed with `read_value`,
+        `skip_value` or `iter_object` before asking for the next key
+
+        :raise ValueError: if the next value is not an object, or the document is not valid json
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self._position += 1
+            return
+        while True:
+            match = self._match(_key_pattern)
+            if match is None:
+                raise ValueError("expected an object key in json document")
+            key = match.group(1)
+            yield _decoder.decode(key) if "\\" in key else key[1:-1]
+            match = self._match(_separator_pattern)
+            if match is None:
+                raise ValueError("expected ',' or '}' in json document")
+            if match.group(1) == "}":
+                return
@@ -1,17 +1,42 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Iterator, Optional, Any, Union, TYPE_CHECKING
 
-try:
-    from requirementslib import Lockfile
-except AssertionError:
-    import os
+from pathlib import Path
 
-    os.environ["SETUPTOOLS_USE_DISTUTILS"] = "stdlib"
+from pipenv_setup.constants import LockConfig, PackageKind, vcs_list
+from pipenv_setup.json_stream import JsonStream
+from pipenv_setup.package import Package
+from pipenv_setup.requirement_formatter import (
+    format_requirement_line,
+    format_vcs_package,
+)
+from pipenv_setup.timing import span
+
+if TYPE_CHECKING:
     from requirementslib import Lockfile
 
-from requirementslib import Requirement
-from pathlib import Path
 
-from pipenv_setup.constants import LockConfig
+def import_requirementslib():  # type: () -> Any
+    """
+    import requirementslib on demand, it is slow to import and most code paths do not need it
+    """
+    try:
+        import requirementslib
+    except AssertionError:
+        import os
+
+        os.environ["SETUPTOOLS_USE_DISTUTILS"] = "stdlib"
+        import requirementslib
+    return requirementslib
+
+
+# keys of a Pipfile.lock entry that the native reader knows how to carry over
+_known_entry_keys = frozenset(
+    ["version", "markers", "extras", "file", "path", "editable", "index", "hashes"]
+    + ["ref", "subdirectory"]
+    + vcs_list
+)
+# an entry needs at least one of these to be understood
+_locating_entry_keys = frozenset(["version", "file", "path"] + vcs_list)
 
 
 def is_remote_package(config):  # type: (LockConfig) -> bool
@@ -26,102 +51,222 @@ def is_remote_package(config):  # type: (LockConfig) -> bool
 
 
 def format_remote_package(
-    package_name: str, config: LockConfig, dev=False, use_dependency_links=False
+    package_name: str,
+    config: Union[LockConfig, Package],
+    dev=False,
+    use_dependency_links=False,
 ) -> Tuple[str, str]:
     """
     format and return a string that can be put into either install_requires or dependency_links or extras_require
 
     :param package_name:
-    :param config:
+    :param config: a Pipfile.lock config or the package read from it
     :param dev: is package a development package
     :param use_dependency_links: use deprecated dependency_links field
     :return: Tuple[keyword_target, list_argument]
     :raise ValueError: if a package config is not understood
     """
+    package = (
+        config
+        if isinstance(config, Package)
+        else Package.from_config(package_name, config)
+    )
     if dev:
         return (
             "extras_require",
-            Requirement.from_pipfile(package_name, config).as_line(
-                include_hashes=False
-            ),
+            format_requirement_line(package_name, package),
         )
     else:
         # fixme: stronger checks?
         # https://setuptools.readthedocs.io/en/latest/setuptools.html#dependencies-that-aren-t-in-pypi
-        if "file" in config:  # remote built distribution '.zip' file for example
+        if (
+            package.kind is PackageKind.FILE
+        ):  # remote built distribution '.zip' file for example
+            assert package.url is not None
             if use_dependency_links:
-                return "dependency_links", config["file"]
+                return "dependency_links", package.url
             else:
-                return "install_requires", config["file"]
-        if "version" in config:  # pypi package
+                return "install_requires", package.url
+        if package.specifier is not None:  # pypi package
             return (
                 "install_requires",
-                Requirement.from_pipfile(package_name, config).as_line(
-                    include_hashes=False
-                ),
+                format_requirement_line(package_name, package),
             )
         else:  # vcs
-            if "git" in config:
-                vcs = "git"
-            # fixme: test cases other than git
-            elif "bzr" in config:
-                vcs = "bzr"
-            elif "svn" in config:
-                vcs = "svn"
-            elif "hg" in config:
-                vcs = "hg"
-            else:
-                raise ValueError(
-                    "Can not understand config of package %s" % package_name
-                )
+            return format_vcs_package(package_name, package, use_dependency_links)
 
-            link = "{vcs}+{link}".format(vcs=vcs, link=config[vcs])
-            if "ref" in config:
-                link += "@" + config["ref"]
 
-            if use_dependency_links:
-                link += "#egg=" + package_name
-                return "dependency_links", link
-            else:
-                link = "{package_name} @ {link}".format(
-                    package_name=package_name, link=link
+def read_entry(config):  # type: (Any) -> Optional[LockConfig]
+    """
+    build a LockConfig straight from a raw Pipfile.lock entry, leaving out its hashes
+
+    :return: None if the entry is not understood and should be read by requirementslib instead
+
+    >>> read_entry({"hashes": ["sha256:abc"], "version": "==1.0", "markers": "os_name == 'nt'"})
+    {'version': '==1.0', 'markers': "os_name == 'nt'"}
+    >>> read_entry({"git": "https://github.com/django/django.git", "ref": "1.11.4"})
+    {'git': 'https://github.com/django/django.git', 'ref': '1.11.4'}
+    >>> read_entry({"editable": True, "lmfao": "https://github.com/django/django.git"}) is None
+    True
+    """
+    if (
+        not isinstance(config, dict)
+        or not _known_entry_keys.issuperset(config)
+        or _locating_entry_keys.isdisjoint(config)
+    ):
+        return None
+    return {key: value for key, value in config.items() if key != "hashes"}
+
+
+def iter_lockfile_entries(
+    lockfile_path, sections=("default", "develop")
+):  # type: (Path, Tuple[str, ...]) -> Iterator[Tuple[str, str, Any]]
+    """
+    read the entries of a Pipfile.lock one at a time, without ever holding the whole file or any list of hashes
+
+    The hashes of each entry are skipped unread, as are the other sections and `_meta`, so the memory used does
+    not grow with the size of the file.
+
+    :param sections: the sections to read the entries of
+    :return: (section, package name, raw entry without its hashes) triples, in the order of the file
+    :raise OSError: if the file can not be read
+    :raise ValueError: if it is not a json object of objects, or one of `sections` is missing
+    """
+    missing_sections = set(sections)
+    with open(str(lockfile_path), encoding="utf-8") as lockfile:
+        stream = JsonStream(lockfile)
+        for section in stream.iter_object():
+            if section not in sections:
+                stream.skip_value()
+                continue
+            missing_sections.discard(section)
+            for package_name in stream.iter_object():
+                if stream.peek() != "{":
+                    yield section, package_name, stream.read_value()
+                    continue
+                config = {}  # type: Dict[str, Any]
+                for key in stream.iter_object():
+                    if key == "hashes":
+                        stream.skip_value()
+                    else:
+                        config[key] = stream.read_value()
+                yield section, package_name, config
+        if stream.peek():
+            raise ValueError("extra data after the json document")
+    if missing_sections:
+        raise ValueError(
+            "no %s section in %s" % (", ".join(sorted(missing_sections)), lockfile_path)
+        )
+
+
+def _classify_packages(
+    packages,
+):  # type: (Dict[str, LockConfig]) -> Tuple[Dict[str, Package], Dict[str, Package]]
+    """
+    read the packages of one lockfile section and split them into local packages and remote packages
+    """
+    local_packages = {}  # type: Dict[str, Package]
+    remote_packages = {}  # type: Dict[str, Package]
+    for package_name, config in packages.items():
+        package = Package.from_config(package_name, config)
+        if package.kind is PackageKind.LOCAL:
+            local_packages[package_name] = package
+        else:
+            remote_packages[package_name] = package
+    return local_packages, remote_packages
+
+
+class LockfileSession:
+    """
+    A Pipfile.lock that is read and parsed only once.
+
+    Local and remote packages of both the default and the develop section are classified up front, so that
+    `sync --dev` and `check --lockfile` are served from a single load of the lockfile.
+    """
+
+    def __init__(self, lockfile_path):  # type: (Path) -> None
+        self._lockfile_path = lockfile_path
+        self._lockfile = None  # type: Optional[Lockfile]
+        try:
+            default_section = {}  # type: Dict[str, Any]
+            develop_section = {}  # type: Dict[str, Any]
+            for section, package_name, config in iter_lockfile_entries(lockfile_path):
+                if section == "default":
+                    default_section[package_name] = config
+                else:
+                    develop_section[package_name] = config
+        except (OSError, ValueError):
+            # let requirementslib handle (and report) anything unusual
+            default_section = self._get_requirementslib_lockfile().get_deps()
+            develop_section = self._get_requirementslib_lockfile().get_deps(dev=True)
+
+        self._default_packages = _classify_packages(
+            self._read_section(default_section, dev=False)
+        )
+        self._dev_packages = _classify_packages(
+            self._read_section(develop_section, dev=True)
+        )
+
+    def _get_requirementslib_lockfile(self):  # type: () -> Lockfile
+        if self._lockfile is None:
+            requirementslib = import_requirementslib()
+            with span("requirementslib Lockfile.create"):
+                self._lockfile = requirementslib.Lockfile.create(
+                    str(self._lockfile_path.parent)
                 )
-                return "install_requires", link
+        return self._lockfile
+
+    def _read_section(
+        self, section, dev
+    ):  # type: (Dict[str, Any], bool) -> Dict[str, LockConfig]
+        """
+        read entries of a lockfile section natively, falling back to requirementslib for entries that are not
+        understood
+        """
+        packages = {}  # type: Dict[str, LockConfig]
+        for package_name, raw_config in section.items():
+            config = read_entry(raw_config)
+            if config is None:
+                config = self._get_requirementslib_lockfile().get_deps(dev=dev)[
+                    package_name
+                ]
+            packages[package_name] = config
+        return packages
+
+    def get_default_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        """
+        return local packages and remote packages in default packages (not dev)
+        """
+        return self._default_packages
+
+    def get_dev_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        """
+        return ONLY development packages.
+
+        :return: a tuple of local packages and dev packages
+        """
+        return self._dev_packages
 
 
 def get_default_packages(
     lockfile_path,
-):  # type: (Path) -> Tuple[Dict[str, LockConfig], Dict[str, LockConfig]]
+):  # type: (Path) -> Tuple[Dict[str, Package], Dict[str, Package]]
     """
     return local packages and remote packages in default packages (not dev)
     """
-    local_packages = {}  # type: Dict[str, LockConfig]
-    remote_packages = {}  # type: Dict[str, LockConfig]
-    for package_name, config in (
-        Lockfile.create(lockfile_path.parent).get_deps().items()
-    ):
-        if is_remote_package(config):
-            remote_packages[package_name] = config
-        else:
-            local_packages[package_name] = config
-    return local_packages, remote_packages
+    return LockfileSession(lockfile_path).get_default_packages()
 
 
 def get_dev_packages(
     lockfile_path,
-):  # type: (Path) -> Tuple[Dict[str, LockConfig], Dict[str, LockConfig]]
+):  # type: (Path) -> Tuple[Dict[str, Package], Dict[str, Package]]
     """
     return ONLY development packages.
 
     :return: a tuple of local packages and dev packages
     """
-    local_packages = {}  # type: Dict[str, LockConfig]
-    remote_packages = {}  # type: Dict[str, LockConfig]
-    for package_name, config in (
-        Lockfile.create(str(lockfile_path.parent)).get_deps(dev=True).items()
-    ):
-        if is_remote_package(config):
-            remote_packages[package_name] = config
-        else:
-            local_packages[package_name] = config
-    return local_packages, remote_packages
+    return LockfileSession(lockfile_path).get_dev_packages()
@@ -1,21 +1,30 @@
 import argparse
+import json
 import sys
-from sys import stderr
-from typing import List, Union, Iterable, Text, NoReturn
+import time
+from typing import (
+    Any,
+    Dict,
+    List,
+    Union,
+    Iterable,
+    Iterator,
+    Text,
+    NoReturn,
+    Type,
+    TYPE_CHECKING,
+)
 from colorama import Fore, init
 from pathlib import Path
-from pipenv_setup import (
-    lockfile_parser,
-    setup_filler,
-    setup_updater,
-    pipfile_parser,
-    setup_parser,
-    msg_formatter,
-)
+from pipenv_setup import msg_formatter, timing
+from pipenv_setup.cache import CACHE_DIR_NAME
+from pipenv_setup.constants import FindingKind
 
-# noinspection Mypy
-from .inconsistency_checker import InconsistencyChecker
-from .setup_updater import format_file
+# the parsers (requirementslib, pipfile, packaging) and black are slow to import, they are imported by the
+# subcommands that need them so that `--help` and `check` start quickly
+if TYPE_CHECKING:
+    from pipenv_setup import lockfile_parser, pipfile_parser
+    from pipenv_setup.inconsistency_checker import Finding
 
 # todo: fix version conflict report: "is a subset of {empty string} in pipfile"
 # should report empty requirement as an asterisk
@@ -26,6 +35,17 @@ def cmd(argv=None):
         argv = sys.argv
 
     init()
+    run(argv)
+
+
+def run(argv):  # type: (List[str]) -> None
+    """
+    parse the command line and run the subcommand, without setting up the console. Output goes to the current
+    `sys.stdout` and `sys.stderr`
+
+    :param argv: the command line, program name included
+    :raise SystemExit: when the subcommand fails or the command line is wrong
+    """
     parser = argparse.ArgumentParser(
         description="sync Pipfile.lock with setup.py",
         formatter_class=argparse.RawTextHelpFormatter,
@@ -87,15 +107,158 @@ def cmd(argv=None):
         " By default, the dependencies from setup.py are checked against the Pipfile.",
     )
 
+    check_parser.add_argument(
+        "-w",
+        "--workspace",
+        metavar="DIR",
+        help="check every project (a directory with a Pipfile and a setup.py) found under DIR instead of the"
+        " current directory, exits with 1 if any of them fails",
+    )
+
+    check_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of processes checking the projects of --workspace in parallel. Defaults to the number of CPUs",
+    )
+
+    check_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("text", "ndjson", "json"),
+        default="text",
+        help="text: colored reports on stderr (default). ndjson: one json record per problem on stdout, written"
+        " as soon as it is found. json: the same records in a json array",
+    )
+
+    check_parser.add_argument(
+        "-x",
+        "--fail-fast",
+        action="store_true",
+        help="stop at the first problem and report only it. With --workspace, stop at the first failing project",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="sync setup.py again every time Pipfile.lock (or Pipfile with --pipfile) changes, until interrupted",
+    )
+
+    watch_parser.add_argument(
+        "-p",
+        "--pipfile",
+        action="store_true",
+        help="watch and sync Pipfile instead of Pipfile.lock",
+    )
+
+    watch_parser.add_argument(
+        "-d",
+        "--dev",
+        action="store_true",
+        help="also sync development packages to extras [dev] in setup.py",
+    )
+
+    watch_parser.add_argument(
+        "--use-dependency-links",
+        action="store_true",
+        help="write vcs dependencies to deprecated dependency_links field instead of install_requires",
+    )
+
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.2,
+        metavar="SECONDS",
+        help="wait for the file to stay unchanged that long before syncing. Defaults to 0.2",
+    )
+
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="notice changes by checking the file periodically instead of through inotify."
+        " Polling is used anyway where inotify is not available",
+    )
+
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="time between two checks of the file when polling. Defaults to 0.5",
+    )
+
+    for subparser in (sync_parser, watch_parser):
+        subparser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="edit the dependency lists of setup.py element by element, only the packages that changed,"
+            " instead of rewriting them. Lists not laid out one element per line are rewritten anyway",
+        )
+
+    for subparser in (sync_parser, check_parser, watch_parser):
+        subparser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="do not read or write the parse/check results cached in %s"
+            % CACHE_DIR_NAME,
+        )
+
+    for subparser in (sync_parser, check_parser):
+        subparser.add_argument(
+            "--timings",
+            action="store_true",
+            help="print the time spent in each phase (parsing, checking, formatting...) to stderr",
+        )
+        subparser.add_argument(
+            "--profile",
+            metavar="FILE",
+            help="write cProfile statistics of the command to FILE, to read with python -m pstats FILE",
+        )
+        subparser.add_argument(
+            "--trace",
+            metavar="FILE",
+            help="write the phases as Chrome trace events to FILE, to open in chrome://tracing or ui.perfetto.dev",
+        )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="keep the parsers loaded and run the check and sync commands forwarded by pipenv-setup-client,\n"
+        " until interrupted",
+    )
+
+    serve_parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="the Unix socket to listen on. Defaults to $PIPENV_SETUP_SOCKET, or pipenv-setup-<uid>.sock in"
+        " $XDG_RUNTIME_DIR or the temporary directory",
+    )
+
     if len(argv[1:]) == 0:
         parser.print_help()
     else:
-        argv = parser.parse_args(argv[1:])
-
-        if argv.command_name == "sync":
-            sync(argv)
-        elif argv.command_name == "check":
-            check(argv)
+        args = parser.parse_args(argv[1:])
+
+        if args.command_name in ("sync", "check"):
+            with timing.instrument(
+                args.command_name,
+                args.timings,
+                Path(args.profile) if args.profile else None,
+                Path(args.trace) if args.trace else None,
+            ):
+                if args.command_name == "sync":
+                    sync(args)
+                else:
+                    check(args)
+        elif args.command_name == "watch":
+            from pipenv_setup import watcher
+
+            watcher.watch(args)
+        elif args.command_name == "serve":
+            from pipenv_setup import client, server
+
+            server.serve(
+                Path(args.socket) if args.socket else client.default_socket_path()
+            )
 
 
 def congratulate(msg):  # type: (Union[Text, Iterable[Text]]) -> None
@@ -123,73 +286,175 @@ def fatal_error(msg):  # type: (Union[Text, List[Text]]) -> NoReturn
     :raise TypeError: if msg is of wrong type
     """
     if isinstance(msg, str):
-        print(msg, file=stderr)
+        print(msg, file=sys.stderr)
     elif isinstance(msg, list):
         for m in msg:
-            print(m, file=stderr)
+            print(m, file=sys.stderr)
     else:
         raise TypeError()
     sys.exit(1)
 
 
 def check(args):
-    if not Path("Pipfile").exists():
-        fatal_error("Pipfile not found")
-    if not Path("setup.py").exists():
-        fatal_error("setup.py not found")
+    if args.workspace is not None:
+        from pipenv_setup import workspace
+
+        if not workspace.check_workspace(
+            Path(args.workspace), args, args.jobs, args.format
+        ):
+            sys.exit(1)
+        return
+
+    if args.format != "text":
+        records = (
+            finding.to_dict() for finding in iter_project_findings(Path("."), args)
+        )
+        if write_records(records, args.format):
+            sys.exit(1)
+        return
+
+    problems = check_project(Path("."), args)
+    if len(problems) == 0:
+        congratulate(msg_formatter.checked_no_problem())
+    else:
+        fatal_error(problems)
 
+
+def write_records(
+    records, output_format
+):  # type: (Iterable[Dict[str, Any]], str) -> int
+    """
+    write records to stdout as they come, flushing after each one so that consumers can process a report
+    before the check is over
+
+    :param output_format: "ndjson" for one json object per line, "json" for a json array with one record per line
+    :return: the number of records written
+    """
+    count = 0
+    for record in records:
+        line = json.dumps(record)
+        if output_format == "json":
+            line = ("[" if count == 0 else ",") + line
+        print(line, flush=True)
+        count += 1
+    if output_format == "json":
+        print("]" if count else "[]", flush=True)
+    return count
+
+
+def check_project(directory, args):  # type: (Path, argparse.Namespace) -> List[str]
+    """
+    check the setup.py of a project against its Pipfile (or Pipfile.lock with `args.lockfile`)
+
+    :param args: the parsed arguments of the check subcommand
+    :return: the problems found, the project passes the check when there is none
+    """
+    findings = list(iter_project_findings(directory, args))
+    if findings and findings[-1].kind is FindingKind.ERROR:
+        # the problems found before the check failed are not reported
+        return [findings[-1].message]
+    return [finding.message for finding in findings]
+
+
+def iter_project_findings(
+    directory, args
+):  # type: (Path, argparse.Namespace) -> Iterator[Finding]
+    """
+    `check_project`, yielding each problem as soon as it is found
+
+    :return: the findings, a problem that prevents the check from running is a single `FindingKind.ERROR` one.
+        Only the first one with `args.fail_fast`
+    """
+    from pipenv_setup import setup_parser
+    from pipenv_setup.cache import ResultCache, file_digest, load_session
+
+    # noinspection Mypy
+    from pipenv_setup.inconsistency_checker import Finding, InconsistencyChecker
+
+    if not (directory / "Pipfile").exists():
+        yield Finding.error("Pipfile not found")
+        return
+    setup_file_path = directory / "setup.py"
+    if not setup_file_path.exists():
+        yield Finding.error("setup.py not found")
+        return
+
+    cache = ResultCache(directory / CACHE_DIR_NAME, enabled=not args.no_cache)
     if args.lockfile:
-        local_packages, remote_packages = lockfile_parser.get_default_packages(
-            Path("Pipfile.lock")
-        )
+        from pipenv_setup import lockfile_parser
+
+        source_path = directory / "Pipfile.lock"
+        session = load_session(
+            lockfile_parser.LockfileSession, source_path, cache
+        )  # type: Any
     else:
-        local_packages, remote_packages = pipfile_parser.get_default_packages(
-            Path("Pipfile")
-        )
+        from pipenv_setup import pipfile_parser
+
+        source_path = directory / "Pipfile"
+        session = load_session(pipfile_parser.PipfileSession, source_path, cache)
+    local_packages, remote_packages = session.get_default_packages()
 
     if local_packages and not args.ignore_local:
         package_names = ", ".join(local_packages)
-        fatal_error(
+        yield Finding.error(
             "local package found in default dependency: %s.\nDo you mean to make it dev dependency "
             % package_names
         )
+        return
 
-    with open("setup.py") as setup_file:
+    with open(str(setup_file_path)) as setup_file:
         setup_code = setup_file.read()
+
+    report_key = None
+    if source_path.exists():
+        report_key = cache.key(
+            "check", file_digest(source_path), setup_code, args.strict
+        )
+        records = cache.get(report_key)
+        if records is not None:
+            for record in records[:1] if args.fail_fast else records:
+                yield Finding.from_dict(record)
+            return
+
     try:
-        (
-            install_requires,
-            dependency_links,
-        ) = setup_parser.get_install_requires_dependency_links(setup_code)
+        with timing.span("parse setup.py"):
+            install_requires, dependency_links = cache.get_or_compute(
+                cache.key("setup.py", setup_code),
+                lambda: setup_parser.get_install_requires_dependency_links(setup_code),
+            )
     except (ValueError, SyntaxError) as e:
-        fatal_error(str(e))
+        yield Finding.error(str(e))
+        return
 
-    # fatal_error is a NoReturn function, pycharm gets confused
-    # noinspection PyUnboundLocalVariable
-    checker = InconsistencyChecker(
-        install_requires, dependency_links, remote_packages, args.strict
-    )
-
-    reports = []
-    checks = (
-        checker.check_install_requires_conflict,
-        checker.check_dependency_links_conflict,
-        checker.check_lacking_install_requires,
-        checker.check_lacking_dependency_links,
-    )
-    for check_item in checks:
+    with timing.span("check dependencies"):
+        checker = InconsistencyChecker(
+            install_requires, dependency_links, remote_packages, args.strict
+        )
+        findings = []  # type: List[Finding]
         try:
-            reports += check_item()
+            for finding in checker.iter_findings():
+                findings.append(finding)
+                yield finding
+                if args.fail_fast:
+                    # the rest of the check is not run, there is no full report to cache
+                    return
         except ValueError as e:
-            print(e, file=stderr)
-            fatal_error("dependency check failed")
-    if len(reports) == 0:
-        congratulate(msg_formatter.checked_no_problem())
-    else:
-        fatal_error(reports)
+            yield Finding.error("%s\ndependency check failed" % e)
+            return
+    if report_key is not None:
+        cache.set(report_key, [finding.to_dict() for finding in findings])
 
 
-def sync(argv):
+def sync(argv, session=None, default=True):  # type: (Any, Any, bool) -> None
+    """
+    :param argv: the parsed arguments of the sync subcommand
+    :param session: the Pipfile or Pipfile.lock (see `argv.pipfile`) already parsed by the caller
+    :param default: sync the default packages. Without them only the dev packages are synced, setup.py must exist
+    """
+    start_time = time.perf_counter()
+    from pipenv_setup import setup_filler, setup_updater
+    from pipenv_setup.cache import ResultCache, load_session
+
     pipfile_path, lockfile_path, setup_file_path = required_files = [
         Path("Pipfile"),
         Path("Pipfile.lock"),
@@ -202,13 +467,20 @@ def sync(argv):
         len(missing_files) == 1 and missing_files[0] == lockfile_path
     )
 
-    # todo: refactor out a parser class
     if argv.pipfile:
-        parser = pipfile_parser
+        from pipenv_setup import pipfile_parser
+
+        parser = pipfile_parser  # type: Any
         file = pipfile_path
+        session_class = (
+            pipfile_parser.PipfileSession
+        )  # type: Union[Type[lockfile_parser.LockfileSession], Type[pipfile_parser.PipfileSession]]
     else:
+        from pipenv_setup import lockfile_parser
+
         parser = lockfile_parser
         file = lockfile_path
+        session_class = lockfile_parser.LockfileSession
 
     if (
         not missing_files
@@ -220,11 +492,19 @@ def sync(argv):
             "dependency_links": [],
             "install_requires": [],
             "extras_require": [],
-        }
-        local_packages, remote_packages = parser.get_default_packages(file)
+        }  # type: Dict[str, List[str]]
+        # both default and dev packages are served from a single parse of the file
+        if session is None:
+            session = load_session(
+                session_class, file, ResultCache(enabled=not argv.no_cache)
+            )
+        if default:
+            local_packages, remote_packages = session.get_default_packages()
+        else:
+            local_packages, remote_packages = {}, {}
         if argv.dev:
             # parse development package in lockfile
-            dev_local_packages, dev_remote_packages = parser.get_dev_packages(file)
+            dev_local_packages, dev_remote_packages = session.get_dev_packages()
             for dev_local_package in dev_local_packages:
                 print(
                     "Development package %s is local, omitted in setup.py"
@@ -281,7 +561,8 @@ def sync(argv):
             try:
                 with open(str(setup_file_path), "w") as new_setup_file:
                     new_setup_file.write(setup_code)
-                format_file(setup_file_path)
+                with timing.span("format setup.py"):
+                    setup_updater.format_file(setup_file_path)
             except OSError as e:
                 fatal_error([str(e), "failed to write setup.py file"])
             else:
@@ -295,18 +576,31 @@ def sync(argv):
 
         else:  # all files exist. Update setup.py
             try:
-                setup_updater.update_setup(
-                    dependency_arguments, setup_file_path, argv.dev
-                )
+                with timing.span("update setup.py"):
+                    updated = setup_updater.update_setup(
+                        dependency_arguments,
+                        setup_file_path,
+                        argv.dev,
+                        default,
+                        argv.incremental,
+                    )
             except ValueError as e:
                 fatal_error([str(e), msg_formatter.no_sync_performed()])
-            congratulate(
-                msg_formatter.update_success(
-                    default_package_success_count,
-                    dev_package_success_count,
-                    argv.pipfile,
+            # noinspection PyUnboundLocalVariable
+            if updated:
+                congratulate(
+                    msg_formatter.update_success(
+                        default_package_success_count if default else None,
+                        dev_package_success_count,
+                        argv.pipfile,
+                    )
+                )
+            else:
+                congratulate(
+                    msg_formatter.already_in_sync(
+                        time.perf_counter() - start_time, argv.pipfile
+                    )
                 )
-            )
     else:
         msgs = []
         for file in missing_files:
@@ -2,6 +2,8 @@
 All kinds of messages pipenv-setup prints to console
 """
 
+from typing import List, Optional
+
 from colorama import Fore
 from pathlib import Path
 
@@ -24,6 +26,13 @@ def colorful_help():
         + "\t\tcheck whether Pipfile is consistent with setup.py.\n  \t\tNon-zero exit code"
         " if there is inconsistency\n  \t\t(package missing; version incompatible)\n"
     )
+    string += (
+        "  "
+        + Fore.YELLOW
+        + "watch"
+        + Fore.RESET
+        + "\t\tsync setup.py every time Pipfile.lock changes\n"
+    )
     return string
 
 
@@ -70,18 +79,19 @@ def generate_success(
 
 def update_success(
     default_package_count, dev_package_count=0, pipfile=False
-):  # type: (int, int, bool) -> str
+):  # type: (Optional[int], int, bool) -> str
     """
-    :param default_package_count: The number of updated default packages
+    :param default_package_count: The number of updated default packages, None if they were not synced
     :param dev_package_count: The number of updated dev packages
     :param bool lockfile: indicate that Pipfile was used to update setup.py
     """
     src = "Pipfile" if pipfile else "Pipfile.lock"
-    string = (
-        "setup.py was successfully updated"
-        + "\n%d default packages from %s synced to setup.py"
-        % (default_package_count, src)
-    )
+    string = "setup.py was successfully updated"
+    if default_package_count is not None:
+        string += "\n%d default packages from %s synced to setup.py" % (
+            default_package_count,
+            src,
+        )
 
     if dev_package_count != 0:
         string += "\n%d dev packages from %s synced to setup.py" % (
@@ -89,3 +99,69 @@ def update_success(
             src,
         )
     return string
+
+
+def already_in_sync(elapsed_seconds, pipfile=False):  # type: (float, bool) -> str
+    """
+    :param elapsed_seconds: time spent reading and comparing the files
+    :param bool pipfile: indicate that Pipfile was compared with setup.py
+    """
+    src = "Pipfile" if pipfile else "Pipfile.lock"
+    return "setup.py is already in sync with %s, left unchanged (checked in %.2fs)" % (
+        src,
+        elapsed_seconds,
+    )
+
+
+def no_project_found(root):  # type: (Path) -> str
+    return "no project with both a Pipfile and a setup.py found under %s" % root
+
+
+def workspace_summary(project_count, failed_count):  # type: (int, int) -> str
+    """
+    :param project_count: The number of projects checked
+    :param failed_count: The number of projects that failed the check
+    """
+    return "%d projects checked, %d passed, %d failed" % (
+        project_count,
+        project_count - failed_count,
+        failed_count,
+    )
+
+
+def watching(file_name, polling=False):  # type: (str, bool) -> str
+    """
+    :param file_name: Pipfile or Pipfile.lock
+    :param polling: indicate that changes are noticed by polling instead of inotify
+    """
+    return "watching %s for changes%s, press Ctrl+C to stop" % (
+        file_name,
+        " (polling)" if polling else "",
+    )
+
+
+def no_dependency_change(file_name):  # type: (str) -> str
+    return "%s changed but not its packages, setup.py left unchanged" % file_name
+
+
+def resynced(sections, elapsed_seconds):  # type: (List[str], float) -> str
+    """
+    :param sections: the synced package sections, "default" and/or "dev"
+    :param elapsed_seconds: time from the end of the change to setup.py being synced
+    """
+    return "re-synced %s packages in %.2fs" % (" and ".join(sections), elapsed_seconds)
+
+
+def resync_failed():
+    return "re-sync failed, waiting for the next change"
+
+
+def serving(socket_path):  # type: (Path) -> str
+    return "serving check and sync on %s, press Ctrl+C to stop" % socket_path
+
+
+def server_failed(socket_path, error):  # type: (Path, Exception) -> str
+    return (
+        "the server on %s took the command but failed to answer (%s), it may still run it: "
+        "not running it again here" % (socket_path, str(error) or type(error).__name__)
+    )
@@ -0,0 +1,212 @@
+"""
+the package record the parsers hand to `sync` and `check`, classified once when Pipfile or Pipfile.lock is read
+"""
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from pipenv_setup.constants import PackageKind, vcs_list
+
+_separators = re.compile(r"[-_.]+")
+
+
+def normalize_name(name):  # type: (str) -> str
+    """
+    the PEP 503 normalized form of a package name, extras written after it are left out
+
+    >>> normalize_name("Foo.Bar__baz")
+    'foo-bar-baz'
+    >>> normalize_name("boto3-stubs[s3]")
+    'boto3-stubs'
+    """
+    return _separators.sub("-", name.split("[", 1)[0]).lower()
+
+
+class Package:
+    """
+    A Pipfile or Pipfile.lock package, immutable.
+
+    `url` is the repository of a vcs package, the archive of a file package or the path of a local package. Keys
+    of the config that no field holds (editable, index, os_name...) are kept in `options`, None when there is
+    none. `table` tells a table config from a bare version string. Hashes are dropped, setup.py never uses them.
+
+    >>> package = Package.from_config("Django", {"git": "https://github.com/django/django.git", "ref": "1.11.4"})
+    >>> package.kind, package.normalized_name, package.vcs, package.ref
+    (<PackageKind.VCS: 'vcs'>, 'django', 'git', '1.11.4')
+    >>> Package.from_config("numpy", "==1.0").specifier
+    '==1.0'
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "normalized_name",
+        "specifier",
+        "extras",
+        "markers",
+        "vcs",
+        "url",
+        "ref",
+        "options",
+        "table",
+    )
+
+    name: str
+    kind: PackageKind
+    normalized_name: str
+    specifier: Optional[str]
+    extras: Optional[Tuple[str, ...]]
+    markers: Optional[str]
+    vcs: Optional[str]
+    url: Optional[str]
+    ref: Optional[str]
+    options: Optional[Dict[str, Any]]
+    table: bool
+
+    def __init__(
+        self,
+        name,
+        kind,
+        specifier=None,
+        extras=None,
+        markers=None,
+        vcs=None,
+        url=None,
+        ref=None,
+        options=None,
+        table=True,
+    ):  # type: (str, PackageKind, Optional[str], Optional[Tuple[str, ...]], Optional[str], Optional[str], Optional[str], Optional[str], Optional[Dict[str, Any]], bool) -> None
+        set_field = object.__setattr__
+        set_field(self, "name", name)
+        set_field(self, "kind", kind)
+        set_field(self, "normalized_name", normalize_name(name))
+        set_field(self, "specifier", specifier)
+        set_field(self, "extras", extras)
+        set_field(self, "markers", markers)
+        set_field(self, "vcs", vcs)
+        set_field(self, "url", url)
+        set_field(self, "ref", ref)
+        set_field(self, "options", options)
+        set_field(self, "table", table)
+
+    def __setattr__(self, name, value):  # type: (str, Any) -> None
+        raise AttributeError("Package is immutable")
+
+    @classmethod
+    def from_config(cls, name, config):  # type: (str, Any) -> Package
+        """
+        classify a Pipfile or Pipfile.lock config
+
+        Values of an unexpected type are not interpreted, they stay in `options` under their key. A config that is
+        neither a version string nor a table is taken for a local package, as it can not be synced
+        """
+        if isinstance(config, str):
+            return cls(name, PackageKind.PYPI, specifier=config, table=False)
+        if not isinstance(config, dict):
+            return cls(name, PackageKind.LOCAL)
+
+        vcs = next((vcs for vcs in vcs_list if vcs in config), None)
+        if "path" in config:
+            kind = PackageKind.LOCAL
+            url = config["path"]
+        elif vcs is not None:
+            kind = PackageKind.VCS
+            url = config[vcs]
+        elif "file" in config:
+            kind = PackageKind.FILE
+            url = config["file"]
+        else:
+            kind = PackageKind.PYPI
+            url = None
+        url_key = {
+            PackageKind.LOCAL: "path",
+            PackageKind.VCS: vcs,
+            PackageKind.FILE: "file",
+        }.get(kind)
+
+        specifier = config.get("version")
+        extras = config.get("extras")  # type: Any
+        markers = config.get("markers")
+        ref = config.get("ref")
+        fields = {
+            "version": isinstance(specifier, str),
+            "extras": isinstance(extras, list)
+            and all(isinstance(extra, str) for extra in extras),
+            "markers": isinstance(markers, str),
+            "ref": isinstance(ref, str),
+        }
+        options = {
+            key: value
+            for key, value in config.items()
+            if key != "hashes" and key != url_key and not fields.get(key)
+        }
+        return cls(
+            name,
+            kind,
+            specifier=specifier if fields["version"] else None,
+            extras=tuple(extras) if fields["extras"] else None,
+            markers=markers if fields["markers"] else None,
+            vcs=vcs if kind is PackageKind.VCS else None,
+            url=url,
+            ref=ref if fields["ref"] else None,
+            options=options or None,
+        )
+
+    def to_config(self):  # type: () -> Dict[str, Any]
+        """
+        the config this package was read from, minus its hashes
+
+        >>> Package.from_config("numpy", {"version": "==1.0", "extras": ["a"], "index": "pypi"}).to_config()
+        {'version': '==1.0', 'extras': ['a'], 'index': 'pypi'}
+        """
+        config = {}  # type: Dict[str, Any]
+        if self.specifier is not None:
+            config["version"] = self.specifier
+        if self.extras is not None:
+            config["extras"] = list(self.extras)
+        if self.markers is not None:
+            config["markers"] = self.markers
+        if self.url is not None:
+            url_key = {PackageKind.LOCAL: "path", PackageKind.FILE: "file"}.get(
+                self.kind, self.vcs
+            )
+            config[url_key] = self.url  # type: ignore
+        if self.ref is not None:
+            config["ref"] = self.ref
+        if self.options is not None:
+            config.update(self.options)
+        return config
+
+    def to_json(self):  # type: () -> Dict[str, Any]
+        """
+        the fields of the package, for the on-disk cache
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields["kind"] = self.kind.value
+        del fields["normalized_name"]
+        return fields
+
+    @classmethod
+    def from_json(cls, fields):  # type: (Dict[str, Any]) -> Package
+        """
+        the inverse of `to_json`
+
+        :raise ValueError: for an unknown kind
+        """
+        fields = dict(fields, kind=PackageKind(fields["kind"]))
+        if fields["extras"] is not None:
+            fields["extras"] = tuple(fields["extras"])
+        return cls(**fields)
+
+    def __reduce__(self):  # type: () -> Any
+        return Package.from_json, (self.to_json(),)
+
+    def __eq__(self, other):  # type: (Any) -> bool
+        return isinstance(other, Package) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):  # type: () -> int
+        return hash((self.name, self.kind, self.specifier, self.url, self.ref))
+
+    def __repr__(self):  # type: () -> str
+        return "Package(%r, %r)" % (self.name, self.to_config())
@@ -0,0 +1,53 @@
+"""
+bounded memoization of the version and specifier parsing shared by the checker and the parsers
+
+The same pins repeat across the packages of a Pipfile and across the Pipfiles checked by one process, each
+distinct string is parsed once while it stays among the most recently used ones.
+"""
+import functools
+from typing import Any, Callable, Dict, TypeVar, Union
+
+import packaging.version
+from packaging.version import LegacyVersion, Version
+
+DEFAULT_MAX_SIZE = 4096
+
+_Function = TypeVar("_Function", bound=Callable[..., Any])
+_caches = {}  # type: Dict[str, Any]
+
+
+def memoized(
+    name, max_size=DEFAULT_MAX_SIZE
+):  # type: (str, int) -> Callable[[_Function], _Function]
+    """
+    decorate a function of hashable arguments with a least recently used cache reported as `name` by `cache_info`
+
+    the cached results are shared by all callers and must not be mutated
+    """
+
+    def decorate(function):  # type: (_Function) -> _Function
+        cached = functools.lru_cache(maxsize=max_size)(function)
+        _caches[name] = cached
+        return cached  # type: ignore
+
+    return decorate
+
+
+def cache_info():  # type: () -> Dict[str, Any]
+    """
+    :return: name of each cache to its `functools.lru_cache` statistics (hits, misses, maxsize, currsize)
+    """
+    return {name: cached.cache_info() for name, cached in _caches.items()}
+
+
+def cache_clear():  # type: () -> None
+    for cached in _caches.values():
+        cached.cache_clear()
+
+
+@memoized("version")
+def parse_version(version_string):  # type: (str) -> Union[Version, LegacyVersion]
+    """
+    `packaging.version.parse`, equal version strings share one Version object
+    """
+    return packaging.version.parse(version_string)
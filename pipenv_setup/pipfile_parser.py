@@ -1,82 +1,59 @@
-import sys
-
-if sys.version_info < (3, 9):
-    from typing import KeysView
-else:
-    from collections.abc import KeysView
-
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Union
 
 import pipfile
-from requirementslib import Requirement
-from pipenv_setup.constants import PipfileConfig, vcs_list
+from pipenv_setup.constants import PackageKind, PipfileConfig, vcs_list
+from pipenv_setup.package import Package
+from pipenv_setup.requirement_formatter import (
+    format_requirement_line,
+    format_vcs_package,
+)
 from pathlib import Path
 
 
 def format_remote_package(
-    package_name: str, config: PipfileConfig, dev=False, use_dependency_links=False
+    package_name: str,
+    config: Union[PipfileConfig, Package],
+    dev=False,
+    use_dependency_links=False,
 ) -> Tuple[str, str]:
     """
     format and return a string that can be put into either install_requires or dependency_links or extras_require
 
     :param package_name:
-    :param config:
+    :param config: a Pipfile config or the package read from it
     :param dev: is package a development package
     :param use_dependency_links: use deprecated dependency_links field
     :return: Tuple[keyword_target, list_argument]
     :raise ValueError: if a package config is not understood
     """
+    package = (
+        config
+        if isinstance(config, Package)
+        else Package.from_config(package_name, config)
+    )
     if dev:
         return (
             "extras_require",
-            Requirement.from_pipfile(package_name, config).as_line(
-                include_hashes=False
-            ),
+            format_requirement_line(package_name, package),
         )
     else:
         # fixme: stronger checks?
         # https://setuptools.readthedocs.io/en/latest/setuptools.html#dependencies-that-aren-t-in-pypi
-        if "file" in config:  # remote built distribution '.zip' file for example
-            assert isinstance(config, dict)
+        if (
+            package.kind is PackageKind.FILE
+        ):  # remote built distribution '.zip' file for example
+            assert package.url is not None
             if use_dependency_links:
-                return "dependency_links", config["file"]
+                return "dependency_links", package.url
             else:
-                return "install_requires", config["file"]
-        if is_pypi_package(config):  # pypi package
+                return "install_requires", package.url
+        if package.kind is PackageKind.PYPI:  # pypi package
             return (
                 "install_requires",
-                Requirement.from_pipfile(package_name, config).as_line(
-                    include_hashes=False
-                ),
+                format_requirement_line(package_name, package),
             )
         else:  # vcs
-            assert isinstance(config, dict)
-            if "git" in config:
-                vcs = "git"
-            # fixme: test cases other than git
-            elif "bzr" in config:
-                vcs = "bzr"
-            elif "svn" in config:
-                vcs = "svn"
-            elif "hg" in config:
-                vcs = "hg"
-            else:
-                raise ValueError(
-                    "Can not understand config of package %s" % package_name
-                )
-
-            link = "{vcs}+{link}".format(vcs=vcs, link=config[vcs])
-            if "ref" in config:
-                link += "@" + config["ref"]
-
-            if use_dependency_links:
-                link += "#egg=" + package_name
-                return "dependency_links", link
-            else:
-                link = "{package_name} @ {link}".format(
-                    package_name=package_name, link=link
-                )
-                return "install_requires", link
+            return format_vcs_package(package_name, package, use_dependency_links)
 
 
 def is_vcs_package(config):  # type: (PipfileConfig) -> bool
@@ -117,52 +94,63 @@ def is_remote_package(config):  # type: (PipfileConfig) -> bool
     return False
 
 
-def is_name_with_extras_in_install_requires_package_names(
-    name: str, config: PipfileConfig, install_requires_package_names: KeysView[str]
-) -> bool:
+def _classify_packages(
+    packages,
+):  # type: (Dict[str, PipfileConfig]) -> Tuple[Dict[str, Package], Dict[str, Package]]
     """
-    return whether package with extras appear in install_requires.
+    read the packages of one Pipfile section and split them into local packages and remote packages
     """
+    local_packages = {}  # type: Dict[str, Package]
+    remote_packages = {}  # type: Dict[str, Package]
+    for package_name, config in packages.items():
+        package = Package.from_config(package_name, config)
+        if package.kind is PackageKind.LOCAL:
+            local_packages[package_name] = package
+        else:
+            remote_packages[package_name] = package
+    return local_packages, remote_packages
 
-    if isinstance(config, str):
-        return False  # no extras
-    if isinstance(config, dict) and "extras" in config:
-        pkg_with_ext = "{name}[{e}]".format(
-            name=name, e=",".join(config["extras"])
-        )  # for 2.7 support (f-strings not supported)
-        return pkg_with_ext in install_requires_package_names
 
-    return False
+class PipfileSession:
+    """
+    A Pipfile that is read and parsed only once, counterpart of `lockfile_parser.LockfileSession`
+    """
+
+    def __init__(self, pipfile_path):  # type: (Path) -> None
+        data = pipfile.load(str(pipfile_path)).data
+        self._default_packages = _classify_packages(data["default"])
+        self._dev_packages = _classify_packages(data["develop"])
+
+    def get_default_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        """
+        return local packages and remote packages in default packages (not dev)
+        """
+        return self._default_packages
+
+    def get_dev_packages(
+        self,
+    ):  # type: () -> Tuple[Dict[str, Package], Dict[str, Package]]
+        """
+        return dev local packages and dev remote packages
+        """
+        return self._dev_packages
 
 
 def get_default_packages(
     pipfile_path,
-):  # type: (Path) -> Tuple[Dict[str, PipfileConfig], Dict[str, PipfileConfig]]
+):  # type: (Path) -> Tuple[Dict[str, Package], Dict[str, Package]]
     """
     return local packages and remote packages in default packages (not dev)
     """
-    local_packages = {}  # type: Dict[str, PipfileConfig]
-    remote_packages = {}  # type: Dict[str, PipfileConfig]
-    for package_name, config in pipfile.load(str(pipfile_path)).data["default"].items():
-        if is_remote_package(config):
-            remote_packages[package_name] = config
-        else:
-            local_packages[package_name] = config
-    return local_packages, remote_packages
+    return PipfileSession(pipfile_path).get_default_packages()
 
 
 def get_dev_packages(
     pipfile_path,
-):  # type: (Path) -> Tuple[Dict[str, PipfileConfig], Dict[str, PipfileConfig]]
+):  # type: (Path) -> Tuple[Dict[str, Package], Dict[str, Package]]
     """
     return dev local packages and dev remote packages
     """
-    local_packages = {}  # type: Dict[str, PipfileConfig]
-    remote_packages = {}  # type: Dict[str, PipfileConfig]
-
-    for package_name, config in pipfile.load(str(pipfile_path)).data["develop"].items():
-        if is_remote_package(config):
-            remote_packages[package_name] = config
-        else:
-            local_packages[package_name] = config
-    return local_packages, remote_packages
+    return PipfileSession(pipfile_path).get_dev_packages()
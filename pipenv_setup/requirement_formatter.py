@@ -0,0 +1,208 @@
+"""
+format Pipfile/Pipfile.lock package configs into setup.py requirement lines
+"""
+import re
+from typing import Optional, Tuple, Union
+
+from packaging.markers import InvalidMarker, Marker
+from packaging.specifiers import InvalidSpecifier, Specifier
+
+from pipenv_setup.constants import PackageKind, PipfileConfig
+from pipenv_setup.package import Package
+from pipenv_setup.parse_cache import memoized
+from pipenv_setup.timing import span
+
+# Pipfile keys that are turned into environment markers, e.g. os_name = "=='nt'"
+_marker_keys = frozenset(
+    [
+        "os_name",
+        "sys_platform",
+        "platform_machine",
+        "platform_python_implementation",
+        "platform_release",
+        "platform_system",
+        "platform_version",
+        "python_version",
+        "python_full_version",
+        "implementation_name",
+        "implementation_version",
+    ]
+)
+# options of a package that can be rendered without requirementslib
+_native_options = frozenset(["index"]) | _marker_keys
+# a package name, possibly carrying extras e.g. 'boto3-stubs[s3,ec2]'
+_name_pattern = re.compile(
+    r"^(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)(?:\[(?P<extras>[^\]]*)\])?$"
+)
+_extra_pattern = re.compile(r"^[A-Za-z0-9]+$")
+
+
+def format_requirement_line(
+    package_name, config
+):  # type: (str, Union[PipfileConfig, Package]) -> str
+    """
+    format a package config as a requirement line, e.g. 'numpy[extra]==1.2; os_name == 'nt''
+
+    the output is the same as `Requirement.from_pipfile(package_name, config).as_line(include_hashes=False)`
+    from requirementslib, which is still used for configs that can not be formatted natively.
+    Version specifiers made of several clauses keep their order from the Pipfile,
+    requirementslib emits them in an arbitrary order.
+
+    >>> format_requirement_line("Foo_Bar", "*")
+    'foo-bar'
+    >>> format_requirement_line("numpy", {"version": ">= 1.0, <2", "extras": ["b", "a"]})
+    'numpy[a,b]>=1.0,<2'
+    >>> format_requirement_line("numpy", {"version": "==1.0", "markers": 'os_name=="nt"'})
+    "numpy==1.0; os_name == 'nt'"
+    """
+    package = (
+        config
+        if isinstance(config, Package)
+        else Package.from_config(package_name, config)
+    )
+    line = format_package_natively(package)
+    if line is None:
+        from pipenv_setup.lockfile_parser import import_requirementslib
+
+        requirementslib = import_requirementslib()
+        with span("requirementslib Requirement.from_pipfile"):
+            line = requirementslib.Requirement.from_pipfile(
+                package.name, package.to_config()
+            ).as_line(include_hashes=False)
+    return line
+
+
+def format_requirement_line_natively(
+    package_name, config
+):  # type: (str, PipfileConfig) -> Optional[str]
+    """
+    :return: the requirement line, or None if the config is not simple enough to be formatted natively
+    """
+    return format_package_natively(Package.from_config(package_name, config))
+
+
+def format_package_natively(package):  # type: (Package) -> Optional[str]
+    """
+    :return: the requirement line, or None if the package is not simple enough to be formatted natively
+    """
+    if package.kind is not PackageKind.PYPI or package.ref is not None:
+        return None
+    options = package.options or {}
+    if not _native_options.issuperset(options):
+        return None
+    version = package.specifier or ""
+    extras = list(package.extras or ())
+    markers = package.markers
+    marker_keys = _marker_keys.intersection(options)
+    if marker_keys:
+        if markers or len(marker_keys) > 1:
+            # requirementslib has its own way of combining several of them
+            return None
+        (marker_key,) = marker_keys
+        markers = "%s %s" % (marker_key, options[marker_key])
+
+    name_match = _name_pattern.match(package.name)
+    if name_match is None:
+        return None
+    if name_match.group("extras") is not None:
+        if extras:
+            return None
+        extras = [extra.strip() for extra in name_match.group("extras").split(",")]
+    line = name_match.group("name").replace("_", "-").lower()
+
+    if not all(_extra_pattern.match(extra) for extra in extras):
+        return None
+    if extras:
+        line += "[%s]" % ",".join(sorted(set(extra.lower() for extra in extras)))
+
+    specifier = format_specifier(version)
+    if specifier is None:
+        return None
+    line += specifier
+
+    if markers:
+        formatted_markers = format_markers(markers)
+        if formatted_markers is None:
+            return None
+        line += "; " + formatted_markers
+    return line
+
+
+def format_vcs_package(
+    package_name, package, use_dependency_links
+):  # type: (str, Package, bool) -> Tuple[str, str]
+    """
+    :return: the keyword and the requirement line or link of a vcs package
+    :raise ValueError: if the package is not a vcs package
+    """
+    if package.kind is not PackageKind.VCS:
+        raise ValueError("Can not understand config of package %s" % package_name)
+
+    link = "{vcs}+{link}".format(vcs=package.vcs, link=package.url)
+    if package.ref is not None:
+        link += "@" + package.ref
+
+    if use_dependency_links:
+        link += "#egg=" + package_name
+        return "dependency_links", link
+    else:
+        link = "{package_name} @ {link}".format(package_name=package_name, link=link)
+        return "install_requires", link
+
+
+def format_specifier(version):  # type: (str) -> Optional[str]
+    """
+    normalize a Pipfile version string, keeping the order of its clauses
+
+    :return: None if the version string is not a valid PEP 440 specifier
+
+    >>> format_specifier("*")
+    ''
+    >>> format_specifier(" >= 1.0, !=1.5,<2")
+    '>=1.0,!=1.5,<2'
+    >>> format_specifier("1.0") is None
+    True
+    """
+    if not isinstance(version, str):
+        return None
+    return _format_specifier(version)
+
+
+@memoized("specifier")
+def _format_specifier(version):  # type: (str) -> Optional[str]
+    version = version.strip()
+    if version in ("", "*"):
+        return ""
+    clauses = []
+    for clause in version.split(","):
+        try:
+            clauses.append(str(Specifier(clause.strip())))
+        except InvalidSpecifier:
+            return None
+    return ",".join(clauses)
+
+
+def format_markers(markers):  # type: (str) -> Optional[str]
+    """
+    normalize environment markers the way requirementslib does
+
+    :return: None if the markers can not be formatted natively
+
+    >>> format_markers("python_version>='3.6' and (os_name==\\"nt\\")")
+    "python_version >= '3.6' and os_name == 'nt'"
+    """
+    if not isinstance(markers, str):
+        return None
+    return _format_markers(markers)
+
+
+@memoized("markers")
+def _format_markers(markers):  # type: (str) -> Optional[str]
+    try:
+        formatted = str(Marker(markers))
+    except InvalidMarker:
+        return None
+    if "'" in formatted:
+        # a quote inside a marker value, leave it to requirementslib
+        return None
+    return formatted.replace('"', "'")
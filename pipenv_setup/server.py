@@ -0,0 +1,153 @@
+"""
+a long running process answering the check and sync commands of `pipenv_setup.client`
+
+The parsers, black and the memoized parse results stay loaded between commands, a command forwarded to the server
+skips the imports that dominate a short run. Commands run one at a time, each in the directory of its client.
+"""
+import contextlib
+import io
+import json
+import os
+import re
+import socket
+import sys
+import traceback
+from typing import Any, Dict, Optional
+
+from pathlib import Path
+
+from pipenv_setup import msg_formatter
+from pipenv_setup.client import (
+    FORWARDED_COMMANDS,
+    forward,
+    is_private_directory,
+    receive_line,
+)
+
+_ansi_escape_pattern = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def run_command(request):  # type: (Dict[str, Any]) -> Dict[str, Any]
+    """
+    :param request: "argv", the command line without program name, "cwd" and "color", see `client.forward`
+    :return: "stdout", "stderr" and "exit_code" of the command
+    """
+    from pipenv_setup.main import run
+
+    args = request.get("argv") or []
+    if not args or args[0] not in FORWARDED_COMMANDS:
+        return {
+            "stdout": "",
+            "stderr": "the server only runs %s\n"
+            % " and ".join(sorted(FORWARDED_COMMANDS)),
+            "exit_code": 2,
+        }
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    previous_directory = os.getcwd()
+    exit_code = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            os.chdir(request["cwd"])
+            run(["pipenv-setup"] + list(args))
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except Exception:
+            # a failing command must not take the server down
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os.chdir(previous_directory)
+
+    output, errors = stdout.getvalue(), stderr.getvalue()
+    if not request.get("color"):
+        output = _ansi_escape_pattern.sub("", output)
+        errors = _ansi_escape_pattern.sub("", errors)
+    return {"stdout": output, "stderr": errors, "exit_code": exit_code}
+
+
+def _listen(socket_path):  # type: (Path) -> socket.socket
+    """
+    :raise OSError: when another server already listens on `socket_path`, or other users can write to its directory
+    """
+    directory = socket_path.parent
+    if not directory.exists():
+        directory.mkdir(mode=0o700, parents=True)
+    if not is_private_directory(directory):
+        # another user could replace the socket, clients refuse to connect to it
+        raise OSError(
+            "%s can be written by other users, refusing to listen in it" % directory
+        )
+    if socket_path.exists():
+        if forward(["--help"], socket_path) is not None:
+            raise OSError("a server already listens on %s" % socket_path)
+        # left behind by a server that was killed
+        socket_path.unlink()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # only the user running the server may connect, the socket runs commands in any directory it names
+    previous_umask = os.umask(0o177)
+    try:
+        listener.bind(str(socket_path))
+    finally:
+        os.umask(previous_umask)
+    os.chmod(str(socket_path), 0o600)
+    listener.listen(16)
+    return listener
+
+
+def serve(socket_path, max_requests=None):  # type: (Path, Optional[int]) -> None
+    """
+    answer the clients connecting to `socket_path` until interrupted
+
+    :param max_requests: stop after that many commands, None to run until interrupted
+    :raise OSError: when another server already listens on `socket_path`
+    """
+    from pipenv_setup import setup_updater, workspace
+
+    workspace.warm_up()
+    setup_updater.get_black_formatter()
+
+    listener = _listen(socket_path)
+    bound = os.lstat(str(socket_path))
+    print(msg_formatter.serving(socket_path))
+    sys.stdout.flush()
+    request_count = 0
+    try:
+        while max_requests is None or request_count < max_requests:
+            connection, _ = listener.accept()
+            with connection:
+                request_line = receive_line(connection)
+                if not request_line:
+                    continue
+                request_count += 1
+                try:
+                    response = run_command(json.loads(request_line.decode("utf-8")))
+                except ValueError as e:
+                    response = {"stdout": "", "stderr": "%s\n" % e, "exit_code": 2}
+                try:
+                    connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+                except OSError:
+                    # the client went away
+                    pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        _remove_socket(socket_path, bound)
+
+
+def _remove_socket(socket_path, bound):  # type: (Path, os.stat_result) -> None
+    """
+    remove the socket file the server bound, unless it is gone or another file took its place meanwhile
+    (e.g. a second server replaced a stale-looking socket): that file is not ours to delete
+    """
+    try:
+        current = os.lstat(str(socket_path))
+        if (current.st_ino, current.st_dev) == (bound.st_ino, bound.st_dev):
+            socket_path.unlink()
+    except FileNotFoundError:
+        pass
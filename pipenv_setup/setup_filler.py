@@ -1,6 +1,6 @@
 from os import path
 from os.path import dirname
-from sys import stderr
+import sys
 from typing import Dict, Optional, List
 
 
@@ -19,8 +19,8 @@ def fill_boilerplate(
         ) as boilerplate_setup_file:
             boilerplate_setup_code = boilerplate_setup_file.read()
     except OSError as err:
-        print(str(err), file=stderr)
-        print("pipenv-setup failed to create setup.py", file=stderr)
+        print(str(err), file=sys.stderr)
+        print("pipenv-setup failed to create setup.py", file=sys.stderr)
         return None
     else:
         boilerplate_setup_code = boilerplate_setup_code.replace(
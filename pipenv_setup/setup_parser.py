@@ -1,5 +1,14 @@
 import ast
-from typing import List, Optional, Tuple
+import weakref
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# setup() call node of each parsed tree, so that looking up several keywords only searches the tree once
+_setup_call_nodes = (
+    weakref.WeakKeyDictionary()
+)  # type: weakref.WeakKeyDictionary[ast.AST, Optional[ast.Call]]
+# nodes whose bodies are only searched when the setup() call is not found elsewhere
+_deferred_node_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
 
 
 def get_kw_list_of_string_arg(setup_text: str, kw_name: str) -> Optional[List[str]]:
@@ -81,13 +90,64 @@ def _get_attr(node, attr):
 
 
 def get_setup_call_node(root_node):  # type: (ast.AST)-> Optional[ast.Call]
+    """
+    find the setup() call. The result is cached per tree
+
+    :return: the call node, or None if there is no setup() call
+    """
+    try:
+        return _setup_call_nodes[root_node]
+    except KeyError:
+        pass
+    setup_call_node = _find_setup_call_node(root_node)
+    _setup_call_nodes[root_node] = setup_call_node
+    return setup_call_node
+
 
-    for node in ast.walk(root_node):
+def _find_setup_call_node(root_node):  # type: (ast.AST)-> Optional[ast.Call]
+    """
+    breadth-first search that stops at the first setup() call.
+
+    Function and class bodies are searched last, as setup() is usually called at module level (possibly under an
+    `if __name__ == "__main__":`)
+
+    >>> ast.literal_eval(_find_setup_call_node(ast.parse("def f():\\n    setup(a=1)\\nsetup(a=2)")).keywords[0].value)
+    2
+    >>> _find_setup_call_node(ast.parse("def main():\\n    setuptools.setup()\\nmain()")).func.attr
+    'setup'
+    """
+    deferred = []  # type: List[ast.AST]
+    todo = deque([root_node])  # type: Deque[ast.AST]
+    while todo or deferred:
+        if not todo:
+            todo.extend(deferred)
+            deferred = []
+        node = todo.popleft()
         if _get_name(node, "setup") or _get_attr(node, "setup"):  # type: ignore
             return node  # type: ignore
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _deferred_node_types):
+                deferred.append(child)
+            else:
+                todo.append(child)
     return None
 
 
+def get_setup_keywords(root_node):  # type: (ast.AST) -> Dict[str, ast.expr]
+    """
+    :raise ValueError: if there is no setup() call
+    :return: values of the keyword arguments of the setup() call by keyword
+    """
+    setup_call_node = get_setup_call_node(root_node)
+    if setup_call_node is None:
+        raise ValueError("No setup() call found in setup.py")
+    return {
+        keyword.arg: keyword.value
+        for keyword in setup_call_node.keywords
+        if keyword.arg is not None
+    }
+
+
 def get_extras_require_dev_list_node(
     root_node,
 ):  # type: (ast.AST) -> Optional[ast.List]
@@ -124,18 +184,14 @@ def get_extras_require_dict_node(root_node):  # type: (ast.AST) ->Optional[ast.D
     :raise ValueError: When the keyword argument is not a list or when can not get the list
     :return: a dict node, or None if it does not exist
     """
-    setup_call_node = get_setup_call_node(root_node)
-    if setup_call_node is None:
+    if get_setup_call_node(root_node) is None:
         raise ValueError("Can not find keyword argument extra_require")
-    node = None
-    for keyword in setup_call_node.keywords:
-        if keyword.arg == "extras_require":
-            node = keyword.value
-            if not isinstance(node, ast.Dict):
-                raise ValueError(
-                    "Error parsing setup.py: extra_require keyword argument is not a dictionary"
-                )
-    return node  # type: ignore
+    node = get_setup_keywords(root_node).get("extras_require")
+    if node is not None and not isinstance(node, ast.Dict):
+        raise ValueError(
+            "Error parsing setup.py: extra_require keyword argument is not a dictionary"
+        )
+    return node
 
 
 def get_kw_list_node(root_node, kw):  # type(ast.AST, str) -> Optional[ast.List]
@@ -143,13 +199,9 @@ def get_kw_list_node(root_node, kw):  # type(ast.AST, str) -> Optional[ast.List]
     :raise ValueError: When the keyword argument is not a list or when can not get the list
     :return: a list node, or None if it does not exist
     """
-    setup_call_node = get_setup_call_node(root_node)
-    if setup_call_node is None:
+    if get_setup_call_node(root_node) is None:
         raise ValueError("Can not find keyword argument %s" % kw)
-    for keyword in setup_call_node.keywords:
-        if keyword.arg == kw:
-            node = keyword.value
-            if not isinstance(node, ast.List):
-                raise ValueError("Error parsing setup.py: %s is not a list" % kw)
-            return node
-    return None
+    node = get_setup_keywords(root_node).get(kw)
+    if node is not None and not isinstance(node, ast.List):
+        raise ValueError("Error parsing setup.py: %s is not a list" % kw)
+    return node
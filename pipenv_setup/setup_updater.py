@@ -1,271 +1,724 @@
 import ast
 import codecs
+import re
 import tokenize
-from io import BytesIO
-from tokenize import OP
-from typing import Any, List, Tuple
+from bisect import bisect_left
+from io import StringIO
+from tokenize import OP, STRING
+from typing import Any, Dict, List, Optional, Pattern, Tuple
 
 from pathlib import Path
 
 from pipenv_setup import setup_parser
+from pipenv_setup.package import normalize_name
 from pipenv_setup.setup_parser import get_kw_list_node, get_setup_call_node
+from pipenv_setup.timing import span
 
 
 def update_setup(
-    dependency_arguments, filename, dev=False
-):  # type: (Any, Path, bool) -> None
+    dependency_arguments, filename, dev=False, default=True, incremental=False
+):  # type: (Any, Path, bool, bool, bool) -> bool
     """
-    Clear install_requires and dependency_links argument and fill new ones. Format the code.
+    Clear install_requires and dependency_links argument and fill new ones. Format the edited code with black when
+    it is installed.
+
+    The file is left untouched, neither written nor formatted, when it already lists exactly these dependencies.
 
     :param dependency_arguments:
     :param filename:
     :param dev: update extras_require or not
+    :param default: update install_requires and dependency_links or not
+    :param incremental: only patch, insert and delete the changed elements, see `rewrite_setup_code`
     :raise ValueError: when setup.py is not recognized (malformed)
+    :return: whether setup.py was rewritten
     """
     with open(str(filename), "rb") as setup_file:
         setup_bytes = setup_file.read()
     setup_text = setup_bytes.decode(encoding="utf-8")
-    root_node = ast.parse(setup_text)
-    setup_lines = setup_text.splitlines()
+
+    with span("parse setup.py"):
+        root_node = ast.parse(setup_text)
+    if is_in_sync(root_node, dependency_arguments, dev, default):
+        return False
+
+    with span("import black"):
+        formatter = get_black_formatter()
+    with span("rewrite setup.py"):
+        edited_text, new_setup_text = _rewrite_setup_code(
+            setup_text,
+            dependency_arguments,
+            dev,
+            root_node,
+            formatter,
+            default,
+            incremental,
+        )
+    if new_setup_text == setup_text:
+        # e.g. an incremental sync of the same packages in another order
+        return False
+    setup_text = new_setup_text
+
+    with span("write setup.py"):
+        f = codecs.open(str(filename), encoding="utf-8", mode="w")
+        f.write(setup_text)
+        f.close()
+
+    if formatter is not None:
+        formatter.report_reformatted(filename, new_setup_text != edited_text)
+    return True
+
+
+def is_in_sync(
+    root_node, dependency_arguments, dev=False, default=True
+):  # type: (ast.AST, Any, bool, bool) -> bool
+    """
+    whether `rewrite_setup_code` would leave the dependencies of a parsed setup.py unchanged: every keyword argument
+    it would fill already holds the same strings in the same order
+
+    :raise ValueError: when setup.py is not recognized (malformed)
+    """
+    if get_setup_call_node(root_node) is None:
+        raise ValueError("No setup() call found in setup.py")
+    list_nodes = [
+        (get_kw_list_node(root_node, kw), dependency_arguments[kw])
+        for kw in _default_keywords(default)
+    ]  # type: List[Tuple[Optional[ast.List], List[str]]]
+    if dev:
+        list_nodes.append(
+            (
+                setup_parser.get_extras_require_dev_list_node(root_node),
+                dependency_arguments["extras_require"],
+            )
+        )
+    for list_node, packages in list_nodes:
+        if list_node is None:
+            # a missing keyword argument is only created for a non-empty list
+            if packages:
+                return False
+            continue
+        try:
+            if setup_parser.parse_list_of_string(list_node) != list(packages):
+                return False
+        except ValueError:
+            # not a plain list of strings, it is overwritten
+            return False
+    return True
+
+
+def rewrite_setup_code(
+    setup_text,
+    dependency_arguments,
+    dev=False,
+    root_node=None,
+    formatter=None,
+    default=True,
+    incremental=False,
+):  # type: (str, Any, bool, Optional[ast.AST], Optional[BlackFormatter], bool, bool) -> str
+    """
+    Replace the content of install_requires, dependency_links and (when `dev`) extras_require["dev"], creating the
+    keyword arguments when they are missing.
+
+    With `incremental`, a list laid out one element per line, as black lays it out, is not replaced but edited
+    element by element: elements are matched by package name, a changed one is replaced in place, a removed one
+    loses its lines and a new one gets a line of its own after the element that precedes it in
+    `dependency_arguments`. These edits are not formatted, new elements take the indentation and quotes of the
+    existing ones. Other lists are replaced.
+
+    The code is parsed and tokenized (see `BracketIndex`) once, every edit is computed against the original text
+    and they are all applied in one splice.
+
+    With a `formatter`, only the edited arguments are formatted when each of them sits on lines of its own, as in
+    a setup() call already formatted by black. Otherwise the whole code is formatted.
+
+    :param root_node: `setup_text` already parsed by the caller
+    :param default: replace install_requires and dependency_links, without it only extras_require["dev"] changes
+    :param incremental: edit lists element by element
+    :raise ValueError: when setup.py is not recognized (malformed)
+    """
+    return _rewrite_setup_code(
+        setup_text,
+        dependency_arguments,
+        dev,
+        root_node,
+        formatter,
+        default,
+        incremental,
+    )[1]
+
+
+def _rewrite_setup_code(
+    setup_text,
+    dependency_arguments,
+    dev=False,
+    root_node=None,
+    formatter=None,
+    default=True,
+    incremental=False,
+):  # type: (str, Any, bool, Optional[ast.AST], Optional[BlackFormatter], bool, bool) -> Tuple[str, str]
+    """
+    `rewrite_setup_code`, along with what it returns before the formatting, for `update_setup` to tell black's report
+    whether black changed anything
+
+    :return: the edited code before formatting, then the rewritten code
+    """
+    if root_node is None:
+        root_node = ast.parse(setup_text)
+    setup_lines = setup_text.splitlines(True)
 
     setup_call_node = get_setup_call_node(root_node)
     if setup_call_node is None:
         raise ValueError("No setup() call found in setup.py")
-    setup_call_lineno, setup_call_col_offset = (
-        setup_call_node.lineno,
-        setup_call_node.col_offset,
+
+    # these raise ValueError
+    list_nodes = {
+        kw: get_kw_list_node(root_node, kw) for kw in _default_keywords(default)
+    }  # type: Dict[str, Optional[ast.List]]
+    extras_require_node = None  # type: Optional[ast.Dict]
+    dev_list_node = None  # type: Optional[ast.List]
+    if dev:
+        extras_require_node = setup_parser.get_extras_require_dict_node(root_node)
+        dev_list_node = setup_parser.get_extras_require_dev_list_node(root_node)
+
+    bracket_index = BracketIndex(setup_text)
+    call_paren = bracket_index.next_opener(
+        bracket_index.node_position(setup_call_node), "("
     )
+    if call_paren is None:
+        raise ValueError("No setup() call found in setup.py")
 
-    install_requires_lineno = -1
-    install_requires_col_offset = -1
-    dependency_links_lineno = -1
-    dependency_links_col_offset = -1
-    extras_require_lineno = -1
-    extras_require_col_offset = -1
+    line_offsets = _line_offsets(setup_lines)
+
+    def offset(position):  # type: (Tuple[int, int]) -> int
+        return line_offsets[position[0] - 1] + position[1]
+
+    def list_content_span(node):  # type: (ast.AST) -> Tuple[int, int]
+        """
+        span between the brackets of a list/dict node
+        """
+        opener, closer = bracket_index.node_span(node)
+        return offset(opener) + 1, offset(closer)
+
+    edits = []  # type: List[Tuple[int, int, str]]
+    # whole setup() arguments holding edits, to be formatted on their own
+    edited_arguments = []  # type: List[Tuple[str, ast.AST, List[Tuple[int, int, str]]]]
+
+    def replace_list_content(node, content):  # type: (ast.AST, str) -> None
+        start, end = list_content_span(node)
+        edits.append((start, end, content))
+
+    # element edits of the lists edited incrementally, never formatted
+    element_edits = []  # type: List[Tuple[int, int, str]]
+
+    def edit_elements(node, entries):  # type: (ast.List, List[str]) -> bool
+        """
+        add the edits turning the elements of a list into `entries`, one element at a time
+
+        :return: False, with no edit added, if the list is empty, is not a list of strings each on lines of its
+            own, or names a package twice. As is `entries`
+        """
+        try:
+            old_entries = setup_parser.parse_list_of_string(node)
+        except ValueError:
+            return False
+        old_keys = [_entry_key(entry) for entry in old_entries]
+        new_keys = [_entry_key(entry) for entry in entries]
+        if (
+            not old_entries
+            or not entries
+            or len(set(old_keys)) < len(old_keys)
+            or len(set(new_keys)) < len(new_keys)
+        ):
+            return False
+
+        _, closer = bracket_index.node_span(node)
+        boundaries = [bracket_index.node_position(element) for element in node.elts]
+        spans = []  # type: List[Tuple[Tuple[int, int], Tuple[int, int]]]
+        has_comma = []  # type: List[bool]
+        for start, stop in zip(boundaries, boundaries[1:] + [closer]):
+            element_span = bracket_index.string_span(start, stop)
+            if element_span is None:
+                return False
+            end = element_span[1]
+            suffix_match = _suffix_pattern.match(
+                setup_lines[end[0] - 1][end[1] :].rstrip("\r\n")
+            )
+            if setup_lines[start[0] - 1][: start[1]].strip() or suffix_match is None:
+                return False
+            spans.append(element_span)
+            has_comma.append(bool(suffix_match.group("comma")))
+        if not all(has_comma[:-1]):
+            return False
+
+        first_line = setup_lines[spans[0][0][0] - 1]
+        indent = first_line[: spans[0][0][1]]
+        quote = (
+            '"' if setup_text[offset(spans[0][0]) :].lstrip("rRuU")[0] == '"' else "'"
+        )
+
+        def new_line(entry):  # type: (str) -> str
+            return _with_line_ending(
+                indent + _string_literal(entry, quote) + ",\n", first_line
+            )
+
+        new_key_set = set(new_keys)
+        for (start, end), key in zip(spans, old_keys):
+            if key not in new_key_set:
+                element_edits.append(
+                    (line_offsets[start[0] - 1], line_offsets[end[0]], "")
+                )
+        old_indexes = {key: i for i, key in enumerate(old_keys)}
+        # the kept element new entries go after, None before the first one
+        anchor = None  # type: Optional[int]
+        for entry, key in zip(entries, new_keys):
+            i = old_indexes.get(key)
+            if i is not None:
+                anchor = i
+                if old_entries[i] != entry:
+                    start, end = spans[i]
+                    element_edits.append(
+                        (offset(start), offset(end), _string_literal(entry, quote))
+                    )
+            elif anchor is None:
+                insert_at = line_offsets[spans[0][0][0] - 1]
+                element_edits.append((insert_at, insert_at, new_line(entry)))
+            else:
+                end = spans[anchor][1]
+                if not has_comma[anchor]:
+                    element_edits.append((offset(end), offset(end), ","))
+                    has_comma[anchor] = True
+                insert_at = line_offsets[end[0]]
+                element_edits.append((insert_at, insert_at, new_line(entry)))
+        return True
+
+    # new keyword arguments go right after "setup(", the last one created comes first
+    new_kw_args = []  # type: List[str]
+    for kw, list_node in list_nodes.items():
+        if list_node is not None:
+            # if the keyword argument exists from the start
+            if not (incremental and edit_elements(list_node, dependency_arguments[kw])):
+                replace_list_content(list_node, str(dependency_arguments[kw])[1:-1])
+                edited_arguments.append((kw, list_node, edits[-1:]))
+        elif len(dependency_arguments[kw]) > 0:
+            # the keyword argument does not exist, create a new one
+            new_kw_args.insert(0, kw + "=" + str(dependency_arguments[kw]) + ",")
 
-    for kw in ["install_requires", "dependency_links"]:
-        setup_bytes, setup_lines = clear_kw_list(kw, setup_bytes, setup_lines)
     if dev:
-        setup_bytes, setup_lines = clear_dev_value(setup_bytes, setup_lines)
-
-    root_node = ast.parse("\n".join(setup_lines))
-
-    node = get_kw_list_node(root_node, "install_requires")
-    if node is not None:
-        install_requires_lineno = node.lineno
-        install_requires_col_offset = node.col_offset
-    node = get_kw_list_node(root_node, "dependency_links")
-    if node is not None:
-        dependency_links_lineno = node.lineno
-        dependency_links_col_offset = node.col_offset
-    extras_require_node = setup_parser.get_extras_require_dict_node(root_node)
-    if extras_require_node is not None:
-        extras_require_lineno = extras_require_node.lineno
-        extras_require_col_offset = extras_require_node.col_offset
-
-    # update keyword arguments
-    if install_requires_lineno != -1:
-        # if install_requires exists from the start
-        insert_at_lineno_col_offset(
-            setup_lines,
-            install_requires_lineno,
-            install_requires_col_offset + 1,
-            str(dependency_arguments["install_requires"])[1:-1],
+        dev_packages = dependency_arguments["extras_require"]
+        dev_content = str(dev_packages)[1:-1] + "," if dev_packages else ""
+        if dev_list_node is not None:
+            if not (incremental and edit_elements(dev_list_node, dev_packages)):
+                replace_list_content(dev_list_node, dev_content)
+                edited_arguments.append(("extras_require", extras_require_node, edits[-1:]))  # type: ignore
+        elif dev_packages and extras_require_node is not None:
+            # extras_require exists but has no "dev"
+            start, _ = list_content_span(extras_require_node)
+            edits.append((start, start, '"dev": [%s],' % dev_content))
+            edited_arguments.append(("extras_require", extras_require_node, edits[-1:]))
+        elif dev_packages:
+            # extras_require does not exist from the start
+            new_kw_args.insert(0, 'extras_require={"dev": [%s]},' % dev_content)
+
+    if new_kw_args:
+        after_call_paren = offset(call_paren) + 1
+        edits.append((after_call_paren, after_call_paren, "".join(new_kw_args)))
+
+    edited_text = apply_edits(setup_text, edits + element_edits)
+    if formatter is None:
+        return edited_text, edited_text
+
+    def format_argument(
+        kw, value_node, value_edits
+    ):  # type: (str, ast.AST, List[Tuple[int, int, str]]) -> Optional[Tuple[int, int, str]]
+        """
+        :return: an edit replacing the lines of the keyword argument with its edited and formatted version,
+            None if the argument shares a line with other code
+        """
+        opener, closer = bracket_index.node_span(value_node)
+        closer_line = setup_lines[closer[0] - 1]
+        prefix_match = _keyword_prefix_pattern.match(
+            setup_lines[opener[0] - 1][: opener[1]]
         )
-    elif len(dependency_arguments["install_requires"]) > 0:
-        # install_requires does not exist, create a new one
-        insert_at_lineno_col_offset(
-            setup_lines,
-            setup_call_lineno,
-            setup_call_col_offset + len("setup("),
-            "install_requires=" + str(dependency_arguments["install_requires"]) + ",",
+        suffix_match = _suffix_pattern.match(
+            closer_line[closer[1] + 1 :].rstrip("\r\n")
         )
-
-    if dependency_links_lineno != -1:
-        # if dependency_links exists from the start
-        insert_at_lineno_col_offset(
-            setup_lines,
-            dependency_links_lineno,
-            dependency_links_col_offset + 1,
-            str(dependency_arguments["dependency_links"])[1:-1],
+        if (
+            prefix_match is None
+            or prefix_match.group("kw") != kw
+            or suffix_match is None
+            # black only adds the trailing comma when it puts each argument on its own line
+            or not (suffix_match.group("comma") or argument_count > 1)
+        ):
+            return None
+        value_start = offset(opener)
+        value = apply_edits(
+            setup_text[value_start : offset(closer) + 1],
+            [
+                (start - value_start, end - value_start, replacement)
+                for start, end, replacement in value_edits
+            ],
         )
-    elif len(dependency_arguments["dependency_links"]) > 0:
-        # dependency_links does not exist, create a new one
-        insert_at_lineno_col_offset(
-            setup_lines,
-            setup_call_lineno,
-            setup_call_col_offset + len("setup("),
-            "dependency_links=" + str(dependency_arguments["dependency_links"]) + ",",
+        indent = prefix_match.group("indent")
+        formatted = formatter.format_argument(  # type: ignore
+            prefix_match.group(0)[len(indent) :]
+            + value
+            + ","
+            + suffix_match.group("comment"),
+            indent,
+        )
+        if formatted is None:
+            return None
+        return (
+            line_offsets[opener[0] - 1],
+            line_offsets[closer[0]],
+            _with_line_ending(formatted, closer_line),
         )
 
-    # update extras_require
-    root_node = ast.parse("\n".join(setup_lines))
-    if len(dependency_arguments["extras_require"]) > 0 and dev:
-        if extras_require_lineno == -1:
-            # extras_require does not exist from the start
-            insert_at_lineno_col_offset(
-                setup_lines,
-                setup_call_lineno,
-                setup_call_col_offset + len("setup("),
-                'extras_require = {"dev": []},',
-            )
-            extras_require_lineno = setup_call_lineno
-            extras_require_col_offset = setup_call_col_offset + len("setup(")
-            root_node = ast.parse("\n".join(setup_lines))
+    def format_new_arguments():  # type: () -> Optional[Tuple[int, int, str]]
+        """
+        :return: an edit inserting the formatted new arguments on lines of their own after "setup(", None if the
+            existing arguments do not start on the next line
+        """
+        paren_line = setup_lines[call_paren[0] - 1]
+        if (
+            _suffix_pattern.match(paren_line[call_paren[1] + 1 :].rstrip("\r\n"))
+            is None
+        ):
+            return None
+        # the first existing argument gives the indentation, the new ones go before it
+        for line in setup_lines[call_paren[0] :]:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                break
+        else:
+            return None
+        if stripped.startswith(")"):
+            return None
+        indent = line[: len(line) - len(line.lstrip())]
+        formatted_arguments = []
+        for kw_arg in new_kw_args:
+            formatted = formatter.format_argument(kw_arg, indent)  # type: ignore
+            if formatted is None:
+                return None
+            formatted_arguments.append(_with_line_ending(formatted, paren_line))
+        insert_at = line_offsets[call_paren[0]]
+        return insert_at, insert_at, "".join(formatted_arguments)
+
+    argument_count = len(setup_call_node.args) + len(setup_call_node.keywords)
+    formatted_edits = [
+        format_argument(kw, value_node, value_edits)
+        for kw, value_node, value_edits in edited_arguments
+    ]
+    if new_kw_args:
+        formatted_edits.append(format_new_arguments())
+    if None in formatted_edits:
+        return edited_text, formatter.format_code(edited_text)
+    return edited_text, apply_edits(setup_text, formatted_edits + element_edits)  # type: ignore
+
+
+# what may follow an edited argument on its last line
+_suffix_pattern = re.compile(r"^\s*(?P<comma>,?)(?P<comment>\s*(?:#.*)?)$")
+# what may precede the value of an edited keyword argument on its line
+_keyword_prefix_pattern = re.compile(r"^(?P<indent>[ ]*)(?P<kw>\w+)\s*=\s*$")
+
+
+def _with_line_ending(text, line):  # type: (str, str) -> str
+    """
+    use the line ending of `line` in `text`, black always emits "\\n"
+    """
+    if line.endswith("\r\n"):
+        return text.replace("\n", "\r\n")
+    return text
 
-        dev_list_node = setup_parser.get_extras_require_dev_list_node(root_node)
-        if dev_list_node is None:
-            insert_at_lineno_col_offset(
-                setup_lines,
-                extras_require_lineno,
-                extras_require_col_offset + 1,
-                '"dev": [],',
-            )
-            root_node = ast.parse("\n".join(setup_lines))
-            dev_list_node = setup_parser.get_extras_require_dev_list_node(root_node)
-        assert dev_list_node is not None
-        insert_at_lineno_col_offset(
-            setup_lines,
-            dev_list_node.lineno,
-            dev_list_node.col_offset + 1,
-            str(dependency_arguments["extras_require"])[1:-1] + ",",
-        )
 
-    f = codecs.open("setup.py", encoding="utf-8", mode="w")
-    f.write("\n".join(setup_lines))
-    f.close()
+_entry_name_pattern = re.compile(
+    r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:[\[;@<>=!~(]|$)"
+)
+_egg_pattern = re.compile(r"#egg=([^&#]+)")
 
-    format_file(Path("setup.py"))
 
+def _entry_key(entry):  # type: (str) -> str
+    """
+    what matches an element of a dependency list with the one replacing it: the normalized package name, or the
+    link itself for a link to an archive
+
+    >>> _entry_key("Django[bcrypt]>=2.0; python_version>='3'")
+    'django'
+    >>> _entry_key("git+https://github.com/requests/requests.git@v2.20.1#egg=Requests")
+    'requests'
+    >>> _entry_key("https://github.com/divio/django-cms/archive/release/3.4.x.zip")
+    'https://github.com/divio/django-cms/archive/release/3.4.x.zip'
+    """
+    match = _egg_pattern.search(entry) or _entry_name_pattern.match(entry)
+    return entry if match is None else normalize_name(match.group(1))
 
-def format_file(file):  # type: (Path) -> None
+
+def _string_literal(value, quote):  # type: (str, str) -> str
     """
-    use black to format python file
+    a string literal for `value`, quoted with `quote` unless the value holds that quote
 
-    if black is not installed, do nothing
+    >>> print(_string_literal("numpy", '"'), _string_literal("os_name == 'nt'", "'"))
+    "numpy" "os_name == 'nt'"
     """
-    try:
-        import black
+    literal = repr(value)
+    if literal[0] != quote and quote not in value:
+        literal = quote + literal[1:-1] + quote
+    return literal
 
-        mode = black.FileMode(
-            target_versions=set(),
-            line_length=black.DEFAULT_LINE_LENGTH,
-            is_pyi=False,
-            string_normalization=True,
-        )
-        write_back = black.WriteBack.from_configuration(check=False, diff=False)
-        report = black.Report(check=False, quiet=False, verbose=False)
 
-        black.reformat_one(
-            src=file, fast=False, write_back=write_back, mode=mode, report=report
-        )
-    except ImportError:
-        return
+def _default_keywords(default):  # type: (bool) -> Tuple[str, ...]
+    """
+    the keyword arguments filled with the default packages, none when they are not synced
+    """
+    return ("install_requires", "dependency_links") if default else ()
 
 
-def insert_at_lineno_col_offset(
-    lines, lineno, col_offset, content
-):  # type: (List[str], int, int, str) -> None
-    the_line = lines[lineno - 1]
-    lines[lineno - 1] = the_line[:col_offset] + content + the_line[col_offset:]
+def apply_edits(text, edits):  # type: (str, List[Tuple[int, int, str]]) -> str
+    """
+    replace non-overlapping spans of text in one pass. Insertions at the same offset keep their order in `edits`
 
+    :param edits: (start, end, replacement) tuples, offsets refer to the original text
 
-def clear_dev_value(
-    file_bytes, file_lines
-):  # type: (bytes, List[str]) -> Tuple[bytes, List[str]]
+    >>> apply_edits("setup(a=[1], b=[2])", [(9, 10, "3, 4"), (6, 6, "c=[],"), (16, 17, "")])
+    'setup(c=[],a=[3, 4], b=[])'
     """
-    clear dev list in extra_require without moving number of lines in a file
+    pieces = []
+    previous_end = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        pieces.append(text[previous_end:start])
+        pieces.append(replacement)
+        previous_end = end
+    pieces.append(text[previous_end:])
+    return "".join(pieces)
 
-    :raise ValueError: if list lineno col_offset can not be located
+
+def _line_offsets(lines):  # type: (List[str]) -> List[int]
+    """
+    character offset of the start of each line
     """
-    root_node = ast.parse(file_bytes)
-    # This raises ValueError
-    list_node = setup_parser.get_extras_require_dev_list_node(root_node)  # type: ignore
-    if list_node is None:
-        # nothing needs to be done
-        return file_bytes, file_lines
+    offsets = []
+    current = 0
+    for line in lines:
+        offsets.append(current)
+        current += len(line)
+    offsets.append(current)
+    return offsets
 
-    return clear_list_content(list_node, file_bytes, file_lines)
 
+class BracketIndex:
+    """
+    Matching brackets of a piece of code, built from a single token stream.
+
+    Maps the position of every "(", "[" and "{" to the position of its closer, positions are (lineno, col_offset)
+    tuples as reported by `tokenize`. ast nodes can be looked up directly.
 
-def clear_list_content(
-    list_node, file_bytes, file_lines
-):  # type: (ast.List, bytes, List[str]) -> Tuple[bytes, List[str]]
+    >>> index = BracketIndex("setup(a=[1, (2)], b={})\\n")
+    >>> index.closer((1, 8))
+    (1, 15)
+    >>> index.next_opener((1, 0), "(")
+    (1, 5)
     """
-    clear list content in a file
 
-    :raise ValueError: if list lineno col_offset can not be located
+    def __init__(self, text):  # type: (str) -> None
+        self._lines = text.splitlines(True)
+        self._closers = {}  # type: Dict[Tuple[int, int], Tuple[int, int]]
+        # opener positions of each kind, in source order
+        self._openers = {
+            "(": [],
+            "[": [],
+            "{": [],
+        }  # type: Dict[str, List[Tuple[int, int]]]
+
+        # string token positions, in source order
+        self._string_starts = []  # type: List[Tuple[int, int]]
+        self._string_ends = []  # type: List[Tuple[int, int]]
+
+        stack = []  # type: List[Tuple[int, int]]
+        for token_type, token_val, start, end, _ in tokenize.generate_tokens(
+            StringIO(text).readline
+        ):
+            if token_type == STRING:
+                self._string_starts.append(start)
+                self._string_ends.append(end)
+            if token_type != OP:
+                continue
+            if token_val in self._openers:
+                stack.append(start)
+                self._openers[token_val].append(start)
+            elif token_val in (")", "]", "}") and stack:
+                self._closers[stack.pop()] = start
+
+    def closer(self, opener):  # type: (Tuple[int, int]) -> Optional[Tuple[int, int]]
+        """
+        :return: position of the bracket closing the one opened at `opener`, None if there is no bracket there
+        """
+        return self._closers.get(opener)
+
+    def next_opener(
+        self, position, bracket
+    ):  # type: (Tuple[int, int], str) -> Optional[Tuple[int, int]]
+        """
+        :return: position of the first `bracket` opened at or after `position`
+        """
+        openers = self._openers[bracket]
+        i = bisect_left(openers, position)
+        return openers[i] if i < len(openers) else None
+
+    def string_span(
+        self, start, stop
+    ):  # type: (Tuple[int, int], Tuple[int, int]) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]
+        """
+        :return: positions of the start of the first and the end of the last string token between `start` and
+            `stop`, the strings of an implicit concatenation. None if no string token starts at `start`
+        """
+        i = bisect_left(self._string_starts, start)
+        if i == len(self._string_starts) or self._string_starts[i] != start:
+            return None
+        last = bisect_left(self._string_starts, stop) - 1
+        return start, self._string_ends[last]
+
+    def node_position(self, node):  # type: (ast.AST) -> Tuple[int, int]
+        """
+        position of an ast node in tokenize terms. ast col_offsets count utf-8 bytes while tokenize counts characters
+        """
+        lineno = node.lineno  # type: ignore
+        col_offset = node.col_offset  # type: ignore
+        line = self._lines[lineno - 1]
+        return lineno, len(line.encode("utf-8")[:col_offset].decode("utf-8"))
+
+    def node_span(
+        self, node
+    ):  # type: (ast.AST) -> Tuple[Tuple[int, int], Tuple[int, int]]
+        """
+        :return: positions of the opening and the closing bracket of a list/dict/tuple display node
+        :raise ValueError: if the brackets can not be located
+        """
+        opener = self.node_position(node)
+        closer = self.closer(opener)
+        if closer is None:
+            raise ValueError("can not locate closing bracket ast list node %s" % node)
+        return opener, closer
+
+
+class BlackFormatter:
+    """
+    black, run in process, formatting either whole files and code or a single argument of a call.
+    The black modes are shared by every use, see `get_black_formatter`
     """
-    lbrace_lineno = list_node.lineno
-    lbrace_col_offset = list_node.col_offset
 
-    # this raises ValueError
-    rbrace_lineno, rbrace_col_offset = get_list_closing_bracket_lineno_offset(
-        list_node, file_bytes
-    )
-    first_line = file_lines[lbrace_lineno - 1]
-    if lbrace_lineno == rbrace_lineno:
-        file_lines[lbrace_lineno - 1] = (
-            first_line[: lbrace_col_offset + 1] + first_line[rbrace_col_offset:]
+    def __init__(self):  # type: () -> None
+        """
+        :raise ImportError: when black is not installed
+        """
+        import black
+
+        self._black = black
+        self._modes = {}  # type: Dict[int, Any]
+
+    def mode(self, line_length=None):  # type: (Optional[int]) -> Any
+        if line_length is None:
+            line_length = self._black.DEFAULT_LINE_LENGTH
+        mode = self._modes.get(line_length)
+        if mode is None:
+            mode = self._modes[line_length] = self._black.FileMode(
+                target_versions=set(),
+                line_length=line_length,
+                is_pyi=False,
+                string_normalization=True,
+            )
+        return mode
+
+    def format_code(self, code):  # type: (str) -> str
+        """
+        :return: the formatted code, `code` itself if black can not parse it
+        """
+        try:
+            with span("black"):
+                return self._black.format_str(code, mode=self.mode())
+        except ValueError:
+            return code
+
+    def format_argument(self, argument, indent):  # type: (str, str) -> Optional[str]
+        """
+        format a keyword argument of a call, which is on lines of its own, the way black formats it within the
+        whole call
+
+        >>> print(BlackFormatter().format_argument("a=['x'],  # comment", "    "), end="")
+            a=["x"],  # comment
+
+        :param argument: e.g. 'install_requires=["numpy"],', with its trailing comma
+        :param indent: indentation of the argument
+        :return: the formatted lines, None if black does not keep the argument on lines of its own
+        """
+        head, tail = "f(\n", ")\n"
+        # black measures lines with their indentation, the argument is formatted 4 columns in
+        line_length = max(self._black.DEFAULT_LINE_LENGTH - len(indent) + 4, 1)
+        try:
+            with span("black"):
+                formatted = self._black.format_str(
+                    head + "    " + argument + "\n" + tail, mode=self.mode(line_length)
+                )
+        except ValueError:
+            return None
+        lines = formatted.splitlines(True)
+        if lines[0] != head or lines[-1] != tail:
+            return None
+        return "".join(
+            indent + line[4:] if line.strip() else line for line in lines[1:-1]
         )
-    else:
-        # first line
-        file_lines[lbrace_lineno - 1] = first_line[: lbrace_col_offset + 1]
-        # last line
-        last_line = file_lines[rbrace_lineno - 1]
-        file_lines[rbrace_lineno - 1] = last_line[rbrace_col_offset:]
 
-    for between_lineno in range(lbrace_lineno + 1, rbrace_lineno):
-        file_lines[between_lineno - 1] = ""
+    def _report(self):  # type: () -> Any
+        """
+        a new report for each file: the counts of a report shared by a long running process would only grow
+        """
+        return self._black.Report(check=False, quiet=False, verbose=False)
+
+    def reformat_file(self, file):  # type: (Path) -> None
+        """
+        format a file in place and report it the way the black command does
+        """
+        black = self._black
+        with span("black"):
+            black.reformat_one(
+                src=file,
+                fast=False,
+                write_back=black.WriteBack.from_configuration(check=False, diff=False),
+                mode=self.mode(),
+                report=self._report(),
+            )
 
-    return "\n".join(file_lines).encode("utf-8"), file_lines
+    def report_reformatted(self, file, changed):  # type: (Path, bool) -> None
+        """
+        report a file formatted by this formatter and written by the caller the way the black command does
 
+        :param changed: whether the formatting changed the code
+        """
+        self._report().done(
+            file, self._black.Changed.YES if changed else self._black.Changed.NO
+        )
 
-def clear_kw_list(
-    kw, file_bytes, file_lines
-):  # type: (str, bytes, List[str]) -> Tuple[bytes, List[str]]
-    """
-    clear list content in a keyword argument without moving number of lines in a file
 
-    :raise ValueError: if list lineno col_offset can not be located
-    """
-    root_node = ast.parse(file_bytes)
-    # This raises ValueError
-    list_node = get_kw_list_node(root_node, kw)
-    if list_node is None:
-        # need to do nothing
-        return file_bytes, file_lines
+_black_formatter = None  # type: Optional[BlackFormatter]
 
-    return clear_list_content(list_node, file_bytes, file_lines)
 
+def get_black_formatter():  # type: () -> Optional[BlackFormatter]
+    """
+    :return: the formatter shared by every call, None if black is not installed
+    """
+    global _black_formatter
+    if _black_formatter is None:
+        try:
+            _black_formatter = BlackFormatter()
+        except ImportError:
+            return None
+    return _black_formatter
 
-def get_list_closing_bracket_lineno_offset(
-    ast_list_node, file_bytes
-):  # type: (ast.List, bytes) -> Tuple[int, int]
+
+def format_file(file):  # type: (Path) -> None
     """
-    :raise ValueError: if fails to locate
+    use black to format python file
+
+    if black is not installed, do nothing
     """
-    import platform
-
-    if platform.python_version().startswith("2"):
-        tokens = tokenize.generate_tokens(BytesIO(file_bytes).readline)  # type: ignore
-    else:
-        tokens = tokenize.tokenize(BytesIO(file_bytes).readline)
-
-    list_met = False
-    count = 1
-    for (token_type, token_val, (start_lineno, start_offset), _, _) in tokens:
-        if list_met and token_type == OP:
-            if list_met:
-                if token_val == "]":
-                    count -= 1
-                elif token_val == "[":
-                    count += 1
-                if count == 0:
-                    return start_lineno, start_offset
-        if (
-            start_lineno == ast_list_node.lineno
-            and start_offset == ast_list_node.col_offset
-        ):
-            list_met = True
-    raise ValueError("can not locate closing bracket ast list node %s" % ast_list_node)
+    formatter = get_black_formatter()
+    if formatter is not None:
+        formatter.reformat_file(file)
@@ -0,0 +1,209 @@
+"""
+timing of the phases of a command: spans printed as a table with --timings, along with the hits of the parse
+caches, written as a Chrome trace with --trace, and a cProfile dump of the whole command with --profile
+
+Spans cost nothing more than a function call while no command is instrumented.
+"""
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pathlib import Path
+
+
+class Span:
+    """
+    a timed phase, `path` holds the names of the enclosing spans then its own
+    """
+
+    __slots__ = ("path", "start", "duration")
+
+    def __init__(
+        self, path, start, duration
+    ):  # type: (Tuple[str, ...], float, float) -> None
+        self.path = path
+        self.start = start
+        self.duration = duration
+
+
+class _Recorder:
+    def __init__(self):  # type: () -> None
+        self.origin = time.perf_counter()
+        self.spans = []  # type: List[Span]
+        self.stack = []  # type: List[str]
+
+
+_recorder = None  # type: Optional[_Recorder]
+_disabled = contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _record(recorder, name):  # type: (_Recorder, str) -> Iterator[None]
+    recorder.stack.append(name)
+    path = tuple(recorder.stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        recorder.stack.pop()
+        recorder.spans.append(Span(path, start - recorder.origin, end - start))
+
+
+def span(name):  # type: (str) -> Any
+    """
+    time the block of a `with` statement as phase `name`, nested in the spans around it
+
+    >>> with span("not recorded"):
+    ...     pass
+    """
+    if _recorder is None:
+        return _disabled
+    return _record(_recorder, name)
+
+
+def format_table(spans):  # type: (List[Span]) -> List[str]
+    """
+    :return: the lines of a table of the total time and number of calls of each phase, nested phases indented
+        under the phase they ran in
+
+    >>> print("\\n".join(format_table([Span(("sync",), 0, 0.5), Span(("sync", "black"), 0.1, 0.25)])))
+    phase                                 calls       total
+    sync                                      1    500.0 ms
+      black                                   1    250.0 ms
+    """
+    calls = {}  # type: Dict[Tuple[str, ...], int]
+    totals = {}  # type: Dict[Tuple[str, ...], float]
+    first_start = {}  # type: Dict[Tuple[str, ...], float]
+    for recorded in spans:
+        path = recorded.path
+        calls[path] = calls.get(path, 0) + 1
+        totals[path] = totals.get(path, 0.0) + recorded.duration
+        first_start[path] = min(first_start.get(path, recorded.start), recorded.start)
+
+    def sort_key(path):  # type: (Tuple[str, ...]) -> List[float]
+        # a phase sorts right after the phase it ran in, in order of start
+        return [first_start[path[: i + 1]] for i in range(len(path))]
+
+    lines = ["%-36s %6s %11s" % ("phase", "calls", "total")]
+    for path in sorted(totals, key=sort_key):
+        name = "  " * (len(path) - 1) + path[-1]
+        lines.append("%-36s %6d %8.1f ms" % (name, calls[path], totals[path] * 1000))
+    return lines
+
+
+def _cache_counters():  # type: () -> Dict[str, Tuple[int, int]]
+    """
+    :return: name of each parse cache to its hits and misses so far, none before a parser was imported
+    """
+    # not imported here: the parse caches come with packaging, which the commands import only when they need it
+    parse_cache = sys.modules.get("pipenv_setup.parse_cache")
+    if parse_cache is None:
+        return {}
+    return {
+        name: (info.hits, info.misses)
+        for name, info in parse_cache.cache_info().items()
+    }
+
+
+def cache_deltas(
+    before, after
+):  # type: (Dict[str, Tuple[int, int]], Dict[str, Tuple[int, int]]) -> Dict[str, Tuple[int, int]]
+    """
+    :return: the hits and misses of each cache between two `_cache_counters`, unused caches left out
+
+    >>> cache_deltas({"version": (3, 2)}, {"version": (10, 4), "markers": (0, 0)})
+    {'version': (7, 2)}
+    """
+    deltas = {}  # type: Dict[str, Tuple[int, int]]
+    for name, (hits, misses) in after.items():
+        hits_before, misses_before = before.get(name, (0, 0))
+        if (hits, misses) != (hits_before, misses_before):
+            deltas[name] = (hits - hits_before, misses - misses_before)
+    return deltas
+
+
+def format_cache_table(deltas):  # type: (Dict[str, Tuple[int, int]]) -> List[str]
+    """
+    :return: the lines of a table of the hits, misses and hit rate of each parse cache
+
+    >>> print("\\n".join(format_cache_table({"version": (30, 10)})))
+    cache                                  hits misses    hit rate
+    version                                  30     10      75.0 %
+    """
+    lines = ["%-36s %6s %6s %11s" % ("cache", "hits", "misses", "hit rate")]
+    for name, (hits, misses) in sorted(deltas.items()):
+        rate = 100.0 * hits / (hits + misses)
+        lines.append("%-36s %6d %6d %9.1f %%" % (name, hits, misses, rate))
+    return lines
+
+
+def trace_events(spans):  # type: (List[Span]) -> Dict[str, Any]
+    """
+    :return: the spans in the Chrome trace event format, to open in chrome://tracing or https://ui.perfetto.dev
+    """
+    process_id = os.getpid()
+    thread_id = threading.get_ident()
+    return {
+        "traceEvents": [
+            {
+                "name": recorded.path[-1],
+                "cat": "pipenv-setup",
+                "ph": "X",
+                "ts": recorded.start * 1e6,
+                "dur": recorded.duration * 1e6,
+                "pid": process_id,
+                "tid": thread_id,
+            }
+            for recorded in sorted(spans, key=lambda recorded: recorded.start)
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+@contextlib.contextmanager
+def instrument(
+    command_name, timings=False, profile_path=None, trace_path=None
+):  # type: (str, bool, Optional[Path], Optional[Path]) -> Iterator[None]
+    """
+    record the spans of a command, then report them even when the command fails
+
+    :param command_name: the outermost span
+    :param timings: print the table of the spans, then the one of the parse caches used by the command, to stderr
+    :param profile_path: where to dump the cProfile statistics of the command, to read with `pstats`
+    :param trace_path: where to write the spans as Chrome trace events
+    """
+    global _recorder
+    if not (timings or profile_path or trace_path):
+        yield
+        return
+
+    recorder = _recorder = _Recorder()
+    counters = _cache_counters()
+    profiler = None  # type: Optional[cProfile.Profile]
+    if profile_path is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with _record(recorder, command_name):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(profile_path))
+        _recorder = None
+        if trace_path is not None:
+            with open(str(trace_path), "w") as trace_file:
+                json.dump(trace_events(recorder.spans), trace_file)
+        if timings:
+            for line in format_table(recorder.spans):
+                print(line, file=sys.stderr)
+            deltas = cache_deltas(counters, _cache_counters())
+            if deltas:
+                for line in [""] + format_cache_table(deltas):
+                    print(line, file=sys.stderr)
@@ -0,0 +1,232 @@
+"""
+sets of versions represented as sorted, disjoint intervals
+"""
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+from packaging.version import LegacyVersion, Version
+
+AnyVersion = Union[Version, LegacyVersion]
+# (lower version, lower inclusive, upper version, upper inclusive), None versions are unbounded
+Interval = Tuple[Optional[AnyVersion], bool, Optional[AnyVersion], bool]
+
+
+def _lower_key(
+    version, inclusive
+):  # type: (Optional[AnyVersion], bool) -> Tuple[Any, ...]
+    """
+    sort key of a lower bound, an inclusive bound starts before an exclusive one at the same version
+    """
+    if version is None:
+        return (0,)
+    return 1, version, 0 if inclusive else 1
+
+
+def _upper_key(
+    version, inclusive
+):  # type: (Optional[AnyVersion], bool) -> Tuple[Any, ...]
+    """
+    sort key of an upper bound, an inclusive bound ends after an exclusive one at the same version
+    """
+    if version is None:
+        return (2,)
+    return 1, version, 1 if inclusive else 0
+
+
+def _is_empty(
+    lower, lower_inclusive, upper, upper_inclusive
+):  # type: (Optional[AnyVersion], bool, Optional[AnyVersion], bool) -> bool
+    if lower is None or upper is None:
+        return False
+    return upper < lower or (
+        upper == lower and not (lower_inclusive and upper_inclusive)
+    )
+
+
+class VersionIntervals:
+    """
+    An immutable set of versions, e.g. the versions satisfying '>=1.2, !=1.3, <2'.
+
+    Intervals are kept sorted, disjoint and not touching, so two equal sets have equal intervals.
+    Intersection runs in linear time, union in O(k log k) for k intervals.
+
+    >>> from packaging.version import parse
+    >>> a = VersionIntervals.from_operator(">=", parse("1.2"))
+    >>> a & VersionIntervals.from_operator("!=", parse("1.3"))
+    VersionIntervals('[1.2, 1.3) | (1.3, *)')
+    >>> a | VersionIntervals.from_operator("<", parse("1.0"))
+    VersionIntervals('(*, 1.0) | [1.2, *)')
+    >>> VersionIntervals.from_operator("==", parse("1.3")).issubset(a)
+    True
+    """
+
+    __slots__ = ("_intervals",)
+
+    def __init__(self, intervals=()):  # type: (Iterable[Interval]) -> None
+        """
+        :param intervals: sorted, disjoint, not touching and not empty
+        """
+        self._intervals = tuple(intervals)  # type: Tuple[Interval, ...]
+
+    @classmethod
+    def everything(cls):  # type: () -> VersionIntervals
+        return cls([(None, False, None, False)])
+
+    @classmethod
+    def from_operator(cls, op, version):  # type: (str, AnyVersion) -> VersionIntervals
+        """
+        the versions satisfying a single comparison, e.g. '>= 1.2'
+
+        :raise ValueError: for unrecognizable op
+        """
+        if op == "==":
+            return cls([(version, True, version, True)])
+        elif op == ">=":
+            return cls([(version, True, None, False)])
+        elif op == ">":
+            return cls([(version, False, None, False)])
+        elif op == "<":
+            return cls([(None, False, version, False)])
+        elif op == "<=":
+            return cls([(None, False, version, True)])
+        elif op == "!=":
+            return cls([(None, False, version, False), (version, False, None, False)])
+        else:
+            raise ValueError("not recognizable version string operator: " + op)
+
+    def __and__(self, other):  # type: (VersionIntervals) -> VersionIntervals
+        return self.intersection(other)
+
+    def __or__(self, other):  # type: (VersionIntervals) -> VersionIntervals
+        return self.union(other)
+
+    def intersection(self, other):  # type: (VersionIntervals) -> VersionIntervals
+        intervals = []  # type: List[Interval]
+        a, b = self._intervals, other._intervals
+        i = j = 0
+        while i < len(a) and j < len(b):
+            a_lower, a_lower_inclusive, a_upper, a_upper_inclusive = a[i]
+            b_lower, b_lower_inclusive, b_upper, b_upper_inclusive = b[j]
+            if _lower_key(a_lower, a_lower_inclusive) >= _lower_key(
+                b_lower, b_lower_inclusive
+            ):
+                lower, lower_inclusive = a_lower, a_lower_inclusive
+            else:
+                lower, lower_inclusive = b_lower, b_lower_inclusive
+            # the interval ending first can not overlap anything further in the other set
+            if _upper_key(a_upper, a_upper_inclusive) <= _upper_key(
+                b_upper, b_upper_inclusive
+            ):
+                upper, upper_inclusive = a_upper, a_upper_inclusive
+                i += 1
+            else:
+                upper, upper_inclusive = b_upper, b_upper_inclusive
+                j += 1
+            if not _is_empty(lower, lower_inclusive, upper, upper_inclusive):
+                intervals.append((lower, lower_inclusive, upper, upper_inclusive))
+        return VersionIntervals(intervals)
+
+    def union(self, other):  # type: (VersionIntervals) -> VersionIntervals
+        intervals = []  # type: List[Interval]
+        for interval in sorted(
+            self._intervals + other._intervals,
+            key=lambda interval: _lower_key(interval[0], interval[1]),
+        ):
+            if intervals:
+                _, _, previous_upper, previous_upper_inclusive = intervals[-1]
+                lower, lower_inclusive, upper, upper_inclusive = interval
+                if (
+                    previous_upper is None
+                    or lower is None
+                    or lower < previous_upper
+                    or (
+                        lower == previous_upper
+                        and (lower_inclusive or previous_upper_inclusive)
+                    )
+                ):
+                    # overlapping or touching, merge them
+                    if _upper_key(upper, upper_inclusive) > _upper_key(
+                        previous_upper, previous_upper_inclusive
+                    ):
+                        intervals[-1] = intervals[-1][:2] + (upper, upper_inclusive)
+                    continue
+            intervals.append(interval)
+        return VersionIntervals(intervals)
+
+    def __contains__(self, version):  # type: (AnyVersion) -> bool
+        for lower, lower_inclusive, upper, upper_inclusive in self._intervals:
+            if lower is not None and (
+                version < lower or (version == lower and not lower_inclusive)
+            ):
+                continue
+            if upper is not None and (
+                upper < version or (version == upper and not upper_inclusive)
+            ):
+                continue
+            return True
+        return False
+
+    def cell_masks(self, other):  # type: (VersionIntervals) -> Tuple[int, int]
+        """
+        both sets as bitmasks over the elementary cells of their bounds: bit 2i+1 for the i-th smallest bound
+        version, bit 2i for the versions between it and the previous bound, bit 2n for the versions above the last
+        one. Every interval covers whole cells, so equality, subset and intersection of the two sets are exactly
+        those of the masks.
+
+        >>> from packaging.version import parse
+        >>> at_least_1 = VersionIntervals.from_operator(">=", parse("1"))
+        >>> [bin(mask) for mask in at_least_1.cell_masks(VersionIntervals.from_operator("!=", parse("2")))]
+        ['0b11110', '0b10111']
+        """
+        bounds = set()
+        for lower, _, upper, _ in self._intervals + other._intervals:
+            if lower is not None:
+                bounds.add(lower)
+            if upper is not None:
+                bounds.add(upper)
+        cell_indexes = {version: 2 * i + 1 for i, version in enumerate(sorted(bounds))}
+        last_cell = 2 * len(cell_indexes)
+
+        def mask(intervals):  # type: (VersionIntervals) -> int
+            bits = 0
+            for lower, lower_inclusive, upper, upper_inclusive in intervals._intervals:
+                if lower is None:
+                    first = 0
+                else:
+                    first = cell_indexes[lower] + (0 if lower_inclusive else 1)
+                if upper is None:
+                    last = last_cell
+                else:
+                    last = cell_indexes[upper] - (0 if upper_inclusive else 1)
+                bits |= ((1 << (last + 1)) - 1) ^ ((1 << first) - 1)
+            return bits
+
+        return mask(self), mask(other)
+
+    def issubset(self, other):  # type: (VersionIntervals) -> bool
+        return self.intersection(other) == self
+
+    def isdisjoint(self, other):  # type: (VersionIntervals) -> bool
+        return not self.intersection(other)
+
+    def __eq__(self, other):  # type: (object) -> bool
+        if not isinstance(other, VersionIntervals):
+            return NotImplemented
+        return self._intervals == other._intervals
+
+    def __hash__(self):  # type: () -> int
+        return hash(self._intervals)
+
+    def __bool__(self):  # type: () -> bool
+        return bool(self._intervals)
+
+    def __repr__(self):  # type: () -> str
+        return "VersionIntervals(%r)" % " | ".join(
+            "%s%s, %s%s"
+            % (
+                "[" if lower_inclusive else "(",
+                "*" if lower is None else lower,
+                "*" if upper is None else upper,
+                "]" if upper_inclusive else ")",
+            )
+            for lower, lower_inclusive, upper, upper_inclusive in self._intervals
+        )
@@ -0,0 +1,312 @@
+"""
+keep setup.py in sync with Pipfile or Pipfile.lock while they change
+"""
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from pathlib import Path
+
+from pipenv_setup import msg_formatter
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+# pipenv writes the lockfile in place or through a temporary file renamed over it
+_WATCHED_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """
+    notices changes to files of a directory by comparing their modification time and size
+    """
+
+    def __init__(
+        self, directory, names, interval=0.5
+    ):  # type: (Path, Iterable[str], float) -> None
+        self._directory = directory
+        self._names = frozenset(names)
+        self._interval = interval
+        self._stats = self._stat_all()
+
+    def _stat_all(self):  # type: () -> Dict[str, Optional[Tuple[int, int]]]
+        stats = {}  # type: Dict[str, Optional[Tuple[int, int]]]
+        for name in self._names:
+            try:
+                stat = os.stat(str(self._directory / name))
+            except OSError:
+                stats[name] = None
+            else:
+                stats[name] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def wait(self, timeout=None):  # type: (Optional[float]) -> Set[str]
+        """
+        :param timeout: seconds, None to wait until something changes
+        :return: names of the changed files, empty when the timeout expires first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            stats = self._stat_all()
+            changed = {name for name in self._names if stats[name] != self._stats[name]}
+            self._stats = stats
+            if changed:
+                return changed
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(self._interval, remaining))
+            else:
+                time.sleep(self._interval)
+
+    def close(self):  # type: () -> None
+        pass
+
+
+class InotifyWatcher:
+    """
+    notices changes to files of a directory through Linux inotify, called through ctypes
+    """
+
+    def __init__(self, directory, names):  # type: (Path, Iterable[str]) -> None
+        """
+        :raise OSError: when inotify is not available
+        """
+        self._names = frozenset(names)
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # the directory is watched, editors and pipenv replace files rather than write them in place
+        if (
+            libc.inotify_add_watch(
+                self._fd, os.fsencode(str(directory)), _WATCHED_EVENTS
+            )
+            < 0
+        ):
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error))
+
+    def wait(self, timeout=None):  # type: (Optional[float]) -> Set[str]
+        """
+        :param timeout: seconds, None to wait until something changes
+        :return: names of the changed files, empty when the timeout expires first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = (
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            )
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            changed = self._read_events()
+            if changed:
+                return changed
+
+    def _read_events(self):  # type: () -> Set[str]
+        changed = set()  # type: Set[str]
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            _, _, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset : offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            if name in self._names:
+                changed.add(name)
+        return changed
+
+    def close(self):  # type: () -> None
+        os.close(self._fd)
+
+
+def make_watcher(
+    directory, names, polling=False, interval=0.5
+):  # type: (Path, Iterable[str], bool, float) -> Any
+    """
+    :return: an inotify watcher, or a polling one when asked for or when inotify is not available
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(directory, names)
+        except OSError:
+            pass
+    return PollingWatcher(directory, names, interval)
+
+
+def wait_for_quiet(
+    watcher, changed, debounce
+):  # type: (Any, Set[str], float) -> Set[str]
+    """
+    keep collecting changes until none comes for `debounce` seconds, a lock or an editor save is a burst of writes
+
+    :param changed: the changes that started the burst
+    :return: every file changed during the burst
+    """
+    changed = set(changed)
+    while True:
+        more = watcher.wait(debounce)
+        if not more:
+            return changed
+        changed |= more
+
+
+def section_digests(session):  # type: (Any) -> Dict[str, str]
+    """
+    :param session: a parsed Pipfile or Pipfile.lock
+    :return: a digest of the default and of the dev packages, changes elsewhere in the file (hashes of the lock
+        metadata, sources...) do not matter to setup.py
+    """
+
+    def digest(section):  # type: (Any) -> str
+        return hashlib.sha256(
+            json.dumps(
+                section, sort_keys=True, default=lambda package: package.to_json()
+            ).encode("utf-8")
+        ).hexdigest()
+
+    return {
+        "default": digest(session.get_default_packages()),
+        "dev": digest(session.get_dev_packages()),
+    }
+
+
+class Resyncer:
+    """
+    re-runs the part of `main.sync` affected by a change of the Pipfile or Pipfile.lock of the current directory,
+    the one `main.sync` reads and writes
+    """
+
+    def __init__(self, argv):  # type: (Any) -> None
+        """
+        :param argv: the parsed arguments of the watch subcommand, sync options included
+        """
+        self._argv = argv
+        self._source_path = Path("Pipfile" if argv.pipfile else "Pipfile.lock")
+        self._setup_file_path = Path("setup.py")
+        self._digests = {}  # type: Dict[str, str]
+        session = self._load_session()
+        if session is not None:
+            self._digests = section_digests(session)
+
+    @property
+    def source_name(self):  # type: () -> str
+        return self._source_path.name
+
+    def _load_session(self):  # type: () -> Any
+        from pipenv_setup import lockfile_parser, pipfile_parser
+        from pipenv_setup.cache import CACHE_DIR_NAME, ResultCache, load_session
+
+        if not self._source_path.exists():
+            return None
+        if self._argv.pipfile:
+            session_class = pipfile_parser.PipfileSession  # type: Any
+        else:
+            session_class = lockfile_parser.LockfileSession
+        return load_session(
+            session_class,
+            self._source_path,
+            ResultCache(
+                self._source_path.parent / CACHE_DIR_NAME,
+                enabled=not self._argv.no_cache,
+            ),
+        )
+
+    def resync(self):  # type: () -> Optional[FrozenSet[str]]
+        """
+        :return: the synced sections, "default" and/or "dev": syncing the default packages syncs the dev ones as
+            well with `--dev`. None when the file did not change what setup.py depends on
+        :raise SystemExit: when the sync fails, as `main.sync` does
+        """
+        from pipenv_setup.main import sync
+
+        session = self._load_session()
+        if session is None:
+            return None
+        digests = section_digests(session)
+        changed = frozenset(
+            section
+            for section in ("default", "dev")
+            if digests[section] != self._digests.get(section)
+            and (section == "default" or self._argv.dev)
+        )
+        if not changed:
+            self._digests = digests
+            return None
+        # the dev packages alone are synced only to an existing setup.py
+        default = "default" in changed or not self._setup_file_path.exists()
+        sync(self._argv, session=session, default=default)
+        self._digests = digests
+        if default and self._argv.dev:
+            return frozenset(("default", "dev"))
+        return frozenset(("default",)) if default else changed
+
+
+def watch(argv, max_resyncs=None):  # type: (Any, Optional[int]) -> None
+    """
+    re-sync setup.py after every change of the Pipfile or Pipfile.lock of the current directory until interrupted
+
+    :param max_resyncs: stop after that many changes, None to run until interrupted
+    """
+    from pipenv_setup.main import congratulate
+
+    resyncer = Resyncer(argv)
+    watcher = make_watcher(
+        Path("."), [resyncer.source_name], argv.poll, argv.poll_interval
+    )
+    print(msg_formatter.watching(resyncer.source_name, type(watcher) is PollingWatcher))
+    resync_count = 0
+    try:
+        while max_resyncs is None or resync_count < max_resyncs:
+            changed = watcher.wait()
+            changed = wait_for_quiet(watcher, changed, argv.debounce)
+            start_time = time.perf_counter()
+            try:
+                sections = resyncer.resync()
+            except SystemExit:
+                # the error is printed already, wait for a fixed file
+                print(msg_formatter.resync_failed(), file=sys.stderr)
+                continue
+            except Exception as e:
+                # a half written or broken file must not stop watching
+                print("%s: %s" % (type(e).__name__, e), file=sys.stderr)
+                print(msg_formatter.resync_failed(), file=sys.stderr)
+                continue
+            finally:
+                resync_count += 1
+            elapsed = time.perf_counter() - start_time
+            if sections is None:
+                print(msg_formatter.no_dependency_change(resyncer.source_name))
+            else:
+                congratulate(msg_formatter.resynced(sorted(sections), elapsed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
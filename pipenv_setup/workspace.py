@@ -0,0 +1,143 @@
+"""
+check every project found under a directory, in parallel
+"""
+import argparse
+import importlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from colorama import Fore
+from pathlib import Path
+
+from pipenv_setup import msg_formatter
+from pipenv_setup.constants import FindingKind
+
+if TYPE_CHECKING:
+    from pipenv_setup.inconsistency_checker import Finding
+
+# directories that never hold a project worth checking
+_skipped_directory_names = frozenset(["node_modules", "__pycache__", "site-packages"])
+
+
+def find_projects(root):  # type: (Path) -> List[Path]
+    """
+    :return: every directory under `root`, `root` included, that has both a Pipfile and a setup.py. Sorted, hidden
+        directories (.git, .venv, ...) are not searched
+    """
+    projects = []
+    for directory, directory_names, file_names in os.walk(str(root)):
+        directory_names[:] = [
+            name
+            for name in directory_names
+            if not name.startswith(".") and name not in _skipped_directory_names
+        ]
+        if "Pipfile" in file_names and "setup.py" in file_names:
+            projects.append(Path(directory))
+    return sorted(projects)
+
+
+def warm_up():  # type: () -> None
+    """
+    import the parsers once per worker process, not once per project
+    """
+    for module in (
+        "pipenv_setup.main",
+        "pipenv_setup.inconsistency_checker",
+        "pipenv_setup.lockfile_parser",
+        "pipenv_setup.pipfile_parser",
+        "pipenv_setup.setup_parser",
+    ):
+        importlib.import_module(module)
+
+
+def _check_project(
+    project, args
+):  # type: (Path, argparse.Namespace) -> Tuple[Path, List[Finding]]
+    from pipenv_setup.inconsistency_checker import Finding
+    from pipenv_setup.main import iter_project_findings
+
+    findings = []  # type: List[Finding]
+    try:
+        for finding in iter_project_findings(project, args):
+            findings.append(finding)
+    except Exception as e:
+        # one broken project must not take the others down
+        findings.append(
+            Finding.error("%s: %s\ndependency check failed" % (type(e).__name__, e))
+        )
+    if findings and findings[-1].kind is FindingKind.ERROR:
+        return project, findings[-1:]
+    return project, findings
+
+
+def check_projects(
+    projects, args, jobs=None
+):  # type: (List[Path], argparse.Namespace, Optional[int]) -> Iterator[Tuple[Path, List[Finding]]]
+    """
+    :param jobs: number of worker processes, the number of CPUs by default. With 1, projects are checked in this
+        process
+    :return: (project, findings) pairs, in the order of `projects`
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(projects))
+    if jobs <= 1:
+        for project in projects:
+            yield _check_project(project, args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=warm_up) as executor:
+        # map() yields in submission order, whichever worker finishes first. Closing this generator early cancels
+        # the projects no worker has started
+        for result in executor.map(
+            _check_project, projects, [args] * len(projects), chunksize=4
+        ):
+            yield result
+
+
+def check_workspace(
+    root, args, jobs=None, output_format="text"
+):  # type: (Path, argparse.Namespace, Optional[int], str) -> bool
+    """
+    check every project under `root` and print the problems of each failing one, then a summary
+
+    :param output_format: "text" for colored reports on stderr, "ndjson" or "json" for the records of
+        `pipenv_setup.main.write_records`, each with the path of its project relative to `root`
+    :return: whether every project passed the check
+    """
+    projects = find_projects(root)
+    if not projects:
+        print(msg_formatter.no_project_found(root), file=sys.stderr)
+        return False
+
+    if output_format != "text":
+        from pipenv_setup.main import write_records
+
+        def records():  # type: () -> Iterator[dict]
+            for project, findings in check_projects(projects, args, jobs):
+                for finding in findings:
+                    record = finding.to_dict()
+                    record["project"] = project.relative_to(root).as_posix()
+                    yield record
+                if findings and args.fail_fast:
+                    return
+
+        return write_records(records(), output_format) == 0
+
+    checked_count = failed_count = 0
+    for project, findings in check_projects(projects, args, jobs):
+        checked_count += 1
+        if findings:
+            failed_count += 1
+            print("%s:" % project.relative_to(root).as_posix(), file=sys.stderr)
+            for finding in findings:
+                print("  " + finding.message.replace("\n", "\n  "), file=sys.stderr)
+            if args.fail_fast:
+                break
+    summary = msg_formatter.workspace_summary(checked_count, failed_count)
+    if failed_count:
+        print(summary, file=sys.stderr)
+    else:
+        print(Fore.GREEN + summary + Fore.RESET)
+    return failed_count == 0
@@ -120,7 +120,7 @@ setup(
         # And include any *.msg files found in the 'hello' package, too:
         "pipenv_setup": ["res/*"]
     },
-    packages=find_packages(exclude=["tests", "docs"]),  # Required
+    packages=find_packages(exclude=["tests", "docs", "benchmarks"]),  # Required
     # Specify which Python versions you support. In contrast to the
     # 'Programming Language' classifiers above, 'pip install' will check this
     # and refuse to install the project if the version does not match. If you
@@ -154,7 +154,10 @@ setup(
         "typing~=3.7",
     ],  # Optional
     entry_points={
-        "console_scripts": ["pipenv-setup=pipenv_setup.main:cmd"]
+        "console_scripts": [
+            "pipenv-setup=pipenv_setup.main:cmd",
+            "pipenv-setup-client=pipenv_setup.client:main",
+        ]
     },  # Optional
     # List additional URLs that are relevant to your project as a dict.
     #
@@ -0,0 +1,51 @@
+import json
+from typing import Any
+
+from vistir.compat import Path
+
+from benchmarks import generators
+from benchmarks.run import PHASES, compare, main
+from pipenv_setup import msg_formatter
+from pipenv_setup.main import cmd
+from tests.conftest import cwd
+
+
+def test_generated_project_passes_check(capsys, tmp_path):  # type: (Any, Path) -> None
+    pipfile, install_requires, dependency_links = generators.generate_project(24)
+    (tmp_path / "Pipfile").write_text(pipfile)
+    (tmp_path / "Pipfile.lock").write_text(generators.generate_lockfile(24))
+    (tmp_path / "setup.py").write_text(
+        generators.generate_setup(install_requires, dependency_links, 40)
+    )
+    lockfile = json.loads((tmp_path / "Pipfile.lock").read_text())
+    assert len(lockfile["default"]) == 24
+    assert len(dependency_links) == 3
+
+    with cwd(tmp_path):
+        cmd(["", "check", "--strict", "--no-cache"])
+        assert msg_formatter.checked_no_problem() in capsys.readouterr().out
+        cmd(["", "sync", "--dev", "--no-cache"])
+        assert "24 default packages" in capsys.readouterr().out
+
+
+def test_generators_are_deterministic():
+    assert generators.generate_project(30, seed=1) == generators.generate_project(
+        30, seed=1
+    )
+    assert generators.generate_lockfile(30, seed=1) != generators.generate_lockfile(
+        30, seed=2
+    )
+
+
+def test_run_writes_comparable_results(capsys, tmp_path):  # type: (Any, Path) -> None
+    output = tmp_path / "results.json"
+    main(
+        ["--packages", "3", "--padding", "0", "--repeat", "1", "--output", str(output)]
+    )
+    results = json.loads(output.read_text())
+    assert results["results"][0]["packages"] == 3
+    assert set(results["results"][0]["phases"]) == set(PHASES)
+
+    lines = compare(results, results)
+    assert len(lines) == 1 + len(PHASES)
+    assert lines[1].endswith("1.00x")
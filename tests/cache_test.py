@@ -0,0 +1,99 @@
+import os
+from typing import Any
+
+import pytest
+from vistir.compat import Path
+
+from pipenv_setup import inconsistency_checker, msg_formatter
+from pipenv_setup.cache import CACHE_DIR_NAME, ResultCache
+from pipenv_setup.main import cmd
+from tests.conftest import data
+
+
+def test_roundtrip(tmp_path):  # type: (Path) -> None
+    cache = ResultCache(tmp_path / "cache")
+    key = cache.key("kind", b"content")
+    assert cache.get(key) is None
+    cache.set(key, [["a", 1], {"b": None}])
+    assert cache.get(key) == [["a", 1], {"b": None}]
+    assert (tmp_path / "cache" / ".gitignore").read_text() == "*\n"
+
+
+def test_key_depends_on_every_part():
+    keys = {
+        ResultCache.key("kind", b"ab", b"c"),
+        ResultCache.key("kind", b"a", b"bc"),
+        ResultCache.key("other", b"ab", b"c"),
+        ResultCache.key("kind", b"ab", b"c", True),
+    }
+    assert len(keys) == 4
+    assert ResultCache.key("kind", b"ab") == ResultCache.key("kind", b"ab")
+
+
+def test_disabled(tmp_path):  # type: (Path) -> None
+    cache = ResultCache(tmp_path / "cache", enabled=False)
+    key = cache.key("kind")
+    cache.set(key, 1)
+    assert cache.get(key) is None
+    assert not (tmp_path / "cache").exists()
+
+
+def test_evicts_least_recently_used(tmp_path):  # type: (Path) -> None
+    directory = tmp_path / "cache"
+    entry_size = len("[%s]" % ("0" * 100))
+    cache = ResultCache(directory, max_size=entry_size * 2)
+    keys = [cache.key("kind", str(i)) for i in range(3)]
+
+    for i, key in enumerate(keys[:2]):
+        cache.set(key, ["0" * 98])
+        os.utime(str(directory / (key + ".json")), (i, i))
+    # reading the oldest entry makes the other one the least recently used
+    assert cache.get(keys[0]) is not None
+    cache.set(keys[2], ["0" * 98])
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+
+
+@pytest.mark.parametrize(
+    ("source_pipfile_dirname", "argv"),
+    [
+        ("loose_pass_strict_fail_0", ["", "check"]),
+        ("lockfile_vcs_branch_0", ["", "check", "--lockfile"]),
+    ],
+)
+def test_check_served_from_cache(
+    capsys, monkeypatch, tmp_path, source_pipfile_dirname, argv
+):  # type: (Any, Any, Path, str, list) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(argv=argv)
+        first_output = capsys.readouterr().out
+        assert Path(CACHE_DIR_NAME).is_dir()
+
+        def fail(*args, **kwargs):  # type: (Any, Any) -> None
+            raise AssertionError("the check should have been served from the cache")
+
+        monkeypatch.setattr(inconsistency_checker, "InconsistencyChecker", fail)
+        cmd(argv=argv)
+        assert capsys.readouterr().out == first_output
+
+        with pytest.raises(AssertionError):
+            cmd(argv=argv + ["--no-cache"])
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("loose_pass_strict_fail_0",)])
+def test_check_invalidated_by_setup_change(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(argv=["", "check"])
+        assert msg_formatter.checked_no_problem() in capsys.readouterr().out
+
+        setup_file = Path("setup.py")
+        setup_file.write_text(
+            setup_file.read_text().replace('"records==0.5.2"', '"records==0.1.0"')
+        )
+        with pytest.raises(SystemExit) as e:
+            cmd(argv=["", "check"])
+        assert e.value.code == 1
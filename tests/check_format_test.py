@@ -0,0 +1,98 @@
+import json
+from typing import Any
+
+import pytest
+from vistir.compat import Path
+
+from pipenv_setup.main import cmd
+from tests.conftest import data
+
+
+def check_records(capsys, output_format, *arguments):  # type: (Any, str, str) -> Any
+    with pytest.raises(SystemExit) as e:
+        cmd(["", "check", "--format", output_format] + list(arguments))
+    assert e.value.code == 1
+    captured = capsys.readouterr()
+    assert captured.err == ""
+    return captured.out
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("many_conflicts_0",)])
+def test_check_ndjson(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        out = check_records(capsys, "ndjson")
+        records = [json.loads(line) for line in out.splitlines()]
+        assert [(record["package"], record["kind"]) for record in records] == [
+            ("numpy", "version-conflict"),
+            ("pywinusb", "version-conflict"),
+            ("records", "version-conflict"),
+            ("django", "ref-mismatch"),
+            ("requests", "missing-in-install-requires"),
+            ("e682b37", "missing-in-dependency-links"),
+        ]
+        assert records[1] == {
+            "package": "pywinusb",
+            "kind": "version-conflict",
+            "setup_spec": "==0.4.2",
+            "pipfile_spec": "~=0.3.0",
+            "conflict": "DISJOINT",
+            "message": "package 'pywinusb' has version string: ==0.4.2 in setup.py, which is disjoint from"
+            " ~=0.3.0 in pipfile",
+        }
+
+        # the same records restored from the cache, and as a json array
+        assert check_records(capsys, "ndjson") == out
+        assert json.loads(check_records(capsys, "json")) == records
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("loose_pass_strict_fail_0",)])
+def test_check_json_passing(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "check", "--format", "json"])
+        assert json.loads(capsys.readouterr().out) == []
+        records = json.loads(check_records(capsys, "json", "--strict"))
+        assert {record["conflict"] for record in records} == {"COMPATIBLE"}
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("broken_0",)])
+def test_check_ndjson_error(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        (record,) = map(
+            json.loads, check_records(capsys, "ndjson", "--ignore-local").splitlines()
+        )
+    assert record["kind"] == "error" and record["package"] is None
+
+
+def test_check_workspace_ndjson(capsys, tmp_path):  # type: (Any, Path) -> None
+    for directory, source_pipfile_dirname in (
+        ("a", "generic_nice_1"),
+        ("b", "many_conflicts_0"),
+    ):
+        (tmp_path / directory).mkdir()
+        with data(source_pipfile_dirname, tmp_path / directory):
+            pass
+    out = check_records(capsys, "ndjson", "--workspace", str(tmp_path), "--jobs", "1")
+    records = [json.loads(line) for line in out.splitlines()]
+    assert {record["project"] for record in records} == {"a", "b"}
+    assert len([record for record in records if record["project"] == "b"]) == 6
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("many_conflicts_0",)])
+def test_check_fail_fast(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        (record,) = map(
+            json.loads, check_records(capsys, "ndjson", "--fail-fast").splitlines()
+        )
+        assert (record["package"], record["kind"]) == ("numpy", "version-conflict")
+
+        # the first record of the cached full report
+        check_records(capsys, "ndjson")
+        assert check_records(capsys, "ndjson", "-x") == json.dumps(record) + "\n"
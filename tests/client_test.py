@@ -0,0 +1,267 @@
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+from typing import Any, Iterator, Optional
+
+import pytest
+from colorama import Fore
+from vistir.compat import Path
+
+from pipenv_setup import client, msg_formatter, server
+from pipenv_setup.main import cmd
+from tests.conftest import data
+
+
+@pytest.fixture
+def socket_path(tmp_path_factory, monkeypatch):  # type: (Any, Any) -> Iterator[Path]
+    # not in tmp_path: the test data copied there is writable by the group, the server refuses such a directory
+    path = tmp_path_factory.mktemp("run") / "s.sock"
+    monkeypatch.setenv(client.SOCKET_ENVIRONMENT_VARIABLE, str(path))
+    yield path
+
+
+def start_server(socket_path, max_requests):  # type: (Path, int) -> threading.Thread
+    thread = threading.Thread(target=server.serve, args=(socket_path, max_requests))
+    thread.start()
+    for _ in range(500):
+        if socket_path.exists() and stat.S_ISSOCK(os.stat(str(socket_path)).st_mode):
+            break
+        thread.join(0.01)
+    return thread
+
+
+def exit_code_of(command, *args):  # type: (Any, Any) -> Any
+    try:
+        command(*args)
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_default_socket_path(monkeypatch):  # type: (Any) -> None
+    monkeypatch.delenv(client.SOCKET_ENVIRONMENT_VARIABLE, raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert client.default_socket_path() == Path(
+        "/run/user/1000/pipenv-setup-%d.sock" % os.getuid()
+    )
+
+
+def test_default_socket_path_in_private_directory(monkeypatch):  # type: (Any) -> None
+    monkeypatch.delenv(client.SOCKET_ENVIRONMENT_VARIABLE, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert client.default_socket_path() == Path(tempfile.gettempdir()) / (
+        "pipenv-setup-%d/server.sock" % os.getuid()
+    )
+
+
+def listening_socket(path):  # type: (Path) -> socket.socket
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    os.chmod(str(path), 0o600)
+    listener.listen(1)
+    return listener
+
+
+def test_refuses_sockets_of_others(socket_path):  # type: (Path) -> None
+    with listening_socket(socket_path):
+        os.chmod(str(socket_path), 0o666)
+        assert not client.is_private_socket(socket_path)
+        assert client.forward(["check"], socket_path) is None
+
+        os.chmod(str(socket_path), 0o600)
+        assert client.is_private_socket(socket_path)
+        # anyone may replace a socket in this directory
+        os.chmod(str(socket_path.parent), 0o777)
+        assert not client.is_private_socket(socket_path)
+        os.chmod(str(socket_path.parent), 0o700)
+
+    socket_path.unlink()
+    socket_path.write_text("not a socket")
+    assert not client.is_private_socket(socket_path)
+
+
+def test_server_refuses_public_directory(tmp_path):  # type: (Path) -> None
+    os.chmod(str(tmp_path), 0o777)
+    with pytest.raises(OSError):
+        server.serve(tmp_path / "s.sock", max_requests=1)
+    assert not (tmp_path / "s.sock").exists()
+
+
+def test_server_creates_private_directory(tmp_path):  # type: (Path) -> None
+    socket_path = tmp_path / "run" / "s.sock"
+    thread = start_server(socket_path, max_requests=1)
+    assert stat.S_IMODE(os.stat(str(socket_path.parent)).st_mode) == 0o700
+    assert client.forward(["check", "--help"], socket_path) is not None
+    thread.join(5)
+
+
+@pytest.mark.parametrize(
+    ("source_pipfile_dirname", "argv", "exit_code"),
+    [
+        ("loose_pass_strict_fail_0", ["", "check"], 0),
+        ("loose_pass_strict_fail_0", ["", "check", "--strict"], 1),
+    ],
+)
+def test_forwarded_like_in_process(
+    capsys, socket_path, tmp_path, source_pipfile_dirname, argv, exit_code
+):  # type: (Any, Path, Path, str, list, int) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        assert exit_code_of(cmd, argv + ["--no-cache"]) == exit_code
+        in_process = capsys.readouterr()
+
+        thread = start_server(socket_path, max_requests=1)
+        capsys.readouterr()
+        assert stat.S_IMODE(os.stat(str(socket_path)).st_mode) == 0o600
+        assert exit_code_of(client.main, argv + ["--no-cache"]) == exit_code
+        thread.join(5)
+        assert not thread.is_alive()
+        forwarded = capsys.readouterr()
+        assert not socket_path.exists()
+
+    # the client strips the colors when its output is not a terminal
+    assert forwarded.out == in_process.out.replace(Fore.GREEN, "").replace(
+        Fore.RESET, ""
+    )
+    assert forwarded.err == in_process.err
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("loose_pass_strict_fail_0",)])
+def test_falls_back_to_in_process(
+    capsys, socket_path, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        assert client.forward(["check"], socket_path) is None
+        client.main(["", "check"])
+    assert msg_formatter.checked_no_problem() in capsys.readouterr().out
+
+
+def test_server_runs_only_check_and_sync(socket_path):  # type: (Path) -> None
+    thread = start_server(socket_path, max_requests=1)
+    response = client.forward(["watch"], socket_path)
+    thread.join(5)
+    assert response is not None
+    assert response["exit_code"] == 2
+    assert "only runs check and sync" in response["stderr"]
+
+
+def test_stale_socket_replaced(socket_path):  # type: (Path) -> None
+    socket_path.write_text("left behind")
+    thread = start_server(socket_path, max_requests=1)
+    response = client.forward(["check", "--help"], socket_path)
+    thread.join(5)
+    assert response is not None
+    assert response["exit_code"] == 0
+    assert "--strict" in response["stdout"]
+
+
+def answer_once(
+    socket_path, reply
+):  # type: (Path, Optional[bytes]) -> threading.Thread
+    """
+    stand in for a broken server: read one request, then send `reply` and hang up, or stall when it is None
+    """
+    listener = listening_socket(socket_path)
+
+    def answer():  # type: () -> None
+        with listener:
+            connection, _ = listener.accept()
+            with connection:
+                client.receive_line(connection)
+                if reply is None:
+                    # wait for the client to give up
+                    connection.recv(1)
+                else:
+                    connection.sendall(reply)
+
+    thread = threading.Thread(target=answer)
+    thread.start()
+    return thread
+
+
+def test_falls_back_when_connection_refused(socket_path):  # type: (Path) -> None
+    # a socket file left behind by a server that is gone
+    listening_socket(socket_path).close()
+    assert client.is_private_socket(socket_path)
+    assert client.forward(["check"], socket_path) is None
+
+
+@pytest.mark.parametrize(
+    ("reply",),
+    [
+        (None,),
+        (b"",),
+        (b"not json\n",),
+        (b'{"stdout": "", "stderr": "", "exit_co',),
+        (b'{"stdout": "\xff", "stderr": "", "exit_code": 0}\n',),
+        (b"[]\n",),
+        (b'{"stdout": "", "stderr": ""}\n',),
+        (b'{"stdout": null, "stderr": "", "exit_code": 0}\n',),
+        (b'{"stdout": "", "stderr": "", "exit_code": "0"}\n',),
+        (b'{"stdout": "", "stderr": "", "exit_code": true}\n',),
+    ],
+)
+def test_fails_once_the_command_is_sent(
+    socket_path, reply
+):  # type: (Path, Optional[bytes]) -> None
+    thread = answer_once(socket_path, reply)
+    response = client.forward(["check"], socket_path, timeout=0.5)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert response is not None
+    assert response["exit_code"] == 1
+    assert response["stdout"] == ""
+    assert "not running it again" in response["stderr"]
+
+
+# sync writes the missing keyword arguments to setup.py when it runs
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("no_original_kws_0",)])
+def test_sync_not_run_again(
+    capsys, socket_path, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        setup_code = Path("setup.py").read_text()
+        thread = answer_once(socket_path, b'{"exit_code": 0}\n')
+        assert exit_code_of(client.main, ["", "sync", "--dev"]) == 1
+        thread.join(5)
+        assert Path("setup.py").read_text() == setup_code
+    output = capsys.readouterr()
+    assert output.out == ""
+    assert "not running it again" in output.err
+
+
+@pytest.mark.parametrize(("replacement",), [("another server's",), (None,)])
+def test_server_leaves_other_files(
+    socket_path, replacement
+):  # type: (Path, Any) -> None
+    errors = []  # type: list
+
+    def serve():  # type: () -> None
+        try:
+            server.serve(socket_path, max_requests=1)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    for _ in range(500):
+        if socket_path.exists():
+            break
+        thread.join(0.01)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        socket_path.unlink()
+        if replacement is not None:
+            socket_path.write_text(replacement)
+        request = {"argv": ["check", "--help"], "cwd": os.getcwd(), "color": False}
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        assert client.receive_line(connection)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert errors == []
+    if replacement is None:
+        assert not socket_path.exists()
+    else:
+        assert socket_path.read_text() == replacement
@@ -0,0 +1,61 @@
+"""
+startup budget: the slow-to-import dependencies must only be loaded by the code paths that need them
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from .conftest import data
+
+# run a command in a fresh interpreter and report which of the heavy modules got imported
+PROBE = """
+import sys
+from pipenv_setup.main import cmd
+
+try:
+    cmd(sys.argv)
+except SystemExit:
+    pass
+heavy = ("requirementslib", "black", "pipfile", "packaging", "vistir", "pip_shims")
+print(" ".join(sorted(m for m in heavy if m in sys.modules)))
+"""
+
+
+def imported_heavy_modules(args, cwd):  # type: (list, Path) -> set
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE] + args,
+        cwd=str(cwd),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(
+                [str(Path(__file__).parent.parent), os.environ.get("PYTHONPATH", "")]
+            ),
+        ),
+    )
+    assert result.returncode == 0, result.stderr
+    return set(result.stdout.splitlines()[-1].split())
+
+
+@pytest.fixture
+def project(tmp_path):
+    with data("generic_nice_0", tmp_path) as path:
+        yield path
+
+
+@pytest.mark.parametrize(
+    ("args", "budget"),
+    [
+        [[], set()],
+        [["--help"], set()],
+        [["check", "--ignore-local"], {"pipfile", "packaging"}],
+        [["check", "--ignore-local", "--lockfile"], {"pipfile", "packaging"}],
+    ],
+)
+def test_import_budget(project, args, budget):
+    assert imported_heavy_modules(args, project) <= budget
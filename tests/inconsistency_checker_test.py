@@ -2,8 +2,8 @@ from typing import Dict, Any
 
 import pytest
 
-from pipenv_setup.constants import PipfileConfig
-from pipenv_setup.inconsistency_checker import InconsistencyChecker
+from pipenv_setup.constants import FindingKind, PipfileConfig
+from pipenv_setup.inconsistency_checker import Finding, InconsistencyChecker
 from pipenv_setup.inconsistency_checker import VersionConflict as VC
 
 
@@ -12,6 +12,11 @@ from pipenv_setup.inconsistency_checker import VersionConflict as VC
     [
         [["numpy"], {"numpy": "*"}, []],
         [["numpy> = 1.3"], {"numpy": "*"}, [("numpy", ">=1.3", "*", VC.COMPATIBLE)]],
+        [
+            ["NumPy[tests]==2.0.1"],
+            {"numpy": "~=1.2"},
+            [("NumPy[tests]", "==2.0.1", "~=1.2", VC.DISJOINT)],
+        ],
         [
             ["numpy > = 1.3"],
             {"numpy": "!=1.3"},
@@ -28,6 +33,11 @@ from pipenv_setup.inconsistency_checker import VersionConflict as VC
             [("numpy", "==2.0.1", "~=1.2", VC.DISJOINT)],
         ],
         [["numpy>=2.0, <3.0"], {"numpy": "~=2.0"}, []],
+        [
+            ["numpy~=2.1", "pandas ~= 1.0"],
+            {"numpy": "~=2.0", "pandas": "~=1.0"},
+            [("numpy", "~=2.1", "~=2.0", VC.COMPATIBLE)],
+        ],
         [
             ["numpy==2.1.2"],
             {"numpy": "~=2.0.2"},
@@ -66,6 +76,19 @@ def test__check_install_requires_conflicts(
             {"django": {"ref": "1.11.4", "editable": True}},
             ["package 'django' lacks 'git' key in pipfile"],
         ],
+        [
+            ["git+https://github.com/django/django.git#egg=django"],
+            {"django": {"version": "==1.11.4", "ref": "1.11.4"}},
+            [
+                "package 'django' lacks 'git' key in pipfile",
+                "package 'django' has branch/version 1.11.4 in pipfile but it's not specified in dependency_links",
+            ],
+        ],
+        [
+            ["git+https://github.com/django/django.git@1.11.4#egg=django"],
+            {"django": {"hg": "https://github.com/django/django.git", "ref": "1.11.4"}},
+            ["package 'django' lacks 'git' key in pipfile"],
+        ],
         [
             ["git+https://github.com/django/django.git@1.11.4#egg=django"],
             {
@@ -137,6 +160,14 @@ def test__check_install_requires_conflicts(
                 "git package 'django' specified in dependency_links is not a vcs package in pipfile"
             ],
         ],
+        [
+            ["git+https://github.com/django/django.git@1.11.4#egg=django"],
+            {"django": {"version": "==1.11.4", "extras": ["bcrypt"]}},
+            [
+                "package 'django' lacks 'git' key in pipfile",
+                "package 'django' has branch/version 1.11.4 in dependency_links but not in pipfile",
+            ],
+        ],
     ],
 )
 def test_check_dependency_links(
@@ -204,6 +235,20 @@ def test_check_dependency_links(
             },
             [],
         ],
+        [
+            ["Flask-SQLAlchemy", "zope.interface>=5", "requests[security,socks]"],
+            {
+                "flask_sqlalchemy": "*",
+                "Zope-Interface": "*",
+                "requests": {"version": "*", "extras": ["socks", "security"]},
+            },
+            [],
+        ],
+        [
+            ["requests"],
+            {"requests": {"version": "*", "extras": ["socks"]}, "py_yaml": "*"},
+            ["package 'py-yaml' in pipfile but not in install_requires"],
+        ],
     ],
 )
 def test_check_lacking_install_requires(
@@ -237,6 +282,16 @@ def test_check_lacking_install_requires(
             },
             ["package 'e682b37' has a url in pipfile but not in dependency_links"],
         ],
+        [
+            ["git+https://github.com/django/django.git@1.11.4#egg=Django_Rest"],
+            {
+                "django.rest": {
+                    "git": "https://github.com/django/django.git",
+                    "ref": "1.11.4",
+                }
+            },
+            [],
+        ],
     ],
 )
 def test_check_lacking_dependency_links(
@@ -246,3 +301,91 @@ def test_check_lacking_dependency_links(
     # noinspection PyTypeChecker
     checker = InconsistencyChecker([], dependency_links, pipfile_packages, False)
     assert checker.check_lacking_dependency_links() == actual_conflicts
+
+
+def test_iter_findings_yields_before_failing():
+    checker = InconsistencyChecker(
+        ["numpy==2.0"],
+        ["git+https://github.com/django/django.git"],
+        {"numpy": "~=1.2"},
+        False,
+    )
+    findings = checker.iter_findings()
+    finding = next(findings)
+    assert (finding.package, finding.kind, finding.conflict) == (
+        "numpy",
+        FindingKind.VERSION_CONFLICT,
+        VC.DISJOINT,
+    )
+    assert Finding.from_dict(finding.to_dict()) == finding
+    with pytest.raises(ValueError):
+        next(findings)
+
+
+def test_compatible_release_in_install_requires_checked():
+    # 'numpy~=1.2' used to be read as a package named 'numpy~', missing from install_requires
+    checker = InconsistencyChecker(["numpy~=1.2"], [], {"numpy": "~=1.2"}, False)
+    assert checker.check_lacking_install_requires() == []
+    checker = InconsistencyChecker(["numpy~=1.2"], [], {"numpy": "==2.0"}, False)
+    assert checker._check_install_requires_conflict() == [
+        ("numpy", "~=1.2", "==2.0", VC.DISJOINT)
+    ]
+
+
+@pytest.mark.parametrize(
+    ("link", "parsed"),
+    [
+        ["git+https://a.com/b.git@v1#egg=b", ("git", "https://a.com/b.git", "v1", "b")],
+        [
+            "git+https://a.com/b@c/d.git#egg=d",
+            ("git", "https://a.com/b@c/d.git", None, "d"),
+        ],
+        # without a "/" after the "+", the old character loop took everything from the "+" on for the ref
+        ["git+b.git#egg=b", ("git", "b.git", "+b.git", "b")],
+    ],
+)
+def test_parse_vcs_link(link, parsed):  # type: (str, Any) -> None
+    assert InconsistencyChecker._parse_vcs_link(link) == parsed
+
+
+def test_table_without_vcs_key_compared_by_ref():
+    checker = InconsistencyChecker(
+        [],
+        ["git+https://github.com/django/django.git@1.11.5#egg=django"],
+        {"django": {"ref": "1.11.4", "editable": True}},
+        False,
+    )
+    kinds = [finding.kind for finding in checker.iter_findings()]
+    assert kinds == [
+        FindingKind.VCS_KEY_MISSING,
+        FindingKind.REF_MISMATCH,
+        FindingKind.MISSING_IN_INSTALL_REQUIRES,
+    ]
+
+
+def test_iter_findings_is_the_four_checks():
+    checker = InconsistencyChecker(
+        ["numpy==2.0", "pandas", "flask~=1.0"],
+        [
+            "git+https://github.com/django/django.git@1.11.4#egg=django",
+            "git+https://github.com/psf/requests.git#egg=requests",
+            "https://example.com/archive.zip",
+        ],
+        {
+            "numpy": "~=1.2",
+            "flask": "==1.1",
+            "black": "*",
+            "django": {"git": "https://github.com/django/django.git", "ref": "2.0"},
+            "attrs": {"git": "https://github.com/python-attrs/attrs.git"},
+            "requests": {"git": "https://github.com/psf/requests.git"},
+            "e682b37": {"file": "https://example.com/other.zip"},
+            "colorama": "*",
+        },
+        True,
+    )
+    assert [finding.message for finding in checker.iter_findings()] == (
+        checker.check_install_requires_conflict()
+        + checker.check_dependency_links_conflict()
+        + checker.check_lacking_install_requires()
+        + checker.check_lacking_dependency_links()
+    )
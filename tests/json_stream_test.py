@@ -0,0 +1,58 @@
+import io
+import json
+
+import pytest
+
+from pipenv_setup.json_stream import JsonStream
+
+DOCUMENT = {
+    "_meta": {"hash": {"sha256": "ab"}, "sources": [{"url": "x", "verify_ssl": True}]},
+    "default": {
+        'aé"\\': {"hashes": ["sha256:]{}", 'sha256:\\"['], "version": "==1.0"},
+        "b": {"number": 12345.5e-1, "empty": {}, "none": None, "list": [[], [1, [2]]]},
+    },
+    "develop": {},
+}
+
+
+def read(stream):
+    """
+    read the whole document, building every other value and skipping the others
+    """
+    document = {}
+    for index, key in enumerate(stream.iter_object()):
+        if index % 2:
+            stream.skip_value()
+        else:
+            document[key] = stream.read_value()
+    return document
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_read_and_skip(chunk_size, indent):
+    text = json.dumps(DOCUMENT, indent=indent)
+    stream = JsonStream(io.StringIO(text), chunk_size)
+    assert read(stream) == {"_meta": DOCUMENT["_meta"], "develop": {}}
+    assert stream.peek() == ""
+
+    stream = JsonStream(io.StringIO(text), chunk_size)
+    for key in stream.iter_object():
+        if key != "default":
+            stream.skip_value()
+            continue
+        entries = {}
+        for name in stream.iter_object():
+            entries[name] = {}
+            for entry_key in stream.iter_object():
+                entries[name][entry_key] = stream.read_value()
+        assert entries == DOCUMENT["default"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['{"a": 1', '{"a" 1}', '{"a": 1,}', "{1: 2}", "[1]", '{"a": [1}', '{"a": "b'],
+)
+def test_invalid_documents(text):
+    with pytest.raises(ValueError):
+        read(JsonStream(io.StringIO(text), 2))
@@ -1,4 +1,11 @@
+import json
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
 from pipenv_setup import lockfile_parser
+from pipenv_setup.lockfile_parser import import_requirementslib
 from tests.conftest import data
 
 
@@ -45,3 +52,92 @@ def test_use_dependency_links_file_enabled():
     )
     assert destination_kw == "dependency_links"
     assert value == "https://github.com/divio/django-cms/archive/release/3.4.x.zip"
+
+
+def test_session_parses_lockfile_once(tmp_path, monkeypatch):
+    Lockfile = import_requirementslib().Lockfile
+    create = Lockfile.create
+    calls = []
+
+    def counting_create(*args, **kwargs):
+        calls.append(args)
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(Lockfile, "create", counting_create)
+    with data("generic_nice_0", tmp_path) as cwd:
+        session = lockfile_parser.LockfileSession(cwd / "Pipfile.lock")
+        local, remote = session.get_default_packages()
+        dev_local, dev_remote = session.get_dev_packages()
+    # plain entries are read natively, requirementslib is not needed at all
+    assert calls == []
+    assert "gitdir" in dev_remote
+    assert "generic-package" in dev_local
+    assert "gitdir" not in remote
+
+
+@pytest.mark.parametrize(
+    ("source_dirname",),
+    [
+        (p.name,)
+        for p in sorted((Path(__file__).parent / "data").iterdir())
+        if (p / "Pipfile.lock.example").exists()
+    ],
+)
+def test_native_reader_matches_requirementslib(tmp_path, source_dirname):
+    """
+    the native reader should produce the same configs as requirementslib, minus the hashes
+    """
+    with data(source_dirname, tmp_path) as cwd:
+        lockfile = import_requirementslib().Lockfile.create(str(cwd))
+        session = lockfile_parser.LockfileSession(cwd / "Pipfile.lock")
+        expected = lockfile_parser._classify_packages(lockfile.get_deps())
+        expected_dev = lockfile_parser._classify_packages(lockfile.get_deps(dev=True))
+
+    # the hashes are dropped either way
+    assert expected == session.get_default_packages()
+    assert expected_dev == session.get_dev_packages()
+
+
+def test_native_reader_falls_back_for_unknown_entry(tmp_path):
+    with data("lock_package_broken_0", tmp_path) as cwd:
+        _, remote = lockfile_parser.LockfileSession(
+            cwd / "Pipfile.lock"
+        ).get_default_packages()
+    assert remote["django"].options["lmfao"] == "https://github.com/django/django.git"
+
+
+def test_iter_lockfile_entries_skips_hashes(tmp_path):
+    lockfile_path = tmp_path / "Pipfile.lock"
+    lock = {
+        "_meta": {"hash": {"sha256": "0" * 64}, "sources": []},
+        "default": {
+            "package-%d"
+            % i: {
+                "hashes": ["sha256:%064x" % (i * 1000 + j) for j in range(200)],
+                "version": "==1.%d" % i,
+            }
+            for i in range(300)
+        },
+        "develop": {"pytest": {"hashes": [], "version": "==7.0"}},
+    }
+    lockfile_path.write_text(json.dumps(lock, indent=4))
+
+    tracemalloc.start()
+    try:
+        entries = list(lockfile_parser.iter_lockfile_entries(lockfile_path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # a few chunks of the file, which is over 5MB, the hashes are never held
+    assert lockfile_path.stat().st_size > 5 * 1024 * 1024
+    assert peak < 1024 * 1024
+    assert entries[0] == ("default", "package-0", {"version": "==1.0"})
+    assert entries[-1] == ("develop", "pytest", {"version": "==7.0"})
+    assert len(entries) == 301
+
+
+def test_iter_lockfile_entries_missing_section(tmp_path):
+    lockfile_path = tmp_path / "Pipfile.lock"
+    lockfile_path.write_text('{"_meta": {}, "default": {}}')
+    with pytest.raises(ValueError):
+        list(lockfile_parser.iter_lockfile_entries(lockfile_path))
@@ -0,0 +1,65 @@
+import pickle
+
+import pytest
+
+from pipenv_setup.constants import PackageKind
+from pipenv_setup.package import Package
+
+
+@pytest.mark.parametrize(
+    ("config", "kind", "fields"),
+    [
+        ["*", PackageKind.PYPI, {"specifier": "*"}],
+        [
+            {"version": "==1.0", "extras": ["socks"], "markers": "os_name == 'nt'"},
+            PackageKind.PYPI,
+            {"specifier": "==1.0", "extras": ("socks",), "markers": "os_name == 'nt'"},
+        ],
+        [
+            {"git": "https://github.com/a/b.git", "ref": "v1", "editable": True},
+            PackageKind.VCS,
+            {
+                "vcs": "git",
+                "url": "https://github.com/a/b.git",
+                "ref": "v1",
+                "options": {"editable": True},
+            },
+        ],
+        [
+            {"file": "https://a.com/b.zip", "hashes": ["sha256:0"]},
+            PackageKind.FILE,
+            {"url": "https://a.com/b.zip"},
+        ],
+        [
+            {"path": ".", "editable": True},
+            PackageKind.LOCAL,
+            {"url": ".", "options": {"editable": True}},
+        ],
+        [
+            {"version": 1, "extras": "a", "os_name": "== 'nt'"},
+            PackageKind.PYPI,
+            {"options": {"version": 1, "extras": "a", "os_name": "== 'nt'"}},
+        ],
+    ],
+)
+def test_from_config(config, kind, fields):
+    package = Package.from_config("Some_Package", config)
+    assert package.kind is kind
+    assert package.normalized_name == "some-package"
+    for name in ("specifier", "extras", "markers", "vcs", "url", "ref", "options"):
+        assert getattr(package, name) == fields.get(name)
+
+    assert package.table is isinstance(config, dict)
+    config = config if isinstance(config, dict) else {"version": config}
+    config.pop("hashes", None)
+    assert package.to_config() == config
+    assert Package.from_json(package.to_json()) == package
+    assert pickle.loads(pickle.dumps(package)) == package
+
+
+def test_immutable():
+    package = Package.from_config("numpy", "*")
+    with pytest.raises(AttributeError):
+        package.specifier = "==1.0"
+    with pytest.raises(AttributeError):
+        package.anything = None
@@ -0,0 +1,62 @@
+from pipenv_setup import parse_cache
+from pipenv_setup.inconsistency_checker import InconsistencyChecker
+from pipenv_setup.requirement_formatter import format_requirement_line
+
+
+def test_memoized_counts_hits_and_misses(monkeypatch):
+    monkeypatch.setattr(parse_cache, "_caches", {})
+    calls = []
+
+    @parse_cache.memoized("test square", max_size=2)
+    def square(x):  # type: (int) -> int
+        calls.append(x)
+        return x * x
+
+    assert [square(2), square(2), square(3), square(4), square(2)] == [4, 4, 9, 16, 4]
+    # 2 was evicted by 4, the least recently used entry at that point
+    assert calls == [2, 3, 4, 2]
+    info = parse_cache.cache_info()["test square"]
+    assert (info.hits, info.misses, info.currsize, info.maxsize) == (1, 4, 2, 2)
+
+
+def test_versions_are_interned():
+    assert parse_cache.parse_version("1.2.3") is parse_cache.parse_version("1.2.3")
+
+
+def test_checker_and_formatter_share_parsing():
+    parse_cache.cache_clear()
+    pins = {"package-%d" % i: "==1.0" for i in range(50)}
+    checker = InconsistencyChecker(
+        ["%s==1.0" % name for name in pins], [], pins, strict=True
+    )
+    assert checker.check_install_requires_conflict() == []
+    for name, version in pins.items():
+        assert format_requirement_line(name, version) == name + "==1.0"
+
+    info = parse_cache.cache_info()
+    assert info["version intervals"].misses == 1
+    assert info["version intervals"].hits == 99
+    assert info["version"].misses == 1
+    assert info["specifier"].misses == 1
+    assert info["specifier"].hits == 49
+
+
+def test_dependency_links_are_parsed_once():
+    parse_cache.cache_clear()
+    links = [
+        "git+https://github.com/p/package-%d.git@v1#egg=package-%d" % (i, i)
+        for i in range(20)
+    ]
+    packages = {
+        "package-%d"
+        % i: {"git": "https://github.com/p/package-%d.git" % i, "ref": "v1"}
+        for i in range(20)
+    }
+    checker = InconsistencyChecker([], links, packages, strict=True)
+    assert list(checker.iter_findings()) == []
+    info = parse_cache.cache_info()["vcs links"]
+    assert (info.misses, info.hits) == (20, 0)
+
+    assert checker.check_lacking_dependency_links() == []
+    info = parse_cache.cache_info()["vcs links"]
+    assert (info.misses, info.hits) == (20, 20)
@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+import pipfile
+import pytest
+
+from pipenv_setup import pipfile_parser
+from pipenv_setup.lockfile_parser import import_requirementslib
+from pipenv_setup.requirement_formatter import (
+    format_requirement_line,
+    format_requirement_line_natively,
+)
+
+DATA_DIR = Path(__file__).parent / "data"
+
+
+def fixture_packages():
+    """
+    every pypi package config found in the Pipfiles and lockfiles under tests/data
+    """
+    packages = []
+    for path in sorted(DATA_DIR.rglob("Pipfile.example")):
+        sections = pipfile.load(str(path)).data
+        for section in ("default", "develop"):
+            packages += sorted(sections[section].items())
+    for path in sorted(DATA_DIR.rglob("Pipfile.lock.example")):
+        sections = json.loads(path.read_text())
+        for section in ("default", "develop"):
+            packages += sorted(sections[section].items())
+    # others may require network access in requirementslib
+    return [
+        (name, config)
+        for name, config in packages
+        if pipfile_parser.is_pypi_package(config)
+    ]
+
+
+EXTRA_CASES = [
+    ("Numpy", "~=1.0"),
+    ("numpy", ""),
+    ("some_pkg", "== 1.0"),
+    ("zope.interface", "===1.0"),
+    ("numpy", "==1.0.*"),
+    ("numpy", {}),
+    ("numpy", {"version": "*", "index": "pypi"}),
+    ("requests", {"extras": ["socks", "Security", "socks"]}),
+    ("numpy", {"version": "==1.0", "markers": 'os_name == "nt"'}),
+    ("numpy", {"version": "==1.0", "markers": "(os_name=='nt')"}),
+    ("numpy", {"version": "==1.0", "markers": "'linux' in sys_platform"}),
+    (
+        "numpy",
+        {"version": "==1.0", "os_name": "== 'nt'", "markers": "python_version>'3'"},
+    ),
+    ("numpy", "1.0"),
+    ("numpy", {"version": "==1.0", "sys_platform": "!= 'win32'"}),
+    ("numpy", {"version": "==1.0", "editable": True}),
+    ("boto3-stubs[s3,ec2]", ">=1.18.31"),
+]
+
+
+def as_comparable(line):  # type: (str) -> tuple
+    """
+    requirementslib emits multi-clause version specifiers in arbitrary order
+    """
+    requirement, _, markers = line.partition(";")
+    head = requirement
+    for i, c in enumerate(requirement):
+        if c in "=<>!~":
+            head = requirement[:i]
+            break
+    clauses = frozenset(requirement[len(head) :].split(","))
+    return head, clauses, markers
+
+
+@pytest.mark.parametrize(("name", "config"), fixture_packages() + EXTRA_CASES)
+def test_same_as_requirementslib(name, config):
+    try:
+        expected = (
+            import_requirementslib()
+            .Requirement.from_pipfile(name, config)
+            .as_line(include_hashes=False)
+        )
+    except Exception:
+        # configs requirementslib chokes on are still handed to it
+        with pytest.raises(Exception):
+            format_requirement_line(name, config)
+        return
+    actual = format_requirement_line(name, config)
+    if "," in actual:
+        assert as_comparable(actual) == as_comparable(expected)
+    else:
+        assert actual == expected
+
+
+def test_fixtures_are_formatted_natively():
+    packages = fixture_packages()
+    assert len(packages) > 100
+    for name, config in packages:
+        if isinstance(config, dict) and config.get("editable"):
+            continue
+        assert format_requirement_line_natively(name, config) is not None, (
+            name,
+            config,
+        )
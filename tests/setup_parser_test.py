@@ -44,3 +44,26 @@ def test_get_extras_dev_list_node(setup_filename, expected_returnee, tmp_path):
             assert expected_returnee is None
         else:
             assert ast.literal_eval(node) == expected_returnee
+
+
+def test_setup_call_is_searched_once_per_tree(monkeypatch):
+    calls = []
+    find = setup_parser._find_setup_call_node
+
+    def counting_find(root_node):
+        calls.append(root_node)
+        return find(root_node)
+
+    monkeypatch.setattr(setup_parser, "_find_setup_call_node", counting_find)
+    root_node = ast.parse(
+        "setup(install_requires=['a'], dependency_links=[], extras_require={'dev': ['b']})"
+    )
+    assert setup_parser.get_kw_list_node(root_node, "install_requires") is not None
+    assert setup_parser.get_kw_list_node(root_node, "dependency_links") is not None
+    assert setup_parser.get_extras_require_dev_list_node(root_node) is not None
+    assert set(setup_parser.get_setup_keywords(root_node)) == {
+        "install_requires",
+        "dependency_links",
+        "extras_require",
+    }
+    assert calls == [root_node]
@@ -1,4 +1,8 @@
+import ast
 from collections import defaultdict
+from typing import Any
+
+import pytest
 from pipenv_setup import setup_updater
 from pathlib import Path
 from .conftest import data
@@ -15,3 +19,356 @@ def test_no_unnecessary_dependency_link(tmp_path):
 
         setup_updater.update_setup(defaultdict(list), path / "setup.py")
         assert "dependency_links=[]," not in setup_file.read_text()
+
+
+def test_rewrite_parses_and_tokenizes_once(monkeypatch):
+    calls = []
+    parse = setup_updater.ast.parse
+    generate_tokens = setup_updater.tokenize.generate_tokens
+
+    def counting_parse(*args, **kwargs):
+        calls.append("parse")
+        return parse(*args, **kwargs)
+
+    def counting_generate_tokens(*args, **kwargs):
+        calls.append("tokenize")
+        return generate_tokens(*args, **kwargs)
+
+    monkeypatch.setattr(setup_updater.ast, "parse", counting_parse)
+    monkeypatch.setattr(
+        setup_updater.tokenize, "generate_tokens", counting_generate_tokens
+    )
+    code = setup_updater.rewrite_setup_code(
+        'setup(\n    name="x",\n    install_requires=["old"],\n    extras_require={"dev": ["old"]},\n)\n',
+        {
+            "install_requires": ["a"],
+            "dependency_links": ["git+https://a.com/b.git#egg=b"],
+            "extras_require": ["c"],
+        },
+        dev=True,
+    )
+    assert sorted(calls) == ["parse", "tokenize"]
+    assert code == (
+        "setup(dependency_links=['git+https://a.com/b.git#egg=b'],\n"
+        '    name="x",\n'
+        "    install_requires=['a'],\n"
+        "    extras_require={\"dev\": ['c',]},\n"
+        ")\n"
+    )
+
+
+def test_rewrite_attribute_setup_call():
+    code = setup_updater.rewrite_setup_code(
+        'import setuptools\nsetuptools.setup(name="ü", install_requires=[\n"old"])\n',
+        {"install_requires": ["a"], "dependency_links": [], "extras_require": ["b"]},
+        dev=True,
+    )
+    assert code == (
+        "import setuptools\n"
+        "setuptools.setup(extras_require={\"dev\": ['b',]},"
+        "name=\"ü\", install_requires=['a'])\n"
+    )
+
+
+def test_rewrite_dev_only():
+    code = 'setup(install_requires=["old"], extras_require={"dev": ["b"]})\n'
+    dependency_arguments = {
+        "install_requires": [],
+        "dependency_links": ["git+https://a.com/b"],
+        "extras_require": ["c"],
+    }
+    assert (
+        setup_updater.is_in_sync(
+            ast.parse(code), dependency_arguments, dev=True, default=False
+        )
+        is False
+    )
+    assert setup_updater.rewrite_setup_code(
+        code, dependency_arguments, dev=True, default=False
+    ) == ('setup(install_requires=["old"], extras_require={"dev": [\'c\',]})\n')
+
+
+def test_bracket_index_ignores_brackets_in_strings_and_comments():
+    code = 'setup(\n    a=["[", "(x"],  # ] )\n    b={"k": [1, (2, 3)]},\n)\n'
+    index = setup_updater.BracketIndex(code)
+    assert index.closer((1, 5)) == (4, 0)
+    assert index.closer((2, 6)) == (2, 16)
+    assert index.closer((3, 6)) == (3, 23)
+    assert index.closer((3, 12)) == (3, 22)
+    assert index.closer((3, 16)) == (3, 21)
+    assert index.closer((2, 7)) is None
+    assert index.next_opener((2, 0), "{") == (3, 6)
+    assert index.next_opener((3, 7), "{") is None
+
+
+@pytest.mark.parametrize(
+    ("code", "dependency_arguments", "dev", "in_sync"),
+    [
+        (
+            'setup(install_requires=["a"], dependency_links=[])',
+            {"install_requires": ["a"], "dependency_links": [], "extras_require": []},
+            False,
+            True,
+        ),
+        (
+            'setup(install_requires=["a", "b"])',
+            {"install_requires": ["b", "a"], "dependency_links": []},
+            False,
+            False,
+        ),
+        (
+            'setup(install_requires=["a"])',
+            {"install_requires": ["a"], "dependency_links": ["git+https://a.com/b"]},
+            False,
+            False,
+        ),
+        (
+            'setup(install_requires=["a"], extras_require={"dev": ["b"]})',
+            {"install_requires": ["a"], "dependency_links": [], "extras_require": []},
+            True,
+            False,
+        ),
+        (
+            'setup(install_requires=["a"], extras_require={"dev": ["b"]})',
+            {
+                "install_requires": ["a"],
+                "dependency_links": [],
+                "extras_require": ["b"],
+            },
+            True,
+            True,
+        ),
+        (
+            "setup(install_requires=[A])",
+            {"install_requires": [], "dependency_links": []},
+            False,
+            False,
+        ),
+    ],
+)
+def test_is_in_sync(code, dependency_arguments, dev, in_sync):
+    root_node = ast.parse(code)
+    assert setup_updater.is_in_sync(root_node, dependency_arguments, dev) is in_sync
+
+
+RANGE_DEPENDENCIES = {
+    "install_requires": [
+        "numpy==1.18.1",
+        "a-package-with-a-rather-long-name[extra]>=1.0",
+    ],
+    "dependency_links": [],
+    "extras_require": ["pytest"],
+}
+
+
+def test_format_only_edited_arguments():
+    code = (
+        "import setuptools\n"
+        "x = {'left':   'alone'}\n"
+        "setuptools.setup(\n"
+        "    name='x',\n"
+        "    install_requires=['old'],  # Optional\n"
+        "    extras_require={\n"
+        "        'test': ['untouched'],\n"
+        "        'dev': [],\n"
+        "    }\n"
+        ")\n"
+    )
+    formatter = setup_updater.get_black_formatter()
+    assert formatter is not None
+    assert setup_updater.rewrite_setup_code(
+        code, RANGE_DEPENDENCIES, dev=True, formatter=formatter
+    ) == (
+        "import setuptools\n"
+        "x = {'left':   'alone'}\n"
+        "setuptools.setup(\n"
+        "    name='x',\n"
+        "    install_requires=[\n"
+        '        "numpy==1.18.1",\n'
+        '        "a-package-with-a-rather-long-name[extra]>=1.0",\n'
+        "    ],  # Optional\n"
+        "    extras_require={\n"
+        '        "test": ["untouched"],\n'
+        '        "dev": [\n'
+        '            "pytest",\n'
+        "        ],\n"
+        "    },\n"
+        ")\n"
+    )
+
+
+def test_format_new_arguments_on_their_own_lines():
+    code = "setup(\n    name='x',\n)\n"
+    formatted = setup_updater.rewrite_setup_code(
+        code,
+        {"install_requires": ["a"], "dependency_links": [], "extras_require": ["b"]},
+        dev=True,
+        formatter=setup_updater.get_black_formatter(),
+    )
+    assert formatted == (
+        "setup(\n"
+        "    extras_require={\n"
+        '        "dev": [\n'
+        '            "b",\n'
+        "        ]\n"
+        "    },\n"
+        '    install_requires=["a"],\n'
+        "    name='x',\n"
+        ")\n"
+    )
+
+
+def test_format_whole_code_when_arguments_share_lines():
+    code = "x = {'a':   1}\nsetup(name='x', install_requires=['old'])\n"
+    formatted = setup_updater.rewrite_setup_code(
+        code,
+        {"install_requires": ["a"], "dependency_links": []},
+        formatter=setup_updater.get_black_formatter(),
+    )
+    assert formatted == 'x = {"a": 1}\nsetup(name="x", install_requires=["a"])\n'
+
+
+@pytest.mark.parametrize(
+    "source_pipfile_dirname",
+    ["generic_nice_0", "nasty_0", "no_original_kws_0", "lockfile_vcs_branch_0"],
+)
+@pytest.mark.parametrize("dev", [False, True])
+def test_range_formatting_agrees_with_whole_file_formatting(
+    source_pipfile_dirname, dev
+):
+    """
+    formatting the whole file afterwards changes nothing in the edited arguments
+    """
+    code = (
+        Path(__file__).parent / "data" / source_pipfile_dirname / "setup.py.example"
+    ).read_text()
+    formatter = setup_updater.get_black_formatter()
+    range_formatted = setup_updater.rewrite_setup_code(
+        code, RANGE_DEPENDENCIES, dev, formatter=formatter
+    )
+    whole_formatted = formatter.format_code(
+        setup_updater.rewrite_setup_code(code, RANGE_DEPENDENCIES, dev)
+    )
+    assert formatter.format_code(range_formatted) == whole_formatted
+
+
+def test_black_formatter_is_shared():
+    formatter = setup_updater.get_black_formatter()
+    assert formatter is setup_updater.get_black_formatter()
+    assert formatter.mode() is formatter.mode()
+    assert formatter.mode(80) is not formatter.mode()
+
+
+INCREMENTAL_SETUP = (
+    "setup(\n"
+    '    name="x",\n'
+    "    install_requires=[\n"
+    '        "attrs==19.1.0",\n'
+    "        # pinned for the old api\n"
+    '        "Django[bcrypt]==2.2",\n'
+    '        "numpy==1.18.1",  # keep\n'
+    '        "six==1.12.0"\n'
+    "    ],\n"
+    "    dependency_links=[],\n"
+    '    extras_require={"dev": [\n'
+    "        'pytest==5.0',\n"
+    "    ]},\n"
+    ")\n"
+)
+
+
+@pytest.mark.parametrize("formatter", [None, setup_updater.get_black_formatter()])
+def test_incremental_rewrite(formatter):
+    code = setup_updater.rewrite_setup_code(
+        INCREMENTAL_SETUP,
+        {
+            "install_requires": [
+                "aiohttp==3.6",
+                "django[bcrypt]==3.0",
+                "numpy==1.18.1",
+                "six==1.12.0",
+                "zipp==1.0",
+            ],
+            "dependency_links": [],
+            "extras_require": ["pytest==5.0", "tox==3.14"],
+        },
+        dev=True,
+        formatter=formatter,
+        incremental=True,
+    )
+    assert code == (
+        "setup(\n"
+        '    name="x",\n'
+        "    install_requires=[\n"
+        '        "aiohttp==3.6",\n'
+        "        # pinned for the old api\n"
+        '        "django[bcrypt]==3.0",\n'
+        '        "numpy==1.18.1",  # keep\n'
+        '        "six==1.12.0",\n'
+        '        "zipp==1.0",\n'
+        "    ],\n"
+        "    dependency_links=[],\n"
+        '    extras_require={"dev": [\n'
+        "        'pytest==5.0',\n"
+        "        'tox==3.14',\n"
+        "    ]},\n"
+        ")\n"
+    )
+
+
+def test_incremental_rewrite_replaces_other_lists():
+    code = 'setup(install_requires=["a==1", "b==1"], dependency_links=[])\n'
+    dependency_arguments = {
+        "install_requires": ["a==2", "b==1"],
+        "dependency_links": ["git+https://a.com/c.git#egg=c"],
+    }
+    assert setup_updater.rewrite_setup_code(
+        code, dependency_arguments, incremental=True
+    ) == setup_updater.rewrite_setup_code(code, dependency_arguments)
+
+
+def test_incremental_update_ignores_order(tmp_path):  # type: (Path) -> None
+    setup_file = tmp_path / "setup.py"
+    setup_file.write_bytes(
+        b'setup(\r\n    install_requires=[\r\n        "b==1",\r\n        "a==1",\r\n    ],\r\n)\r\n'
+    )
+    dependency_arguments = {
+        "install_requires": ["a==1", "b==1"],
+        "dependency_links": [],
+    }
+    assert not setup_updater.update_setup(
+        dependency_arguments, setup_file, incremental=True
+    )
+
+    # after "b==1", which precedes it in the new list
+    dependency_arguments["install_requires"].append("c==1")
+    assert setup_updater.update_setup(
+        dependency_arguments, setup_file, incremental=True
+    )
+    assert setup_file.read_bytes() == (
+        b'setup(\r\n    install_requires=[\r\n        "b==1",\r\n        "c==1",\r\n'
+        b'        "a==1",\r\n    ],\r\n)\r\n'
+    )
+
+
+def test_reports_whether_black_changed_anything(
+    capsys, tmp_path
+):  # type: (Any, Path) -> None
+    if setup_updater.get_black_formatter() is None:
+        pytest.skip("black is not installed")
+    setup_file = tmp_path / "setup.py"
+    code = 'setup(\n    install_requires=[\n        "a==1",\n    ],\n    dependency_links=[],\n)\n'
+    dependency_arguments = {"install_requires": ["a==2"], "dependency_links": []}
+
+    # the element edit is already formatted
+    setup_file.write_text(code)
+    assert setup_updater.update_setup(
+        dependency_arguments, setup_file, incremental=True
+    )
+    assert "reformatted" not in capsys.readouterr().err
+
+    # black turns the replaced list into "a==2" on the line of install_requires
+    setup_file.write_text(code)
+    assert setup_updater.update_setup(dependency_arguments, setup_file)
+    assert setup_file.read_text().count("\n") == 4
+    assert "reformatted %s" % setup_file in capsys.readouterr().err
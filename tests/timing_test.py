@@ -0,0 +1,96 @@
+import json
+import pstats
+from typing import Any
+
+import pytest
+from vistir.compat import Path
+
+from pipenv_setup import timing
+from pipenv_setup.main import cmd
+from tests.conftest import data
+
+
+def test_spans_nest(capsys):  # type: (Any) -> None
+    with timing.instrument("command", timings=True):
+        with timing.span("parse"):
+            pass
+        for _ in range(3):
+            with timing.span("format"):
+                with timing.span("black"):
+                    pass
+    lines = capsys.readouterr().err.splitlines()
+    assert [line.split()[:2] for line in lines[1:]] == [
+        ["command", "1"],
+        ["parse", "1"],
+        ["format", "3"],
+        ["black", "3"],
+    ]
+    assert lines[4].startswith("    black")
+
+
+def test_spans_recorded_when_command_fails(capsys):  # type: (Any) -> None
+    with pytest.raises(SystemExit):
+        with timing.instrument("command", timings=True):
+            with timing.span("parse"):
+                raise SystemExit(1)
+    assert "  parse" in capsys.readouterr().err
+    # recording stops with the command
+    assert timing.span("after") is timing.span("again")
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("nasty_0",)])
+def test_sync_profile_and_trace(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(
+            [
+                "",
+                "sync",
+                "--no-cache",
+                "--timings",
+                "--profile",
+                "sync.prof",
+                "--trace",
+                "sync.json",
+            ]
+        )
+        stats = pstats.Stats("sync.prof")
+        assert any(function[2] == "update_setup" for function in stats.stats)
+        events = json.loads(Path("sync.json").read_text())["traceEvents"]
+    names = [event["name"] for event in events]
+    assert names[0] == "sync"
+    assert {"load Pipfile.lock", "update setup.py", "rewrite setup.py"} <= set(names)
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    err = capsys.readouterr().err
+    assert "update setup.py" in err and "calls" in err
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("loose_pass_strict_fail_0",)])
+def test_check_timings(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "check", "--no-cache", "--timings"])
+    err = capsys.readouterr().err
+    for phase in ("check", "load Pipfile", "parse setup.py", "check dependencies"):
+        assert phase in err
+    assert "hit rate" in err
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("loose_pass_strict_fail_0",)])
+def test_cache_hits_of_each_command(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "check", "--no-cache", "--timings"])
+        capsys.readouterr()
+        # as in a server, the second command finds the versions parsed by the first one
+        cmd(["", "check", "--no-cache", "--timings"])
+    err = capsys.readouterr().err
+    rows = {
+        line[:36].strip(): line[36:].split()
+        for line in err.split("\ncache ", 1)[1].splitlines()[1:]
+    }
+    assert rows["version intervals"][1:] == ["0", "100.0", "%"]
+    assert int(rows["version intervals"][0]) > 0
@@ -0,0 +1,64 @@
+import random
+
+from packaging.version import parse
+
+from pipenv_setup.version_intervals import VersionIntervals
+
+BOUNDS = [parse(v) for v in ("1", "2", "3", "4", "5")]
+# every bound and a version on each side of it
+PROBES = [
+    parse(v)
+    for v in ("0.5", "1", "1.5", "2", "2.5", "3", "3.5", "4", "4.5", "5", "5.5")
+]
+OPS = ("==", ">=", ">", "<", "<=", "!=")
+
+
+def _random_intervals(rng):  # type: (random.Random) -> VersionIntervals
+    intervals = VersionIntervals()
+    for _ in range(rng.randint(0, 3)):
+        clause = VersionIntervals.everything()
+        for _ in range(rng.randint(1, 3)):
+            clause &= VersionIntervals.from_operator(
+                rng.choice(OPS), rng.choice(BOUNDS)
+            )
+        intervals |= clause
+    return intervals
+
+
+def _members(intervals):  # type: (VersionIntervals) -> frozenset
+    return frozenset(v for v in PROBES if v in intervals)
+
+
+def test_set_operations_agree_with_membership():
+    rng = random.Random(1)
+    for _ in range(2000):
+        a = _random_intervals(rng)
+        b = _random_intervals(rng)
+        assert _members(a & b) == _members(a) & _members(b)
+        assert _members(a | b) == _members(a) | _members(b)
+        assert a.issubset(b) == (_members(a) <= _members(b))
+        assert a.isdisjoint(b) == _members(a).isdisjoint(_members(b))
+        # the representation is canonical
+        assert (a == b) == (_members(a) == _members(b))
+
+
+def test_from_operator():
+    version = parse("2")
+    assert _members(VersionIntervals.from_operator("!=", version)) == frozenset(
+        PROBES
+    ) - {version}
+    assert _members(VersionIntervals.from_operator("==", parse("2.0"))) == {version}
+    assert not VersionIntervals.from_operator(
+        ">", version
+    ) & VersionIntervals.from_operator("<=", version)
+
+
+def test_cell_masks_agree_with_set_operations():
+    rng = random.Random(2)
+    for _ in range(2000):
+        a = _random_intervals(rng)
+        b = _random_intervals(rng)
+        a_mask, b_mask = a.cell_masks(b)
+        assert (a_mask == b_mask) == (a == b)
+        assert (a_mask & ~b_mask == 0) == a.issubset(b)
+        assert (a_mask & b_mask == 0) == a.isdisjoint(b)
@@ -1,4 +1,7 @@
 # noinspection PyProtectedMember
+import operator
+import random
+
 import pytest
 
 from pipenv_setup.constants import VersionConflict as VC
@@ -40,3 +43,71 @@ def test_check_compatibility(
 ):  # type: (str, str, bool) -> None
     vr = _VersionReqs(setup_version)
     assert vr.analyze_compatibility(pipfile_version) == expected
+
+
+def _metric_space_compatibility(setup_version, pipfile_version):
+    """
+    the original algorithm: every version is mapped to an odd integer, the even ones standing for the versions in
+    between, and each requirement filters the integers
+    """
+    setup_op_versions = _VersionReqs._parse_reqs(setup_version)
+    pipfile_op_versions = _VersionReqs._parse_reqs(pipfile_version)
+    versions = sorted(set(v for _, v in setup_op_versions + pipfile_op_versions))
+    mapping = {v: 2 * i + 1 for i, v in enumerate(versions)}
+    ops = {
+        "==": operator.eq,
+        ">=": operator.ge,
+        ">": operator.gt,
+        "<": operator.lt,
+        "<=": operator.le,
+        "!=": operator.ne,
+    }
+
+    def filtered(op_versions):
+        space = set(range(2 * len(mapping) + 1))
+        for op, version in op_versions:
+            space = {x for x in space if ops[op](x, mapping[version])}
+        return space
+
+    setup_set = filtered(setup_op_versions)
+    pipfile_set = filtered(pipfile_op_versions)
+    if setup_set == pipfile_set:
+        return None
+    elif setup_set < pipfile_set:
+        return VC.COMPATIBLE
+    elif setup_set & pipfile_set:
+        return VC.POTENTIAL
+    else:
+        return VC.DISJOINT
+
+
+def _random_version_string(rng):  # type: (random.Random) -> str
+    versions = ["0.9", "1.0", "1.0.0", "1.1", "1.2.3", "1.5", "2", "2.0.1", "3.0"]
+    ops = ["==", ">=", ">", "<", "<=", "!=", "~="]
+    clauses = []
+    for _ in range(rng.randint(0, 4)):
+        op = rng.choice(ops)
+        version = rng.choice(versions)
+        if op == "~=" and "." not in version:
+            version += ".0"
+        clauses.append(op + version)
+    return ",".join(clauses) or rng.choice(["", "*"])
+
+
+def test_check_compatibility_agrees_with_metric_space():
+    rng = random.Random(20200410)
+    for _ in range(3000):
+        setup_version = _random_version_string(rng)
+        pipfile_version = _random_version_string(rng)
+        expected = _metric_space_compatibility(setup_version, pipfile_version)
+        vr = _VersionReqs(setup_version)
+        assert vr.analyze_compatibility(pipfile_version) == expected, (
+            setup_version,
+            pipfile_version,
+        )
+
+
+def test_unrecognizable_operator():
+    vr = _VersionReqs("=1.0")
+    with pytest.raises(ValueError):
+        vr.analyze_compatibility("*")
@@ -0,0 +1,173 @@
+import argparse
+import ast
+import json
+from typing import Any, List, Set
+
+import pytest
+from vistir.compat import Path
+
+from pipenv_setup import watcher
+from pipenv_setup.main import cmd
+from pipenv_setup.setup_parser import (
+    get_extras_require_dev_list_node,
+    get_kw_list_of_string_arg,
+    parse_list_of_string,
+)
+from tests.conftest import data
+
+
+def watch_args(**kwargs):  # type: (Any) -> argparse.Namespace
+    args = argparse.Namespace(
+        pipfile=False,
+        dev=True,
+        use_dependency_links=False,
+        incremental=False,
+        no_cache=True,
+        debounce=0.05,
+        poll=True,
+        poll_interval=0.01,
+    )
+    vars(args).update(kwargs)
+    return args
+
+
+def edit_lockfile(section, name, config):  # type: (str, str, Any) -> None
+    lockfile = Path("Pipfile.lock")
+    content = json.loads(lockfile.read_text())
+    content[section][name] = config
+    lockfile.write_text(json.dumps(content, indent=4))
+
+
+def test_polling_watcher_notices_write(tmp_path):  # type: (Path) -> None
+    (tmp_path / "Pipfile.lock").write_text("{}")
+    polling_watcher = watcher.PollingWatcher(tmp_path, ["Pipfile.lock"], 0.01)
+    assert polling_watcher.wait(0.05) == set()
+    (tmp_path / "other").write_text("not watched")
+    (tmp_path / "Pipfile.lock").write_text('{"default": {}}')
+    assert polling_watcher.wait(1) == {"Pipfile.lock"}
+
+
+def test_inotify_watcher_notices_replace(tmp_path):  # type: (Path) -> None
+    try:
+        inotify_watcher = watcher.InotifyWatcher(tmp_path, ["Pipfile.lock"])
+    except OSError:
+        pytest.skip("inotify is not available")
+    try:
+        assert inotify_watcher.wait(0.05) == set()
+        (tmp_path / "other").write_text("not watched")
+        assert inotify_watcher.wait(0.05) == set()
+        # pipenv writes a temporary file then renames it over the lockfile
+        (tmp_path / "Pipfile.lock.tmp").write_text("{}")
+        (tmp_path / "Pipfile.lock.tmp").rename(tmp_path / "Pipfile.lock")
+        assert inotify_watcher.wait(1) == {"Pipfile.lock"}
+    finally:
+        inotify_watcher.close()
+
+
+class FakeWatcher:
+    def __init__(self, changes):  # type: (List[Set[str]]) -> None
+        self.changes = changes
+
+    def wait(self, timeout=None):  # type: (Any) -> Set[str]
+        return self.changes.pop(0) if self.changes else set()
+
+
+def test_wait_for_quiet_collects_burst():
+    burst = FakeWatcher([{"Pipfile"}, {"Pipfile.lock"}, {"Pipfile.lock"}])
+    assert watcher.wait_for_quiet(burst, {"Pipfile.lock"}, 0.01) == {
+        "Pipfile",
+        "Pipfile.lock",
+    }
+    assert burst.changes == []
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("generic_nice_0",)])
+def test_resync_only_changed_section(
+    capsys, tmp_path, source_pipfile_dirname
+):  # type: (Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "sync", "--dev"])
+        resyncer = watcher.Resyncer(watch_args())
+
+        # lock metadata does not end up in setup.py
+        edit_lockfile("_meta", "hash", {"sha256": "0" * 64})
+        assert resyncer.resync() is None
+
+        install_requires = get_kw_list_of_string_arg(
+            Path("setup.py").read_text(), "install_requires"
+        )
+        capsys.readouterr()
+        edit_lockfile("develop", "six", {"version": "==1.15.0"})
+        assert resyncer.resync() == {"dev"}
+        output = capsys.readouterr().out
+        assert "dev packages" in output and "default packages" not in output
+        setup_code = Path("setup.py").read_text()
+        assert get_kw_list_of_string_arg(setup_code, "install_requires") == (
+            install_requires
+        )
+        dev_list_node = get_extras_require_dev_list_node(ast.parse(setup_code))
+        assert dev_list_node is not None
+        assert "six==1.15.0" in parse_list_of_string(dev_list_node)
+
+        # sync writes the dev packages along with the default ones
+        edit_lockfile("default", "six", {"version": "==1.15.0"})
+        assert resyncer.resync() == {"default", "dev"}
+        assert "dev packages" in capsys.readouterr().out
+        assert "six==1.15.0" in get_kw_list_of_string_arg(
+            Path("setup.py").read_text(), "install_requires"
+        )
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("generic_nice_0",)])
+def test_dev_change_ignored_without_dev(
+    tmp_path, source_pipfile_dirname
+):  # type: (Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "sync"])
+        resyncer = watcher.Resyncer(watch_args(dev=False))
+        setup_code = Path("setup.py").read_text()
+        edit_lockfile("develop", "six", {"version": "==1.15.0"})
+        assert resyncer.resync() is None
+        assert Path("setup.py").read_text() == setup_code
+
+        edit_lockfile("default", "six", {"version": "==1.15.0"})
+        assert resyncer.resync() == {"default"}
+
+
+@pytest.mark.parametrize(("source_pipfile_dirname",), [("generic_nice_0",)])
+def test_watch_keeps_running_after_failed_sync(
+    capsys, monkeypatch, tmp_path, source_pipfile_dirname
+):  # type: (Any, Any, Path, str) -> None
+    with data(source_pipfile_dirname, tmp_path):
+        cmd(["", "sync"])
+        lockfile_content = Path("Pipfile.lock").read_text()
+        changes = [{"Pipfile.lock"}, set(), {"Pipfile.lock"}, set()]
+
+        def fix_and_edit_lockfile():  # type: () -> None
+            Path("Pipfile.lock").write_text(lockfile_content)
+            edit_lockfile("default", "six", {"version": "==1.15.0"})
+
+        edits = iter(
+            [
+                lambda: Path("Pipfile.lock").write_text("{not json"),
+                fix_and_edit_lockfile,
+            ]
+        )
+
+        class EditingWatcher(FakeWatcher):
+            def wait(self, timeout=None):  # type: (Any) -> Set[str]
+                if timeout is None:
+                    next(edits)()
+                return super().wait(timeout)
+
+            def close(self):  # type: () -> None
+                pass
+
+        monkeypatch.setattr(
+            watcher, "make_watcher", lambda *args: EditingWatcher(changes)
+        )
+        watcher.watch(watch_args(dev=False), max_resyncs=2)
+        captured = capsys.readouterr()
+        assert "re-sync failed" in captured.err
+        assert "re-synced default packages" in captured.out
+        assert "six==1.15.0" in Path("setup.py").read_text()
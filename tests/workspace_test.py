@@ -0,0 +1,76 @@
+from typing import Any
+
+import pytest
+from vistir.compat import Path
+
+from pipenv_setup import msg_formatter
+from pipenv_setup.main import cmd
+from pipenv_setup.workspace import find_projects
+from tests.conftest import data
+
+PROJECTS = {
+    "services/a": "loose_pass_strict_fail_0",
+    "services/b": "many_conflicts_0",
+    "libs/c": "generic_nice_1",
+    ".hidden/d": "many_conflicts_0",
+}
+
+
+@pytest.fixture
+def workspace(tmp_path):  # type: (Path) -> Path
+    for directory, source_pipfile_dirname in PROJECTS.items():
+        (tmp_path / directory).mkdir(parents=True)
+        with data(source_pipfile_dirname, tmp_path / directory):
+            pass
+    # not a project, there is no setup.py
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "Pipfile").write_text("")
+    return tmp_path
+
+
+def test_find_projects(workspace):  # type: (Path) -> None
+    assert find_projects(workspace) == [
+        workspace / "libs/c",
+        workspace / "services/a",
+        workspace / "services/b",
+    ]
+
+
+def test_check_workspace(capsys, workspace):  # type: (Any, Path) -> None
+    outputs = []
+    for jobs in ("1", "3"):
+        with pytest.raises(SystemExit) as e:
+            cmd(argv=["", "check", "--workspace", str(workspace), "--jobs", jobs])
+        assert e.value.code == 1
+        outputs.append(capsys.readouterr())
+
+    # the same report whatever the number of processes
+    assert outputs[0] == outputs[1]
+    err = outputs[0].err
+    assert "services/a:" not in err
+    assert err.index("libs/c:") < err.index("services/b:")
+    assert "  package 'requests' in pipfile but not in install_requires" in err
+    assert err.endswith(msg_formatter.workspace_summary(3, 2) + "\n")
+
+
+def test_check_workspace_fail_fast(capsys, workspace):  # type: (Any, Path) -> None
+    with pytest.raises(SystemExit) as e:
+        cmd(["", "check", "--workspace", str(workspace), "-j", "1", "--fail-fast"])
+    assert e.value.code == 1
+    err = capsys.readouterr().err
+    assert "libs/c:" in err and "services/b:" not in err
+    assert err.endswith(msg_formatter.workspace_summary(1, 1) + "\n")
+
+
+def test_check_workspace_passing(capsys, workspace):  # type: (Any, Path) -> None
+    cmd(argv=["", "check", "--workspace", str(workspace / "services/a")])
+    assert msg_formatter.workspace_summary(1, 0) in capsys.readouterr().out
+
+
+def test_check_workspace_without_projects(
+    capsys, tmp_path
+):  # type: (Any, Path) -> None
+    with pytest.raises(SystemExit) as e:
+        cmd(argv=["", "check", "--workspace", str(tmp_path)])
+    assert e.value.code == 1
+    assert msg_formatter.no_project_found(tmp_path) in capsys.readouterr().err